@@ -513,6 +513,7 @@ class CadastreImportDialog(QDialog, IMPORT_FORM_CLASS):
         self.majicSourceDir = None
         self.edigeoSourceDir = None
         self.edigeoMakeValid = False
+        self.resumeImport = False
 
         # set input values from settings
         self.sList = {
@@ -666,6 +667,7 @@ class CadastreImportDialog(QDialog, IMPORT_FORM_CLASS):
 
         if self.cbMakeValid.isChecked():
             self.edigeoMakeValid = True
+        self.resumeImport = self.cbResumeImport.isChecked()
 
         msg = ''
         if not self.db:
@@ -2184,6 +2186,29 @@ class CadastreOptionDialog(QDialog, OPTION_FORM_CLASS):
                 self.inSpatialiteTempStore.setCurrentIndex(0)
             else:
                 self.inSpatialiteTempStore.setCurrentIndex(1)
+        majicImportWorkers = s.value("cadastre/majicImportWorkers", 1, type=int)
+        if majicImportWorkers:
+            self.inMajicImportWorkers.setValue(majicImportWorkers)
+        edigeoImportWorkers = s.value("cadastre/edigeoImportWorkers", 1, type=int)
+        if edigeoImportWorkers:
+            self.inEdigeoImportWorkers.setValue(edigeoImportWorkers)
+        sqlScriptWorkers = s.value("cadastre/sqlScriptWorkers", 1, type=int)
+        if sqlScriptWorkers:
+            self.inSqlScriptWorkers.setValue(sqlScriptWorkers)
+        majicPythonDecoder = s.value("cadastre/majicPythonDecoder", False, type=bool)
+        self.cbMajicPythonDecoder.setChecked(majicPythonDecoder)
+        majicIncrementalImport = s.value("cadastre/majicIncrementalImport", False, type=bool)
+        self.cbMajicIncrementalImport.setChecked(majicIncrementalImport)
+        unloggedImportTables = s.value("cadastre/unloggedImportTables", False, type=bool)
+        self.cbUnloggedImportTables.setChecked(unloggedImportTables)
+        partitionMajicRawTables = s.value("cadastre/partitionMajicRawTables", False, type=bool)
+        self.cbPartitionMajicRawTables.setChecked(partitionMajicRawTables)
+        edigeoVirtualFiles = s.value("cadastre/edigeoVirtualFiles", False, type=bool)
+        self.cbEdigeoVirtualFiles.setChecked(edigeoVirtualFiles)
+        profileSqlScripts = s.value("cadastre/profileSqlScripts", False, type=bool)
+        self.cbProfileSqlScripts.setChecked(profileSqlScripts)
+        dumpSqlScripts = s.value("cadastre/dumpSqlScripts", False, type=bool)
+        self.cbDumpSqlScripts.setChecked(dumpSqlScripts)
         composerTemplateFile = s.value(
             "cadastre/composerTemplateFile",
             '%s/composers/paysage_a4.qpt' % self.plugin_dir,
@@ -2241,6 +2266,16 @@ class CadastreOptionDialog(QDialog, OPTION_FORM_CLASS):
         # Save performance tuning
         s.setValue("cadastre/maxInsertRows", int(self.inMaxInsertRows.value()))
         s.setValue("cadastre/spatialiteTempStore", self.inSpatialiteTempStore.currentText().upper())
+        s.setValue("cadastre/majicImportWorkers", int(self.inMajicImportWorkers.value()))
+        s.setValue("cadastre/edigeoImportWorkers", int(self.inEdigeoImportWorkers.value()))
+        s.setValue("cadastre/sqlScriptWorkers", int(self.inSqlScriptWorkers.value()))
+        s.setValue("cadastre/majicPythonDecoder", self.cbMajicPythonDecoder.isChecked())
+        s.setValue("cadastre/majicIncrementalImport", self.cbMajicIncrementalImport.isChecked())
+        s.setValue("cadastre/unloggedImportTables", self.cbUnloggedImportTables.isChecked())
+        s.setValue("cadastre/partitionMajicRawTables", self.cbPartitionMajicRawTables.isChecked())
+        s.setValue("cadastre/edigeoVirtualFiles", self.cbEdigeoVirtualFiles.isChecked())
+        s.setValue("cadastre/profileSqlScripts", self.cbProfileSqlScripts.isChecked())
+        s.setValue("cadastre/dumpSqlScripts", self.cbDumpSqlScripts.isChecked())
 
         self.accept()
 
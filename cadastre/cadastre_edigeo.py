@@ -0,0 +1,416 @@
+"""
+Cadastre - EDIGEO import tools
+
+This plugins helps users to import the french land registry ('cadastre')
+into a database. It is meant to ease the use of the data in QGIs
+by providing search tools and appropriate layer symbology.
+
+begin     : 2021-02-01
+copyright : (C) 2021 by 3liz
+email     : info@3liz.com
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+The functions of this module do not depend on QGIS,
+so that they can run in worker processes.
+"""
+import io
+import multiprocessing
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Any, Dict, List, Optional, Tuple
+
+# Destination datasources opened by the process, by connection string
+THF_DESTINATIONS = {}
+
+
+def getPythonExecutable() -> Optional[str]:
+    """
+    Python interpreter used to spawn the worker processes.
+    Inside QGIS, sys.executable can be the QGIS binary
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    candidates = [
+        os.path.join(sys.exec_prefix, 'python.exe'),
+        os.path.join(sys.exec_prefix, 'python3.exe'),
+        os.path.join(sys.exec_prefix, 'bin', 'python3'),
+    ]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def createProcessPool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Pool of spawned worker processes,
+    or None if no Python interpreter can be found
+    """
+    executable = getPythonExecutable()
+    if not executable:
+        return None
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(executable)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def isVirtualPath(path: str) -> bool:
+    """
+    Path of a GDAL virtual file system, such as /vsizip/
+    """
+    return path.startswith('/vsi')
+
+
+def normEdigeoPath(path: str) -> str:
+    """
+    Absolute path of an EDIGEO file, virtual paths left untouched
+    """
+    if isVirtualPath(path):
+        return path
+    return os.path.abspath(os.path.normpath(path))
+
+
+def readEdigeoFile(path: str) -> bytes:
+    """
+    Content of an EDIGEO file, on disk or inside
+    an archive through GDAL virtual file systems
+    """
+    if not isVirtualPath(path):
+        with open(path, 'rb') as fin:
+            return fin.read()
+
+    from osgeo import gdal
+    fin = gdal.VSIFOpenL(path, 'rb')
+    if fin is None:
+        raise IOError('Impossible de lire %s' % path)
+    try:
+        gdal.VSIFSeekL(fin, 0, os.SEEK_END)
+        size = gdal.VSIFTellL(fin)
+        gdal.VSIFSeekL(fin, 0, os.SEEK_SET)
+        return bytes(gdal.VSIFReadL(1, size, fin))
+    finally:
+        gdal.VSIFCloseL(fin)
+
+
+def listZipMembers(archive: zipfile.ZipFile, prefix: str, files: Dict[str, List[str]]):
+    """
+    Add the virtual paths of the EDIGEO files of a zip archive,
+    including the ones of the nested zip and tar.bz2 archives
+    """
+    for member in archive.namelist():
+        path = '%s/%s' % (prefix, member)
+        extension = os.path.splitext(member)[1][1:].lower()
+        if extension == 'zip':
+            with archive.open(member) as fin, zipfile.ZipFile(fin) as inner:
+                listZipMembers(inner, '/vsizip/{%s}' % path, files)
+        elif extension == 'bz2':
+            with archive.open(member) as fin, tarfile.open(fileobj=fin, mode='r|bz2') as inner:
+                listTarMembers(inner, '/vsitar/{/vsibz2/{%s}}' % path, files)
+        elif extension in files:
+            files[extension].append(path)
+
+
+def listTarMembers(archive: tarfile.TarFile, prefix: str, files: Dict[str, List[str]]):
+    """
+    Add the virtual paths of the EDIGEO files of a tar archive
+    """
+    for member in archive:
+        extension = os.path.splitext(member.name)[1][1:].lower()
+        if member.isfile() and extension in files:
+            files[extension].append('%s/%s' % (prefix, member.name))
+
+
+def listEdigeoArchiveFiles(sourceDir: str, extensions: List[str]) -> Dict[str, List[str]]:
+    """
+    GDAL virtual paths of the EDIGEO files of the given extensions
+    found in the zip and tar.bz2 archives of the source directory,
+    so that they can be read without being extracted
+    """
+    files = {extension: [] for extension in extensions}
+    for root, dirs, names in os.walk(sourceDir):
+        for name in sorted(names):
+            path = os.path.abspath(os.path.join(root, name))
+            extension = os.path.splitext(name)[1][1:].lower()
+            if extension == 'zip':
+                with zipfile.ZipFile(path) as archive:
+                    listZipMembers(archive, '/vsizip/{%s}' % path, files)
+            elif extension == 'bz2':
+                with tarfile.open(path, mode='r|bz2') as archive:
+                    listTarMembers(archive, '/vsitar/{/vsibz2/{%s}}' % path, files)
+    return files
+
+
+def extractEdigeoArchive(path: str, targetDir: str, remove: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    Extract a zip or tar.bz2 archive into its own folder of targetDir,
+    and remove it afterwards if asked to
+
+    Returns the nested archives and the THF files extracted
+    """
+    name = os.path.basename(path)
+    folder = tempfile.mkdtemp('', '%s_' % os.path.splitext(name)[0], targetDir)
+    if os.path.splitext(name)[1].lower() == '.zip':
+        with zipfile.ZipFile(path) as archive:
+            archive.extractall(folder)
+    else:
+        with tarfile.open(path) as archive:
+            archive.extractall(folder)
+    if remove:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # in Windows, sometime file is not unlocked
+
+    archives = []
+    thfFiles = []
+    for root, dirs, names in os.walk(folder):
+        for name in names:
+            extension = os.path.splitext(name)[1][1:].lower()
+            if extension in ('zip', 'bz2'):
+                archives.append(os.path.join(root, name))
+            elif extension == 'thf':
+                thfFiles.append(os.path.join(root, name))
+    return archives, thfFiles
+
+
+# Backends used to import the THF files:
+# GDAL VectorTranslate, or the ogr2ogr.py script for GDAL < 2.1
+THF_BACKEND_VECTORTRANSLATE = 'VectorTranslate (VRT)'
+THF_BACKEND_OGR2OGR = 'ogr2ogr.py'
+
+
+def thfTranslateOptions(importOptions: Dict[str, Any], groupTransactions: int) -> Any:
+    """
+    GDAL VectorTranslate options appending a THF file
+    to the destination datasource
+    """
+    from osgeo import gdal
+    return gdal.VectorTranslateOptions(
+        options=['-gt', str(groupTransactions)],
+        format=importOptions['format'],
+        accessMode='append',
+        srcSRS=importOptions['srcSRS'],
+        dstSRS=importOptions['dstSRS'],
+        reproject=importOptions['reproject'],
+        layerCreationOptions=importOptions['layerCreationOptions'],
+        datasetCreationOptions=importOptions['datasetCreationOptions'],
+        geometryType=importOptions['geometryType'],
+    )
+
+
+def openThfDestination(importOptions: Dict[str, Any]) -> Any:
+    """
+    Destination datasource, opened once per process
+    and reused for all the THF files of the lot
+    """
+    from osgeo import gdal
+    destination = importOptions['destination']
+    dataset = THF_DESTINATIONS.get(destination)
+    if dataset is None:
+        dataset = gdal.OpenEx(destination, gdal.OF_VECTOR | gdal.OF_UPDATE)
+        if dataset is not None:
+            THF_DESTINATIONS[destination] = dataset
+    return dataset
+
+
+def closeThfDestinations():
+    """
+    Close the destination datasources opened by the process
+    """
+    THF_DESTINATIONS.clear()
+
+
+def thfOgr2ogrArgs(filename: str, importOptions: Dict[str, Any]) -> List[str]:
+    """
+    ogr2ogr.py command line appending a THF file
+    to the destination datasource
+    """
+    args = [
+        '',
+        '-s_srs', importOptions['srcSRS'],
+        '-t_srs' if importOptions['reproject'] else '-a_srs', importOptions['dstSRS'],
+        '-append',
+        '-f', importOptions['format'],
+        importOptions['destination'],
+        filename,
+        '-nlt', importOptions['geometryType'],
+        '-gt', str(importOptions['groupTransactions']),
+    ]
+    for option in importOptions['layerCreationOptions']:
+        args += ['-lco', option]
+    for option in importOptions['datasetCreationOptions']:
+        args += ['-dsco', option]
+    for key, value in importOptions['config'].items():
+        args += ['--config', key, value]
+    return args
+
+
+def thfResult(filenames: List[str], ok: bool, errors: List[str], start: float, backend: str) -> Dict[str, Any]:
+    """
+    Status of the import of a group of THF files by the given backend,
+    with the GDAL error messages and the duration in seconds
+    """
+    if not ok and not errors:
+        errors = ['Erreur inconnue']
+    path = filenames[0]
+    if len(filenames) > 1:
+        path = '%s (%s fichiers)' % (os.path.dirname(path), len(filenames))
+    return {
+        'path': path,
+        'files': len(filenames),
+        'filenames': list(filenames),
+        'ok': ok,
+        'errors': list(errors),
+        'duration': time.perf_counter() - start,
+        'backend': backend,
+    }
+
+
+def translateThfFiles(filenames: List[str], importOptions: Dict[str, Any], errors: List[str]) -> Dict[str, Any]:
+    """
+    Append the THF files to the destination of the process
+    with one GDAL VectorTranslate call, through a VRT with an union layer
+    per EDIGEO object type, in one transaction when the driver supports it.
+    On error, 'retry' tells if nothing has been written,
+    so that the files can be imported again one by one
+    """
+    from osgeo import gdal, ogr
+
+    from .scripts.pyogr.ogrvrt import ogr2unionvrt
+
+    start = time.perf_counter()
+    try:
+        dataset = openThfDestination(importOptions)
+    except Exception as e:
+        dataset = None
+        errors.append(str(e))
+    if dataset is None:
+        return dict(thfResult(filenames, False, errors, start, THF_BACKEND_VECTORTRANSLATE), retry=False)
+
+    vrt = '/vsimem/cadastre_thf_%s.vrt' % os.getpid()
+    sources = []
+    vrtCreated = False
+    inTransaction = False
+    written = False
+    ok = False
+    try:
+        # Each sheet is read once: the union layers share these datasources
+        layers = {}
+        for filename in filenames:
+            filename = normEdigeoPath(filename)
+            source = gdal.OpenEx(filename, gdal.OF_VECTOR | gdal.OF_SHARED)
+            if source is None:
+                errors.append('Impossible d\'ouvrir %s' % filename)
+                return dict(thfResult(filenames, False, errors, start, THF_BACKEND_VECTORTRANSLATE), retry=True)
+            sources.append(source)
+            for i in range(source.GetLayerCount()):
+                layers.setdefault(source.GetLayer(i).GetName(), []).append(filename)
+        if not layers:
+            return thfResult(filenames, True, errors, start, THF_BACKEND_VECTORTRANSLATE)
+        gdal.FileFromMemBuffer(vrt, ogr2unionvrt(layers))
+        vrtCreated = True
+
+        # Commit once for all the files, instead of every groupTransactions features
+        inTransaction = dataset.StartTransaction() == ogr.OGRERR_NONE
+        groupTransactions = 0 if inTransaction else importOptions['groupTransactions']
+        options = thfTranslateOptions(importOptions, groupTransactions)
+        written = not inTransaction
+        ok = gdal.VectorTranslate(dataset, vrt, options=options) is not None
+        if inTransaction:
+            inTransaction = False
+            if ok:
+                ok = dataset.CommitTransaction() == ogr.OGRERR_NONE
+            else:
+                dataset.RollbackTransaction()
+    except Exception as e:
+        # Raised when GDAL exceptions are enabled
+        ok = False
+        errors.append(str(e))
+        if inTransaction:
+            dataset.RollbackTransaction()
+    finally:
+        if vrtCreated:
+            gdal.Unlink(vrt)
+        del sources[:]
+
+    # The datasource cannot be reused after an error
+    if not ok:
+        THF_DESTINATIONS.pop(importOptions['destination'], None)
+
+    return dict(thfResult(filenames, ok, errors, start, THF_BACKEND_VECTORTRANSLATE), retry=not written)
+
+
+def importThfFiles(filenames: List[str], importOptions: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Import THF files with GDAL VectorTranslate,
+    or one by one with ogr2ogr.py for GDAL < 2.1
+
+    Returns the status of the import of the group of files.
+    When the group fails and nothing has been written, its files are imported
+    again one by one, so that the failing ones are identified and the others kept:
+    the status of each file is then returned. A file which fails on its own
+    without writing anything is marked as skipped, so that the import goes on.
+    With ogr2ogr.py, the status of each file until the first error is returned
+    """
+    from osgeo import gdal
+
+    errors = []
+
+    def errorHandler(level, number, message):
+        if level >= gdal.CE_Failure:
+            errors.append(message)
+
+    config = importOptions['config']
+    savedConfig = {key: gdal.GetConfigOption(key) for key in config}
+    gdal.PushErrorHandler(errorHandler)
+    try:
+        if hasattr(gdal, 'VectorTranslate'):
+            for key, value in config.items():
+                gdal.SetConfigOption(key, value)
+            result = translateThfFiles(filenames, importOptions, errors)
+            if result['ok'] or not result['retry']:
+                return [result]
+            if len(filenames) == 1:
+                return [dict(result, skipped=True)]
+            results = []
+            for filename in filenames:
+                del errors[:]
+                result = translateThfFiles([filename], importOptions, errors)
+                results.append(dict(result, skipped=not result['ok'] and result['retry']))
+            return results
+
+        from .scripts.pyogr.ogr2ogr import main as ogr2ogr
+
+        results = []
+        for filename in filenames:
+            del errors[:]
+            start = time.perf_counter()
+            try:
+                # ogr2ogr.py prints its own errors instead of raising them
+                with redirect_stdout(io.StringIO()) as output:
+                    ok = bool(ogr2ogr(thfOgr2ogrArgs(filename, importOptions)))
+                printed = output.getvalue().strip()
+                if not ok and printed:
+                    errors.append(printed)
+            except Exception as e:
+                ok = False
+                errors.append(str(e))
+            results.append(thfResult([filename], ok, errors, start, THF_BACKEND_OGR2OGR))
+            if not ok:
+                break
+        return results
+    finally:
+        gdal.PopErrorHandler()
+        for key, value in savedConfig.items():
+            gdal.SetConfigOption(key, value)
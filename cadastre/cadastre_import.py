@@ -20,29 +20,67 @@
  *                                                                         *
  ***************************************************************************/
 """
-import glob
-import io
+import hashlib
+import itertools
+import json
 import os
+import queue
 import re
 import shutil
 import sqlite3 as sqlite
-import sys
 import tempfile
+import threading
+import time
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from distutils import dir_util
 
 # db_manager scripts
-from db_manager.db_plugins.plugin import BaseError
+from db_manager.db_plugins.plugin import BaseError, DbError
 from db_manager.dlg_db_error import DlgDbError
 from qgis.core import Qgis, QgsMessageLog
 from qgis.PyQt.QtCore import QObject, QSettings, Qt
 from qgis.PyQt.QtWidgets import QApplication, QMessageBox
 
 from .cadastre_dialogs import CadastreCommon
-
-# Import ogr2ogr.py from the script folder
-from .scripts.pyogr.ogr2ogr import main as ogr2ogr
+from .cadastre_edigeo import (
+    closeThfDestinations,
+    createProcessPool,
+    extractEdigeoArchive,
+    importThfFiles,
+    listEdigeoArchiveFiles,
+    normEdigeoPath,
+)
+from .cadastre_majic import (
+    MAJIC_RAW_PARTITIONS,
+    MajicDecoder,
+    compareMajicFile,
+    copyDecodedMajicFile,
+    copyMajicFile,
+    decodeMajicFile,
+    getMajicDependentTables,
+    getMajicFileSize,
+    getMajicSourceIndex,
+    getStatementTarget,
+    majicLines,
+    majicRawPartitionSql,
+    openMajicFile,
+)
+from .cadastre_majic_layouts import MAJIC_LAYOUTS
+from .cadastre_sql import (
+    SqlProfiler,
+    SqlScriptRepository,
+    copyRows,
+    getSqlStepComments,
+    getStatementDependencies,
+    isParallelStatement,
+    isSqlQuery,
+    setTablesPersistenceSql,
+    splitSqlStatements,
+    tablesPersistenceSql,
+    temporaryTablesSql,
+)
+from .getmultipolygonfromvec import readVecFile
 
 
 class cadastreImport(QObject):
@@ -79,22 +117,47 @@ class cadastreImport(QObject):
 
         # create temporary directories
         s = QSettings()
-        tempDir = s.value("cadastre/tempDir", '%s' % tempfile.gettempdir(), type=str)
-        self.pScriptDir = tempfile.mkdtemp('', 'cad_p_script_', tempDir)
-        self.edigeoPlainDir = tempfile.mkdtemp('', 'cad_edigeo_plain_', tempDir)
+        self.tempDir = s.value("cadastre/tempDir", '%s' % tempfile.gettempdir(), type=str)
+        self.edigeoPlainDir = tempfile.mkdtemp('', 'cad_edigeo_plain_', self.tempDir)
         self.replaceDict = {
             '[VERSION]': self.dialog.dataVersion,
             '[ANNEE]': self.dialog.dataYear,
             '[LOT]': self.dialog.edigeoLot
         }
         self.maxInsertRows = s.value("cadastre/maxInsertRows", 50000, type=int)
+        self.majicImportWorkers = s.value("cadastre/majicImportWorkers", 1, type=int)
+        self.edigeoImportWorkers = s.value("cadastre/edigeoImportWorkers", 1, type=int)
+        self.edigeoVirtualFiles = s.value("cadastre/edigeoVirtualFiles", False, type=bool)
+        self.majicIncrementalImport = s.value("cadastre/majicIncrementalImport", False, type=bool)
         self.spatialiteTempStore = s.value("cadastre/spatialiteTempStore", 'MEMORY', type=str)
+        self.unloggedImportTables = s.value("cadastre/unloggedImportTables", False, type=bool)
+        self.majicRawPartitions = s.value("cadastre/partitionMajicRawTables", False, type=bool)
+
+        self.sqlScriptWorkers = s.value("cadastre/sqlScriptWorkers", 1, type=int)
+
+        # SQL scripts, rendered in memory and written in a temporary folder if asked
+        self.pScriptDir = None
+        if s.value("cadastre/dumpSqlScripts", False, type=bool):
+            self.pScriptDir = tempfile.mkdtemp('', 'cad_p_script_', self.tempDir)
+        self.scripts = SqlScriptRepository(self.pScriptSourceDir, self.pScriptDir)
+
+        # Duration and affected rows of each SQL statement
+        self.sqlProfiler = None
+        if s.value("cadastre/profileSqlScripts", False, type=bool):
+            self.sqlProfiler = SqlProfiler()
 
         self.geoTableList = ['geo_zoncommuni', 'geo_ptcanv', 'geo_commune', 'geo_parcelle', 'geo_symblim',
                              'geo_tronfluv', 'geo_tronroute', 'geo_label', 'geo_subdsect', 'geo_batiment', 'geo_borne',
                              'geo_croix', 'geo_tpoint', 'geo_lieudit', 'geo_section', 'geo_subdfisc', 'geo_tsurf',
                              'geo_tline', 'geo_unite_fonciere']
 
+        # EDIGEO import tables, filled by ogr2ogr and dropped after formatting
+        self.edigeoImportTables = ['batiment_id', 'borne_id', 'boulon_id', 'commune_id', 'croix_id',
+                                   'id_s_obj_z_1_2_2', 'lieudit_id', 'numvoie_id', 'parcelle_id', 'ptcanv_id',
+                                   'section_id', 'subdfisc_id', 'subdsect_id', 'symblim_id', 'tline_id',
+                                   'tpoint_id', 'tronfluv_id', 'tronroute_id', 'tsurf_id', 'voiep_id',
+                                   'zoncommuni_id']
+
         s = QSettings()
         self.majicSourceFileNames = [
             {'key': '[FICHIER_BATI]',
@@ -139,6 +202,10 @@ class cadastreImport(QObject):
         self.totalSteps = 0
 
         self.multiPolygonUpdated = 0
+        self.edigeoThfDurations = []
+        self.edigeoThfBackends = set()
+        self.edigeoThfSkipped = []
+        self.edigeoArchiveFiles = {}
 
         self.qc.checkDatabaseForExistingStructure()
         self.hasConstraints = False
@@ -148,6 +215,28 @@ class cadastreImport(QObject):
         # Remove MAJIC from tables bati|fanr|lloc|nbat|pdll|prop
         self.removeMajicRawData = True
 
+        # Stream the MAJIC data and the VEC results with COPY FROM STDIN when possible
+        self.canCopy = self.connectorCanCopy()
+
+        # Decode MAJIC files in Python straight into the formatted tables
+        # when a layout is available for the data version
+        self.majicDecoder = None
+        if s.value("cadastre/majicPythonDecoder", False, type=bool) \
+                and self.dialog.dataVersion in MAJIC_LAYOUTS:
+            self.majicDecoder = MajicDecoder(MAJIC_LAYOUTS[self.dialog.dataVersion], self.replaceDict)
+
+        # Incremental MAJIC import: raw tables to reload
+        # and formatted tables to refresh. None means all the tables
+        self.majicChangedTables = None
+        self.majicDirtyTables = None
+        self.majicFingerprints = []
+
+        # Checkpoints of the completed steps, used to resume a failed import
+        self.resumeImport = getattr(self.dialog, 'resumeImport', False)
+        self.checkpointPath = None
+        self.checkpoint = {'parameters': self.getCheckpointParameters(), 'steps': {}}
+        self.loadCheckpoint()
+
         self.beginImport()
 
     def beginJobLog(self, stepNumber, title):
@@ -194,9 +283,7 @@ class cadastreImport(QObject):
 
         self.executeSqlQuery(sql)
 
-        # copy SQL script files to temporary dir
         self.updateProgressBar()
-        self.copyFilesToTemp(self.pScriptSourceDir, self.pScriptDir)
         self.updateTimer()
         self.updateProgressBar()
 
@@ -223,15 +310,15 @@ class cadastreImport(QObject):
         scriptList = [
             {
                 'title': u'Création des tables',
-                'script': '%s' % os.path.join(self.pScriptDir, 'commun_create_metier.sql')
+                'script': 'commun_create_metier.sql'
             },
             {
                 'title': u'Création des tables edigeo',
-                'script': '%s' % os.path.join(self.pScriptDir, 'edigeo_create_import_tables.sql')
+                'script': 'edigeo_create_import_tables.sql'
             },
             {
                 'title': u'Ajout de la nomenclature',
-                'script': '%s' % os.path.join(self.pScriptDir, 'commun_insert_nomenclatures.sql')
+                'script': 'commun_insert_nomenclatures.sql'
             }
         ]
 
@@ -241,8 +328,7 @@ class cadastreImport(QObject):
                 self.dialog.subStepLabel.setText(item['title'])
                 self.qc.updateLog('%s' % item['title'])
                 self.updateProgressBar()
-                self.replaceParametersInScript(s, replaceDict)
-                self.executeSqlScript(s, 'constraints' in item)
+                self.executeSqlScript(s, 'constraints' in item, replaceDict=replaceDict)
                 if 'constraints' in item:
                     self.hasConstraints = item['constraints']
             self.updateProgressBar()
@@ -258,7 +344,8 @@ class cadastreImport(QObject):
         # List all the tables which have been created between plugin versions
         newTables = [
             'geo_tronroute',
-            'commune_majic'
+            'commune_majic',
+            'majic_import_fichier'
         ]
 
         # Replace dictionnary
@@ -271,17 +358,16 @@ class cadastreImport(QObject):
             if self.qc.checkDatabaseForExistingTable(table, self.dialog.schema):
                 continue
             # Build path the the SQL creation file and continue if it does not exists
-            s = '%s' % os.path.join(self.pScriptDir, 'update/create_%s.sql' % table)
-            if not os.path.exists(s):
+            s = 'updates/create_%s.sql' % table
+            if not self.scripts.exists(s):
                 continue
-            self.replaceParametersInScript(s, replaceDict)
-            self.executeSqlScript(s, False)
+            self.executeSqlScript(s, False, replaceDict=replaceDict)
 
     def importMajic(self):
 
         # Log
         jobTitle = u'MAJIC'
-        self.beginJobLog(13, jobTitle)
+        self.beginJobLog(17, jobTitle)
 
         # dict for parameters replacement
         replaceDict = self.replaceDict.copy()
@@ -289,10 +375,21 @@ class cadastreImport(QObject):
         # missingMajicFiles = False
 
         scriptList = []
+
+        # Compare the files with the ones of the previous import of the lot
+        if self.majicIncrementalImport:
+            scriptList.append(
+                {
+                    'title': u'Comparaison avec les fichiers déjà importés',
+                    'method': self.checkMajicFingerprints,
+                    'resume': False
+                }
+            )
+
         scriptList.append(
             {
                 'title': u'Suppression des contraintes',
-                'script': os.path.join(self.pScriptDir, 'commun_suppression_contraintes.sql'),
+                'script': 'commun_suppression_contraintes.sql',
                 'constraints': False,
                 'divide': True
             }
@@ -303,13 +400,14 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Purge des données MAJIC',
-                    'script': os.path.join(self.pScriptDir, 'majic3_purge_donnees.sql')
+                    'script': 'majic3_purge_donnees.sql',
+                    'incremental': True
                 }
             )
             scriptList.append(
                 {
                     'title': u'Purge des données brutes',
-                    'script': os.path.join(self.pScriptDir, 'majic3_purge_donnees_brutes.sql')
+                    'script': 'majic3_purge_donnees_brutes.sql'
                 }
             )
 
@@ -317,12 +415,32 @@ class cadastreImport(QObject):
         scriptList.append(
             {
                 'title': u'Suppression des indexes',
-                'script': os.path.join(self.pScriptDir, 'majic3_drop_indexes.sql')
+                'script': 'majic3_drop_indexes.sql'
             }
         )
 
+        # Partition raw tables by record type, only if asked
+        # since it replaces the tables of the database
+        if self.majicRawPartitions and self.dialog.dbType == 'postgis':
+            scriptList.append(
+                {
+                    'title': u'Partitionnement des tables brutes',
+                    'method': self.partitionMajicRawTables
+                }
+            )
+
+        # Keep raw data out of the WAL (PostGIS) or of the database file (Spatialite)
+        if self.unloggedImportTables:
+            scriptList.append(
+                {
+                    'title': u'Tables brutes non journalisées',
+                    'method': self.setMajicRawTablesUnlogged
+                }
+            )
+
         # Import MAJIC files into database
-        # No use of COPY FROM to allow import into distant databases
+        # COPY FROM STDIN for PostGIS (also works for distant databases)
+        # or INSERT queries as a fallback
         importScript = {
             'title': u'Import des fichiers majic',
             'method': self.importMajicIntoDatabase
@@ -333,17 +451,38 @@ class cadastreImport(QObject):
         scriptList.append(
             {
                 'title': u'Mise en forme des données',
-                'script': os.path.join(self.pScriptDir, '%s/majic3_formatage_donnees.sql' % self.dialog.dataVersion),
-                'divide': True
+                'script': '%s/majic3_formatage_donnees.sql' % self.dialog.dataVersion,
+                'divide': True,
+                'parallel': True,
+                'incremental': True
             }
         )
 
+        # Record the imported files for the next incremental import
+        if self.majicIncrementalImport:
+            scriptList.append(
+                {
+                    'title': u'Enregistrement des fichiers importés',
+                    'method': self.saveMajicFingerprints
+                }
+            )
+
         # Remove MAJIC raw data
         if self.removeMajicRawData:
             scriptList.append(
                 {
                     'title': u'Purge des données brutes',
-                    'script': os.path.join(self.pScriptDir, 'majic3_purge_donnees_brutes.sql')
+                    'script': 'majic3_purge_donnees_brutes.sql'
+                }
+            )
+
+        # Journal again the raw tables left UNLOGGED by this import
+        # or by a previous one, once they are purged
+        if self.dialog.dbType == 'postgis':
+            scriptList.append(
+                {
+                    'title': u'Tables brutes journalisées',
+                    'method': self.setMajicRawTablesLogged
                 }
             )
 
@@ -354,14 +493,14 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Suppression des indexes',
-                    'script': os.path.join(self.pScriptDir, 'edigeo_drop_indexes.sql')
+                    'script': 'edigeo_drop_indexes.sql'
                 }
             )
 
             scriptList.append(
                 {
                     'title': u'Mise à jour des liens EDIGEO',
-                    'script': os.path.join(self.pScriptDir, 'edigeo_update_majic_link.sql'),
+                    'script': 'edigeo_update_majic_link.sql',
                     'divide': True
                 }
             )
@@ -369,7 +508,7 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Création des indexes spatiaux',
-                    'script': os.path.join(self.pScriptDir, 'edigeo_create_indexes.sql'),
+                    'script': 'edigeo_create_indexes.sql',
                     'divide': True
                 }
             )
@@ -379,7 +518,7 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Ajout de la table parcelle_info',
-                    'script': '%s' % os.path.join(self.pScriptDir, 'edigeo_create_table_parcelle_info_majic.sql'),
+                    'script': 'edigeo_create_table_parcelle_info_majic.sql',
                     'divide': False
                 }
             )
@@ -388,25 +527,31 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Ajout des contraintes',
-                    'script': os.path.join(self.pScriptDir, 'commun_creation_contraintes.sql'),
+                    'script': 'commun_creation_contraintes.sql',
                     'constraints': True,
                     'divide': True
                 }
             )
 
+        # Skip the steps done during a previous run of the same import
+        self.markResumedSteps(jobTitle, scriptList, replaceDict)
+
         # Run previously defined SQL queries
         for item in scriptList:
             if self.go:
                 self.dialog.subStepLabel.setText(item['title'])
                 self.qc.updateLog('%s' % item['title'])
-                if 'script' in item:
+                if 'done' in item:
+                    self.qc.updateLog(u'  - étape déjà réalisée')
+                    self.updateProgressBar()
+                elif 'script' in item:
                     s = item['script']
-                    self.replaceParametersInScript(s, replaceDict)
                     self.updateProgressBar()
+                    tables = self.majicDirtyTables if 'incremental' in item else None
                     if 'divide' in item:
-                        self.executeSqlScript(s, True, 'constraints' in item)
+                        self.executeSqlScript(s, True, 'constraints' in item, tables, 'parallel' in item, replaceDict)
                     else:
-                        self.executeSqlScript(s, False, 'constraints' in item)
+                        self.executeSqlScript(s, False, 'constraints' in item, tables, replaceDict=replaceDict)
                 else:
                     self.updateProgressBar()
                     item['method']()
@@ -415,6 +560,7 @@ class cadastreImport(QObject):
                         and not self.dialog.dbType == 'spatialite':
                     self.hasConstraints = item['constraints']
 
+                self.saveCheckpoint(jobTitle, item, replaceDict)
                 self.updateTimer()
             self.updateProgressBar()
 
@@ -438,41 +584,20 @@ class cadastreImport(QObject):
         majicFilesKey = []
         majicFilesFound = {}
 
-        # Regex to remove all chars not in the range in ASCII table from space to ~
-        # http://www.catonmat.net/blog/my-favorite-regex/
-        r = re.compile(r"[^ -~]")
-
-        # Loop through all majic files
-
-        # 1st path to build the complet liste for each majic source type (nbat, bati, lloc, etc.)
-        # and read 1st line to get departement and direction to compare to inputs
+        # Index all the majic files in one walk through the source directory
+        # with their type (nbat, bati, lloc, etc.) and departement and direction
+        # to compare to inputs. The index is cached in the temporary directory
+        majicFilesIndex = getMajicSourceIndex(
+            self.dialog.majicSourceDir,
+            {a['value']: a['table'] for a in self.majicSourceFileNames},
+            self.tempDir
+        )
         depdirs = {}
         for item in self.majicSourceFileNames:
-            table = item['table']
-            value = item['value']
-            # Get majic files for item
-            majList = []
-            for root, dirs, files in os.walk(self.dialog.majicSourceDir):
-                for i in files:
-                    if os.path.split(i)[1] == value:
-                        fpath = os.path.join(root, i)
-                        # Add file path to the list
-                        majList.append(fpath)
-
-                        # Store depdir for this file
-                        # avoid fantoir, as now it is given for the whole country
-                        if table == 'fanr':
-                            continue
-                        # Get depdir : first line with content
-                        with open(fpath) as fin:
-                            for a in fin:
-                                if len(a) < 4:
-                                    continue
-                                depdir = a[0:3]
-                                break
-                            depdirs[depdir] = True
-
-            majicFilesFound[table] = majList
+            majicFilesFound[item['table']] = [a['path'] for a in majicFilesIndex if a['table'] == item['table']]
+        for a in majicFilesIndex:
+            if a['depdir']:
+                depdirs[a['depdir']] = True
 
         # Check if some important majic files are missing
         fKeys = [a for a in majicFilesFound if majicFilesFound[a]]
@@ -533,39 +658,29 @@ class cadastreImport(QObject):
 
         # 2nd path to insert data
         depdir = '%s%s' % (self.dialog.edigeoDepartement, self.dialog.edigeoDirection)
+        majicFiles = []
         for item in self.majicSourceFileNames:
             table = item['table']
-            self.totalSteps += len(majicFilesFound[table])
-            processedFilesCount += len(majicFilesFound[table])
-            for fpath in majicFilesFound[table]:
+            majicFiles += [(table, fpath) for fpath in majicFilesFound[table]]
+        processedFilesCount += len(majicFiles)
+
+        # Incremental import: only reload the files of the changed tables
+        if self.majicChangedTables is not None:
+            majicFiles = [a for a in majicFiles if a[0] in self.majicChangedTables]
+        self.totalSteps += len(majicFiles)
+
+        importedInParallel = False
+        if self.canCopy and self.majicImportWorkers > 1 and len(majicFiles) > 1:
+            importedInParallel = self.importMajicFilesInParallel(majicFiles, depdir)
+        if not importedInParallel:
+            lastFiles = {table: i for i, (table, fpath) in enumerate(majicFiles)}
+            for i, (table, fpath) in enumerate(majicFiles):
                 self.qc.updateLog(fpath)
-
-                # read file content
-                with open(fpath, encoding='ascii', errors='replace') as fin:
-                    # Divide file into chuncks
-                    for a in self.chunk(fin, self.maxInsertRows):
-                        # Build sql INSERT query depending on database
-                        if self.dialog.dbType == 'postgis':
-                            sql = "BEGIN;"
-                            sql = CadastreCommon.setSearchPath(sql, self.dialog.schema)
-                            # Build INSERT list
-                            sql += '\n'.join(
-                                [
-                                    "INSERT INTO \"%s\" VALUES (%s);" % (
-                                        table,
-                                        self.connector.quoteString(r.sub(' ', x.strip('\r\n')))
-                                    ) for x in a if x and x[0:3] == depdir
-                                ]
-                            )
-                            sql += "COMMIT;"
-                            self.executeSqlQuery(sql)
-                        else:
-                            c = self.connector._get_cursor()
-                            c.executemany('INSERT INTO %s VALUES (?)' % table,
-                                          [(r.sub(' ', x.strip('\r\n')),) for x in a if x and x[0:3] == depdir])
-                            self.connector._commit()
-                            c.close()
-                            del c
+                self.importMajicFileIntoTable(fpath, table, depdir)
+                self.updateProgressBar()
+                # Forget the rows seen once the last file of the raw table is decoded
+                if self.majicDecoder and lastFiles[table] == i:
+                    self.majicDecoder.releaseSource(table)
 
         if not processedFilesCount:
             self.qc.updateLog(
@@ -576,6 +691,421 @@ class cadastreImport(QObject):
             )
             self.go = False
 
+    def checkMajicFingerprints(self):
+        """
+        Compute the size and fingerprint of each MAJIC file
+        and compare them with the ones recorded for the lot and year
+        during the previous import. Only the raw tables whose files changed,
+        and the formatted tables which depend on them, will be reloaded.
+        A file is only hashed when its size is the same as the recorded one
+        and its modification time is not (see compareMajicFile)
+        """
+        data = []
+        if self.dialog.hasMajicData:
+            sql = "SELECT type_fichier, fichier, taille, empreinte FROM %smajic_import_fichier WHERE lot = %s AND annee = %s" % (
+                self.replaceDict['[PREFIXE]'],
+                self.connector.quoteString(self.dialog.edigeoLot),
+                self.connector.quoteString(self.dialog.dataYear)
+            )
+            [header, data, rowCount, ok] = CadastreCommon.fetchDataFromSqlQuery(self.connector, sql)
+            if not ok:
+                data = []
+        previousFiles = {(a[0], a[1]): (int(a[2]), a[3] or '') for a in data}
+
+        majicFilesIndex = getMajicSourceIndex(
+            self.dialog.majicSourceDir,
+            {a['value']: a['table'] for a in self.majicSourceFileNames},
+            self.tempDir
+        )
+        self.majicFingerprints = []
+        changedTables = set()
+        for item in majicFilesIndex:
+            if not self.go:
+                return
+            fichier = os.path.relpath(item['path'], self.dialog.majicSourceDir).replace(os.sep, '/')
+            changed, fingerprint = compareMajicFile(
+                item['path'], item['size'], item['mtime'], previousFiles.pop((item['table'], fichier), None)
+            )
+            if changed:
+                changedTables.add(item['table'])
+            self.majicFingerprints.append((item['table'], fichier, item['size'], fingerprint))
+            QApplication.processEvents()
+
+        if not data:
+            if self.dialog.hasMajicData:
+                self.qc.updateLog(u'* Aucun import précédent enregistré pour ce lot : import complet')
+            return
+
+        # Tables with a new or changed file, or a file which has been removed
+        changedTables.update(a[0] for a in previousFiles)
+        self.majicChangedTables = set(
+            a['table'] for a in self.majicSourceFileNames if a['table'] in changedTables
+        )
+
+        # Formatted tables which depend on the changed raw tables
+        formatScript = '%s/majic3_formatage_donnees.sql' % self.dialog.dataVersion
+        self.majicDirtyTables = getMajicDependentTables(
+            self.scripts.getTemplate(formatScript), self.majicChangedTables
+        )
+
+        if self.majicChangedTables:
+            self.qc.updateLog(u'* Tables à recharger : %s' % ', '.join(sorted(self.majicDirtyTables)))
+        else:
+            self.qc.updateLog(u'* Aucun fichier MAJIC modifié depuis le dernier import de ce lot')
+
+    def saveMajicFingerprints(self):
+        """
+        Record the size and fingerprint of the imported MAJIC files for the lot
+        """
+        if not self.majicFingerprints:
+            return
+        table = '%smajic_import_fichier' % self.replaceDict['[PREFIXE]']
+        lot = self.connector.quoteString(self.dialog.edigeoLot)
+        annee = self.connector.quoteString(self.dialog.dataYear)
+        dateImport = self.connector.quoteString(datetime.now().isoformat())
+        sql = 'DELETE FROM %s WHERE lot = %s AND annee = %s;' % (table, lot, annee)
+        sql += 'INSERT INTO %s (lot, annee, fichier, type_fichier, taille, empreinte, date_import) VALUES %s;' % (
+            table,
+            ', '.join(
+                '(%s, %s, %s, %s, %s, %s, %s)' % (
+                    lot, annee, self.connector.quoteString(fichier), self.connector.quoteString(typeFichier),
+                    taille, self.connector.quoteString(empreinte), dateImport
+                ) for typeFichier, fichier, taille, empreinte in self.majicFingerprints
+            )
+        )
+        self.executeSqlQuery(sql)
+
+    def partitionMajicRawTables(self):
+        """
+        Partition the raw tables bati, nbat and pdll
+        by record type on PostgreSQL >= 11,
+        so that each formatting query only reads the rows it needs.
+        The tables are replaced once and stay partitioned:
+        the tables used by views are left as they are
+        """
+        if self.dialog.dbType != 'postgis' \
+                or self.connector.connection.server_version < 110000:
+            self.qc.updateLog(u'* Partitionnement des tables brutes ignoré : PostgreSQL 11 minimum')
+            return
+
+        sql = ''
+        for table in MAJIC_RAW_PARTITIONS:
+            # Only regular tables (relkind r) need to be partitioned
+            [header, data, rowCount, ok] = CadastreCommon.fetchDataFromSqlQuery(
+                self.connector,
+                "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = %s AND c.relname = %s" % (
+                    self.connector.quoteString(self.dialog.schema),
+                    self.connector.quoteString(table)
+                )
+            )
+            if not ok or rowCount != 1 or data[0][0] != 'r':
+                continue
+
+            # Dropping the table would drop its views
+            [header, data, rowCount, ok] = CadastreCommon.fetchDataFromSqlQuery(
+                self.connector,
+                "SELECT DISTINCT v.relname FROM pg_depend d "
+                "JOIN pg_rewrite r ON r.oid = d.objid "
+                "JOIN pg_class v ON v.oid = r.ev_class "
+                "WHERE d.refobjid = '\"%s\".\"%s\"'::regclass AND v.oid <> d.refobjid" % (
+                    self.dialog.schema, table
+                )
+            )
+            if not ok or rowCount:
+                self.qc.updateLog(u'* Table %s non partitionnée : utilisée par les vues %s' % (
+                    table, ', '.join(a[0] for a in data or [])
+                ))
+                continue
+
+            sql += majicRawPartitionSql(self.dialog.schema, table)
+
+        if sql:
+            self.qc.updateLog(u'* Partitionnement des tables brutes par type d\'enregistrement')
+            self.executeSqlQuery('BEGIN;%sCOMMIT;' % sql)
+
+    def setMajicRawTablesUnlogged(self):
+        """
+        Do not journal the MAJIC raw tables:
+        UNLOGGED tables on PostGIS, tables of the temporary
+        database of the connection on Spatialite, which take
+        precedence over the tables of the same name
+        """
+        tables = [a['table'] for a in self.majicSourceFileNames]
+        if self.dialog.dbType == 'postgis':
+            self.setTablesUnlogged(tables)
+        else:
+            self.executeSqlQuery(temporaryTablesSql(tables))
+
+    def setMajicRawTablesLogged(self):
+        """
+        Set the MAJIC raw tables of PostGIS back to LOGGED
+        """
+        self.setTablesUnlogged([a['table'] for a in self.majicSourceFileNames], False)
+
+    def setEdigeoImportTablesUnlogged(self):
+        """
+        Do not journal the EDIGEO import tables on PostGIS.
+        They are dropped at the end of the import
+        """
+        self.setTablesUnlogged(self.edigeoImportTables)
+
+    def setTablesUnlogged(self, tables, unlogged=True):
+        """
+        Set the given PostGIS tables, or their partitions, as UNLOGGED.
+        Their data is not written in the WAL nor replicated,
+        and is lost after a crash of the server.
+        If unlogged is False, set the UNLOGGED ones back to LOGGED
+        """
+        sql = tablesPersistenceSql(self.dialog.schema, tables, unlogged)
+        [header, data, rowCount, ok] = CadastreCommon.fetchDataFromSqlQuery(self.connector, sql)
+        if not ok or not rowCount:
+            return
+
+        sql = setTablesPersistenceSql(self.dialog.schema, [line[0] for line in data], unlogged)
+        if unlogged:
+            self.qc.updateLog(u'* %s tables non journalisées' % rowCount)
+        else:
+            self.qc.updateLog(u'* %s tables de nouveau journalisées' % rowCount)
+        self.executeSqlQuery(sql)
+
+    def importMajicFileIntoTable(self, fpath, table, depdir):
+        """
+        Bulk import the lines of one majic file
+        into the given raw table.
+        Use COPY FROM STDIN when the connector allows it,
+        INSERT queries by chunks otherwise
+        """
+        if not self.go:
+            return
+
+        if self.majicDecoder:
+            self.decodeMajicFileIntoTables(fpath, table, depdir)
+            return
+
+        if self.canCopy:
+            try:
+                copyMajicFile(self.connector.connection, fpath, self.dialog.schema, table, depdir)
+            except self.connector.error_types() as e:
+                e = DbError(e, 'COPY "%s"' % table)
+                DlgDbError.showError(e, self.dialog)
+                self.go = False
+                self.qc.updateLog(u"<b>Erreur lors de l'import de %s</b>" % fpath)
+                self.qc.updateLog(e.msg)
+            except Exception as e:
+                self.connector._rollback()
+                self.stopOnMajicFileError(fpath, e)
+            return
+
+        # read file content
+        try:
+            with openMajicFile(fpath) as fin:
+                lines = majicLines(fin, depdir)
+
+                # Divide file into chuncks
+                for a in self.chunk(lines, self.maxInsertRows):
+                    # Build sql INSERT query depending on database
+                    if self.dialog.dbType == 'postgis':
+                        sql = "BEGIN;"
+                        sql = CadastreCommon.setSearchPath(sql, self.dialog.schema)
+                        # Build INSERT list
+                        sql += '\n'.join(
+                            [
+                                "INSERT INTO \"%s\" VALUES (%s);" % (
+                                    table,
+                                    self.connector.quoteString(x)
+                                ) for x in a if x is not None
+                            ]
+                        )
+                        sql += "COMMIT;"
+                        self.executeSqlQuery(sql)
+                    else:
+                        c = self.connector._get_cursor()
+                        c.executemany('INSERT INTO %s VALUES (?)' % table,
+                                      [(x,) for x in a if x is not None])
+                        self.connector._commit()
+                        c.close()
+                        del c
+        except Exception as e:
+            self.connector._rollback()
+            self.stopOnMajicFileError(fpath, e)
+
+    def stopOnMajicFileError(self, fpath, e):
+        """
+        Stop the import after an error raised while reading
+        or decoding a majic file (archive, encoding, etc.)
+        """
+        self.go = False
+        self.qc.updateLog(u"<b>Erreur lors de l'import de %s</b> <p>%s</p>" % (fpath, format(e)))
+
+    def decodeMajicFileIntoTables(self, fpath, table, depdir):
+        """
+        Decode the lines of one majic file
+        and bulk import the rows into the formatted tables.
+        Use COPY FROM STDIN when the connector allows it,
+        executemany by chunks otherwise
+        """
+        if self.canCopy:
+            try:
+                copyDecodedMajicFile(
+                    self.connector.connection, fpath, self.dialog.schema, table, depdir,
+                    self.majicDecoder, self.maxInsertRows
+                )
+            except self.connector.error_types() as e:
+                e = DbError(e, 'COPY FROM %s' % fpath)
+                DlgDbError.showError(e, self.dialog)
+                self.go = False
+                self.qc.updateLog(e.msg)
+            except Exception as e:
+                self.connector._rollback()
+                self.stopOnMajicFileError(fpath, e)
+            return
+
+        c = self.connector._get_cursor()
+        # psycopg2 uses the format paramstyle, sqlite3 the qmark one
+        placeholder = '%s' if self.dialog.dbType == 'postgis' else '?'
+
+        def writeRows(target, columns, rows):
+            c.executemany(
+                'INSERT INTO %s%s (%s) VALUES (%s)' % (
+                    self.replaceDict['[PREFIXE]'],
+                    target,
+                    ', '.join(columns),
+                    ', '.join([placeholder] * len(columns))
+                ),
+                rows
+            )
+
+        try:
+            decodeMajicFile(fpath, table, depdir, self.majicDecoder, writeRows, self.maxInsertRows)
+            self.connector._commit()
+        except Exception as e:
+            self.connector._rollback()
+            self.stopOnMajicFileError(fpath, e)
+        finally:
+            c.close()
+
+    def openPostgisConnections(self, nbWorkers, autocommit=False):
+        """
+        Open nbWorkers psycopg2 connections to the database,
+        with synchronous_commit off and the search_path of the import.
+        On error, the connections already opened are closed
+        and the error is raised
+        """
+        import psycopg2
+
+        connectionInfo = self.connector.uri().connectionInfo(True)
+        connections = []
+        try:
+            for i in range(nbWorkers):
+                connection = psycopg2.connect(connectionInfo)
+                connections.append(connection)
+                connection.autocommit = autocommit
+                with connection.cursor() as cursor:
+                    cursor.execute("SET synchronous_commit TO off;")
+                    cursor.execute(CadastreCommon.setSearchPath('', self.dialog.schema))
+                if not autocommit:
+                    connection.commit()
+        except psycopg2.Error:
+            for connection in connections:
+                connection.close()
+            raise
+
+        return connections
+
+    def importMajicFilesInParallel(self, majicFiles, depdir):
+        """
+        Import majic files concurrently with COPY FROM STDIN,
+        each worker thread using its own database connection.
+        Progress and log are updated from the main thread
+        as soon as a file is imported.
+        Returns False if the worker connections cannot be opened
+        """
+        import psycopg2
+
+        # Open the worker connections
+        nbWorkers = min(self.majicImportWorkers, len(majicFiles))
+        try:
+            openedConnections = self.openPostgisConnections(nbWorkers)
+        except Exception as e:
+            self.qc.updateLog(
+                u"Impossible d'ouvrir %s connexions pour l'import MAJIC en parallèle, import séquentiel : %s" % (
+                    nbWorkers,
+                    e
+                )
+            )
+            return False
+        connections = queue.Queue()
+        for connection in openedConnections:
+            connections.put(connection)
+
+        self.qc.updateLog(u'* Import de %s fichiers MAJIC avec %s connexions' % (len(majicFiles), nbWorkers))
+        cancel = threading.Event()
+
+        def importFile(table, fpath):
+            if cancel.is_set():
+                return 0
+            connection = connections.get()
+            try:
+                if self.majicDecoder:
+                    return copyDecodedMajicFile(
+                        connection, fpath, self.dialog.schema, table, depdir,
+                        self.majicDecoder, self.maxInsertRows
+                    )
+                return copyMajicFile(connection, fpath, self.dialog.schema, table, depdir)
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                connections.put(connection)
+
+        # Import the biggest files first to balance the workers load
+        majicFiles = sorted(majicFiles, key=lambda a: getMajicFileSize(a[1]), reverse=True)
+        remainingFiles = {}
+        for table, fpath in majicFiles:
+            remainingFiles[table] = remainingFiles.get(table, 0) + 1
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with ThreadPoolExecutor(max_workers=nbWorkers) as executor:
+                futures = {
+                    executor.submit(importFile, table, fpath): (table, fpath)
+                    for table, fpath in majicFiles
+                }
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        table, fpath = futures[future]
+                        remainingFiles[table] -= 1
+                        if self.majicDecoder and not remainingFiles[table]:
+                            self.majicDecoder.releaseSource(table)
+                        try:
+                            rowCount = future.result()
+                        except psycopg2.Error as e:
+                            e = DbError(e, 'COPY FROM %s' % fpath)
+                            self.go = False
+                            self.qc.updateLog(u"<b>Erreur lors de l'import de %s</b>" % fpath)
+                            self.qc.updateLog(e.msg)
+                            continue
+                        except Exception as e:
+                            self.stopOnMajicFileError(fpath, e)
+                            continue
+                        self.qc.updateLog(u'%s (%s lignes)' % (fpath, rowCount))
+                        self.updateProgressBar()
+                    if not self.go:
+                        # Stop the remaining imports after the first error
+                        cancel.set()
+                        for future in pending:
+                            future.cancel()
+                    QApplication.processEvents()
+        finally:
+            QApplication.restoreOverrideCursor()
+            for connection in openedConnections:
+                connection.close()
+
+        return True
+
     def importEdigeo(self):
         """
         Import EDIGEO data
@@ -595,14 +1125,6 @@ class cadastreImport(QObject):
                           )
         self.updateProgressBar()
 
-        if self.go:
-            # unzip edigeo files in temp dir
-            self.dialog.subStepLabel.setText('Extraction des fichiers')
-            self.updateProgressBar()
-            self.unzipFolderContent(self.dialog.edigeoSourceDir)
-            self.updateTimer()
-        self.updateProgressBar()
-
         scriptList = []
         replaceDict = self.replaceDict.copy()
 
@@ -612,8 +1134,9 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Ajout de la table geo_unite_foncieres',
-                    'script': '%s' % os.path.join(self.pScriptDir, 'edigeo_create_table_unite_fonciere.sql'),
-                    'constraints': False
+                    'script': 'edigeo_create_table_unite_fonciere.sql',
+                    'constraints': False,
+                    'replaceDict': replaceDict
                 }
             )
 
@@ -621,9 +1144,10 @@ class cadastreImport(QObject):
         scriptList.append(
             {
                 'title': u'Suppression des contraintes',
-                'script': '%s' % os.path.join(self.pScriptDir, 'commun_suppression_contraintes.sql'),
+                'script': 'commun_suppression_contraintes.sql',
                 'constraints': False,
-                'divide': True
+                'divide': True,
+                'replaceDict': replaceDict
             }
         )
 
@@ -631,11 +1155,17 @@ class cadastreImport(QObject):
         if self.dialog.hasData:
             replaceDict['2154'] = self.targetSrid
             # Drop edigeo data
-            self.dropEdigeoRawData()
+            scriptList.append(
+                {
+                    'title': u'Suppression des tables edigeo',
+                    'method': self.dropEdigeoRawData
+                }
+            )
             scriptList.append(
                 {
                     'title': u'Création des tables edigeo',
-                    'script': '%s' % os.path.join(self.pScriptDir, 'edigeo_create_import_tables.sql')
+                    'script': 'edigeo_create_import_tables.sql',
+                    'replaceDict': replaceDict
                 }
             )
         # Suppression des indexes
@@ -643,65 +1173,66 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Suppression des indexes',
-                    'script': '%s' % os.path.join(self.pScriptDir, 'edigeo_drop_indexes.sql')
+                    'script': 'edigeo_drop_indexes.sql',
+                    'replaceDict': replaceDict
                 }
             )
 
-        for item in scriptList:
-            if self.go:
-                self.dialog.subStepLabel.setText(item['title'])
-                self.qc.updateLog('%s' % item['title'])
-                s = item['script']
-                self.replaceParametersInScript(s, replaceDict)
-                self.updateProgressBar()
-                self.executeSqlScript(s, 'divide' in item, 'constraints' in item)
-                if 'constraints' in item:
-                    self.hasConstraints = item['constraints']
-                self.updateTimer()
-            self.updateProgressBar()
+        # Keep the import tables out of the WAL
+        if self.unloggedImportTables and self.dialog.dbType == 'postgis':
+            scriptList.append(
+                {
+                    'title': u'Tables edigeo non journalisées',
+                    'method': self.setEdigeoImportTablesUnlogged
+                }
+            )
 
-        # import edigeo *.thf and *.vec files into database
-        if self.go:
-            self.dialog.subStepLabel.setText('Import des fichiers')
-            self.updateProgressBar()
-            self.importAllEdigeoToDatabase()
-            self.updateTimer()
-        self.updateProgressBar()
+        # unzip edigeo files in temp dir
+        # and import edigeo *.thf and *.vec files into database
+        scriptList.append(
+            {
+                'title': u'Import des fichiers',
+                'method': self.importEdigeoFiles
+            }
+        )
 
         # Format edigeo data
         replaceDict = self.replaceDict.copy()
         replaceDict['[DEPDIR]'] = '%s%s' % (self.dialog.edigeoDepartement, self.dialog.edigeoDirection)
 
-        scriptList = []
-
         scriptList.append(
             {
                 'title': u'Mise en forme des données',
-                'script': os.path.join(self.pScriptDir, 'edigeo_formatage_donnees.sql'),
-                'divide': True
+                'script': 'edigeo_formatage_donnees.sql',
+                'divide': True,
+                'parallel': True,
+                'replaceDict': replaceDict
             }
         )
 
         scriptList.append(
             {
                 'title': u'Placement des étiquettes',
-                'script': os.path.join(self.pScriptDir, 'edigeo_add_labels_xy.sql')
+                'script': 'edigeo_add_labels_xy.sql',
+                'replaceDict': replaceDict
             }
         )
         scriptList.append(
             {
                 'title': u'Création des indexes spatiaux',
-                'script': os.path.join(self.pScriptDir, 'edigeo_create_indexes.sql'),
-                'divide': True
+                'script': 'edigeo_create_indexes.sql',
+                'divide': True,
+                'replaceDict': replaceDict
             }
         )
 
         scriptList.append(
             {
                 'title': u'Ajout des contraintes',
-                'script': os.path.join(self.pScriptDir, 'commun_creation_contraintes.sql'),
+                'script': 'commun_creation_contraintes.sql',
                 'constraints': True,
-                'divide': True
+                'divide': True,
+                'replaceDict': replaceDict
             }
         )
 
@@ -712,7 +1243,8 @@ class cadastreImport(QObject):
                 and self.dialog.dbType == 'postgis':
             scriptList.append(
                 {'title': u'Création Unités foncières',
-                 'script': os.path.join(self.pScriptDir, 'edigeo_unites_foncieres_%s.sql' % self.dialog.dbType)
+                 'script': 'edigeo_unites_foncieres_%s.sql' % self.dialog.dbType,
+                 'replaceDict': replaceDict
                  }
             )
 
@@ -722,7 +1254,8 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Ajout de la table parcelle_info',
-                    'script': '%s' % os.path.join(self.pScriptDir, 'edigeo_create_table_parcelle_info_majic.sql')
+                    'script': 'edigeo_create_table_parcelle_info_majic.sql',
+                    'replaceDict': replaceDict
                 }
             )
         else:
@@ -730,33 +1263,101 @@ class cadastreImport(QObject):
             scriptList.append(
                 {
                     'title': u'Ajout de la table parcelle_info',
-                    'script': '%s' % os.path.join(self.pScriptDir, 'edigeo_create_table_parcelle_info_simple.sql')
+                    'script': 'edigeo_create_table_parcelle_info_simple.sql',
+                    'replaceDict': replaceDict
                 }
             )
 
+        # drop edigeo raw data
+        scriptList.append(
+            {
+                'title': u'Suppression des fichiers temporaires',
+                'method': self.dropEdigeoRawData
+            }
+        )
+
+        # Skip the steps done during a previous run of the same import
+        self.markResumedSteps(jobTitle, scriptList)
+
         for item in scriptList:
             if self.go:
                 self.dialog.subStepLabel.setText(item['title'])
                 self.qc.updateLog('%s' % item['title'])
-                s = item['script']
-                self.replaceParametersInScript(s, replaceDict)
                 self.updateProgressBar()
+                if 'done' in item:
+                    self.qc.updateLog(u'  - étape déjà réalisée')
+                elif 'script' in item:
+                    s = item['script']
+                    self.executeSqlScript(
+                        s, 'divide' in item, 'constraints' in item, None, 'parallel' in item, item['replaceDict']
+                    )
+                else:
+                    item['method']()
 
-                self.executeSqlScript(s, 'divide' in item, 'constraints' in item)
                 if 'constraints' in item:
                     self.hasConstraints = item['constraints']
 
+                self.saveCheckpoint(jobTitle, item, item.get('replaceDict'))
                 self.updateTimer()
-                self.updateProgressBar()
-
-        # drop edigeo raw data
-        self.dialog.subStepLabel.setText('Suppression des fichiers temporaires')
-        self.dropEdigeoRawData()
-        self.updateTimer()
-        self.updateProgressBar()
+            self.updateProgressBar()
 
         return None
 
+    def importEdigeoFiles(self):
+        """
+        Extract the EDIGEO archives into the temporary folder
+        while importing the *.thf files already extracted,
+        or list their content to read them in place,
+        then import the *.vec files into database
+        """
+        if self.edigeoVirtualFiles:
+            self.dialog.subStepLabel.setText('Lecture des archives')
+            self.listEdigeoArchiveContent(self.dialog.edigeoSourceDir)
+            self.updateTimer()
+
+        # import edigeo *.thf and *.vec files into database
+        if self.go:
+            self.dialog.subStepLabel.setText('Import des fichiers')
+            self.importAllEdigeoToDatabase()
+
+    def listEdigeoArchiveContent(self, path):
+        """
+        List the EDIGEO files of the archives found in path,
+        nested archives included, as GDAL virtual paths
+        (/vsizip/, /vsitar/ and /vsibz2/): nothing is extracted
+        """
+        import tarfile
+        import zipfile
+
+        self.qc.updateLog(u'* Lecture des archives sans extraction')
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            self.edigeoArchiveFiles = listEdigeoArchiveFiles(path, ['thf', 'vec'])
+            self.qc.updateLog(u'{} fichier(s) THF dans les archives de {}'.format(
+                len(self.edigeoArchiveFiles['thf']),
+                path
+            ))
+        except (IOError, zipfile.BadZipFile, tarfile.TarError) as e:
+            self.go = False
+            self.qc.updateLog(u"<b>Erreur lors de la lecture des archives EDIGEO</b> : %s" % e)
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def getEdigeoSourceFiles(self, extension):
+        """
+        EDIGEO files of the given extension: plain files of the source directory,
+        and files of the archives, extracted in the temporary folder
+        or read in place
+        """
+        # Get plain files in source directory
+        files = self.list_files_in_directory(self.dialog.edigeoSourceDir, [extension])
+        if self.edigeoVirtualFiles:
+            files += self.edigeoArchiveFiles.get(extension, [])
+        else:
+            # Get files which have been uncompressed by plugin in temp folder
+            files += self.list_files_in_directory(self.edigeoPlainDir, [extension])
+        return list(set(files))
+
     def endImport(self):
         """
         Actions done when import has finished
@@ -783,9 +1384,10 @@ class cadastreImport(QObject):
         self.dialog.subStepLabel.setText(u'Suppression des données temporaires')
         self.updateProgressBar()
         tempFolderList = [
-            self.pScriptDir,
             self.edigeoPlainDir,
         ]
+        if self.pScriptDir:
+            self.qc.updateLog(u'Scripts SQL exécutés : %s' % self.pScriptDir)
         delmsg = ""
         try:
             for rep in tempFolderList:
@@ -828,8 +1430,11 @@ class cadastreImport(QObject):
                 sql += "SELECT UpdateLayerStatistics('%s', 'geom');" % layer
             self.executeSqlQuery(sql)
 
+        self.writeSqlProfile()
+
         if self.go:
             msg = u"Import terminé"
+            self.removeCheckpoint()
         else:
             msg = u"Des erreurs ont été rencontrées pendant l'import. Veuillez consulter le log."
 
@@ -840,35 +1445,130 @@ class cadastreImport(QObject):
         return None
 
     #
-    # TOOLS
+    # CHECKPOINTS
     #
 
-    def copyFilesToTemp(self, source, target):
+    def getCheckpointParameters(self):
         """
-        Copy cadastre scripts
-        into a temporary folder
+        Get the parameters which identify an import
+        and must not change to resume it
         """
-        if self.go:
+        return {
+            'dbType': self.dialog.dbType,
+            'connectionName': self.dialog.connectionName,
+            'schema': self.dialog.schema,
+            'dataVersion': self.dialog.dataVersion,
+            'dataYear': self.dialog.dataYear,
+            'edigeoLot': self.dialog.edigeoLot,
+            'edigeoDepartement': self.dialog.edigeoDepartement,
+            'edigeoDirection': self.dialog.edigeoDirection,
+            'majicSourceDir': self.dialog.majicSourceDir if self.dialog.doMajicImport else None,
+            'edigeoSourceDir': self.dialog.edigeoSourceDir if self.dialog.doEdigeoImport else None
+        }
 
-            self.qc.updateLog(u'* Copie du répertoire %s' % source)
+    def loadCheckpoint(self):
+        """
+        Get the checkpoint file of the import in the temporary folder.
+        When resuming, read the steps completed during the previous run
+        """
+        parameters = self.checkpoint['parameters']
+        key = hashlib.md5(json.dumps(parameters, sort_keys=True).encode('utf-8')).hexdigest()
+        self.checkpointPath = os.path.join(self.tempDir, 'cadastre_import_checkpoint_%s.json' % key)
+        if not self.resumeImport or not os.path.exists(self.checkpointPath):
+            return
+        try:
+            with open(self.checkpointPath, encoding='utf-8') as fin:
+                checkpoint = json.load(fin)
+        except (OSError, ValueError):
+            return
+        if checkpoint.get('parameters') == parameters:
+            self.checkpoint = checkpoint
+
+    def markResumedSteps(self, job, scriptList, replaceDict=None):
+        """
+        Give an identifier to each step of the job and flag as done
+        every step up to the last one completed during the previous run,
+        with the same replacement parameters
+        """
+        occurrences = {}
+        for item in scriptList:
+            name = os.path.basename(item['script']) if 'script' in item else item['method'].__name__
+            stepId = '%s|%s' % (item['title'], name)
+            occurrences[stepId] = occurrences.get(stepId, 0) + 1
+            item['step'] = '%s#%s' % (stepId, occurrences[stepId])
+
+        steps = {item['step']: item for item in scriptList}
+        done = set()
+        for a in self.checkpoint['steps'].get(job, []):
+            item = steps.get(a['step'])
+            if item and a['parameters'] == item.get('replaceDict', replaceDict):
+                done.add(a['step'])
+        last = -1
+        for i, item in enumerate(scriptList):
+            if item['step'] in done:
+                last = i
+        for item in scriptList[:last + 1]:
+            if item.get('resume', True):
+                item['done'] = True
+        if last >= 0:
+            self.qc.updateLog(u"* Reprise de l'import après l'étape : %s" % scriptList[last]['title'])
+
+        # Steps of this run
+        self.checkpoint['steps'][job] = [
+            a for a in self.checkpoint['steps'].get(job, [])
+            if a['step'] in done
+        ]
 
-            QApplication.setOverrideCursor(Qt.WaitCursor)
+    def saveCheckpoint(self, job, item, replaceDict=None):
+        """
+        Record a successful step with its replacement parameters
+        in the checkpoint file
+        """
+        if not self.go or 'done' in item or not self.checkpointPath:
+            return
+        self.checkpoint['steps'].setdefault(job, []).append({
+            'step': item['step'],
+            'title': item['title'],
+            'parameters': replaceDict
+        })
+        try:
+            with open(self.checkpointPath, 'w', encoding='utf-8') as fout:
+                json.dump(self.checkpoint, fout, indent=2)
+        except OSError as e:
+            self.qc.updateLog(u"<b>Impossible d'enregistrer l'avancement de l'import : %s</b>" % e)
 
-            # copy script directory
+    def removeCheckpoint(self):
+        """
+        Remove the checkpoint file once the import has succeeded
+        """
+        if self.checkpointPath and os.path.exists(self.checkpointPath):
             try:
-                dir_util.copy_tree(source, target)
-                os.chmod(target, 0o777)
-            except IOError as e:
-                msg = u"<b>Erreur lors de la copie des scripts d'import: %s</b>" % e
-                QMessageBox.information(self.dialog,
-                                        "Cadastre", msg)
-                self.go = False
-                return msg
+                os.remove(self.checkpointPath)
+            except OSError:
+                pass
 
-            finally:
-                QApplication.restoreOverrideCursor()
+    #
+    # TOOLS
+    #
 
-        return None
+    def connectorCanCopy(self):
+        """
+        Check if the database connector can stream data
+        with COPY FROM STDIN (psycopg2 cursors for PostGIS)
+        """
+        if self.dialog.dbType != 'postgis':
+            return False
+
+        c = None
+        try:
+            c = self.connector._get_cursor()
+            return hasattr(c, 'copy_expert')
+        except BaseError:
+            return False
+        finally:
+            if c:
+                c.close()
+                del c
 
     @staticmethod
     def list_files_in_directory(path, extension_list=None, invert=False):
@@ -912,137 +1612,134 @@ class cadastreImport(QObject):
     def unzipFolderContent(self, path):
         """
         Scan content of specified path
-        and unzip all content into a single folder
+        and unzip all content into the temporary folder
         """
         if self.go:
             QApplication.setOverrideCursor(Qt.WaitCursor)
-            self.qc.updateLog(u'* Décompression des fichiers')
-
-            # get all the zip files
-            zipFileList = self.list_files_in_directory(path, ['zip'])
-
-            # unzip all files
-            import tarfile
-            import zipfile
             try:
-                # unzip all zip in source folder
-                for z in zipFileList:
-                    # Extract file from edigeoDir into edigeoPlainDir
-                    with zipfile.ZipFile(z) as azip:
-                        azip.extractall(self.edigeoPlainDir)
-
-                # unzip all new zip in edigeoPlainDir
-                inner_zips_pattern = os.path.join(self.edigeoPlainDir, "*.zip")
-                i = 0
-                for filename in glob.glob(inner_zips_pattern):
-                    inner_folder = filename[:-4] + '_%s' % i
-
-                    with zipfile.ZipFile(filename) as myzip:
-                        myzip.extractall(inner_folder)
-                    try:
-                        os.remove(filename)
-                    except OSError:
-                        self.qc.updateLog("<b>Erreur lors de la suppression de %s</b>" % str(filename))
-                        pass  # in Windows, sometime file is not unlocked
-                    i += 1
-
-                i = 0
-                # untar all tar.bz2 in source folder
-                self.qc.updateLog('* Recherche des fichiers .bz2')
-                tarFileListA = self.list_files_in_directory(path, ['bz2'])
-                self.qc.updateLog("{} fichier(s) .bz2 dans {}".format(len(tarFileListA), path))
-                for z in tarFileListA:
-                    with tarfile.open(z) as t:
-                        t.extractall(os.path.join(self.edigeoPlainDir, 'tar_%s' % i))
-                        i += 1
-                        t.close()
-
-                # untar all new tar.bz2 found in self.edigeoPlainDir
-                tarFileListB = self.list_files_in_directory(self.edigeoPlainDir, ['bz2'])
-                self.qc.updateLog("{} fichier(s) .bz2 dans {}".format(len(tarFileListA), self.edigeoPlainDir))
-                for z in tarFileListB:
-                    with tarfile.open(z) as t:
-                        t.extractall(os.path.join(self.edigeoPlainDir, 'tar_%s' % i))
-                        i += 1
-                        t.close()
-                    try:
-                        os.remove(z)
-                    except OSError:
-                        self.qc.updateLog("<b>Erreur lors de la suppression de %s</b>" % str(z))
-                        pass  # in Windows, sometime file is not unlocked
-
-            except IOError:
-                msg = u"<b>Erreur lors de l'extraction des fichiers EDIGEO</b>"
-                self.go = False
-                self.qc.updateLog(msg)
-                return msg
-
+                for thfFiles in self.extractEdigeoArchives(path):
+                    pass
             finally:
                 QApplication.restoreOverrideCursor()
 
-    def replaceParametersInString(self, string, replaceDict):
+    def extractEdigeoArchives(self, path):
         """
-        Replace all occurences in string
+        Extract the zip and tar.bz2 archives found in path
+        into the temporary folder, with a thread pool sized from the CPU count.
+        The nested archives are queued as soon as their parent is extracted.
+        Yields the THF files of each extracted archive,
+        or an empty list while waiting, so that the import can start meanwhile
         """
+        import tarfile
+        import zipfile
+
+        archives = self.list_files_in_directory(path, ['zip', 'bz2'])
+        if not archives:
+            return
+        nbWorkers = min(32, os.cpu_count() or 1)
+        self.qc.updateLog(u'* Décompression de {} archive(s) avec {} threads'.format(len(archives), nbWorkers))
+
+        results = queue.Queue()
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=nbWorkers)
+        lock = threading.Lock()
+        submitted = [0]
+
+        def extract(archive, remove):
+            if cancel.is_set():
+                return
+            try:
+                nested, thfFiles = extractEdigeoArchive(archive, self.edigeoPlainDir, remove)
+            except (IOError, zipfile.BadZipFile, tarfile.TarError) as e:
+                results.put((archive, e, []))
+                return
+            # Nested archives are counted before their parent is reported
+            for a in nested:
+                submit(a, True)
+            results.put((archive, None, thfFiles))
+
+        def submit(archive, remove):
+            with lock:
+                submitted[0] += 1
+            try:
+                executor.submit(extract, archive, remove)
+            except RuntimeError:
+                # The pool has been shut down after an error
+                pass
 
-        def replfunc(match):
-            if match.group(0) in replaceDict:
-                return replaceDict[match.group(0)]
-            else:
-                return None
+        for archive in archives:
+            submit(archive, False)
 
-        regex = re.compile('|'.join(re.escape(x) for x in replaceDict), re.IGNORECASE)
-        string = regex.sub(replfunc, string)
-        return string
+        received = 0
+        try:
+            while True:
+                with lock:
+                    if received == submitted[0]:
+                        break
+                try:
+                    archive, error, thfFiles = results.get(timeout=0.5)
+                except queue.Empty:
+                    QApplication.processEvents()
+                    yield []
+                    continue
+                received += 1
+                if error:
+                    self.go = False
+                    self.qc.updateLog(
+                        u"<b>Erreur lors de l'extraction des fichiers EDIGEO</b> : %s (%s)" % (archive, error)
+                    )
+                    return
+                yield thfFiles
+        finally:
+            cancel.set()
+            executor.shutdown(wait=True)
 
-    def replaceParametersInScript(self, scriptPath, replaceDict):
+    def getEdigeoThfBatches(self):
         """
-        Replace all parameters in sql scripts
-        with given values
+        Yields the THF files to import as they become available:
+        plain files of the source directory, then the files of the archives,
+        read in place or extracted concurrently.
+        The total number of steps grows accordingly
         """
-
-        if self.go:
-
-            QApplication.setOverrideCursor(Qt.WaitCursor)
-
-            try:
-                data = ''
-                with open(scriptPath, encoding='utf-8-sig') as fin:
-                    data = fin.read()  # .decode("utf-8-sig")
-
-                data = self.replaceParametersInString(data, replaceDict)
-                # data = data.encode('utf-8')
-                with open(scriptPath, 'w') as fout:
-                    fout.write(data)
-
-            except IOError as e:
-                msg = u"<b>Erreur lors du paramétrage des scripts d'import: %s</b>" % e
-                self.go = False
-                self.qc.updateLog(msg)
-                return msg
-
-            finally:
-                QApplication.restoreOverrideCursor()
-
-        return None
-
-    def executeSqlScript(self, scriptPath, divide=False, ignoreError=False):
+        if self.edigeoVirtualFiles:
+            batches = iter([self.getEdigeoSourceFiles('thf')])
+        else:
+            batches = self.extractEdigeoArchives(self.dialog.edigeoSourceDir)
+            thfFiles = self.list_files_in_directory(self.dialog.edigeoSourceDir, ['thf'])
+            self.totalSteps += len(thfFiles)
+            yield thfFiles
+        try:
+            for thfFiles in batches:
+                self.totalSteps += len(thfFiles)
+                yield thfFiles
+        finally:
+            if hasattr(batches, 'close'):
+                batches.close()
+
+    def executeSqlScript(self, scriptPath, divide=False, ignoreError=False, tables=None, parallel=False,
+                         replaceDict=None):
         """
-        Execute an SQL script file
+        Execute an SQL script file, scriptPath being relative
+        to the plugin scripts directory and its parameters
+        being replaced with the values of replaceDict.
+        If tables is given, the INSERT, UPDATE and DELETE queries
+        on other tables are skipped.
+        If parallel is True, the queries of a divided script annotated
+        with "--@parallel" can run concurrently on PostGIS
         """
 
         if self.go:
 
             QApplication.setOverrideCursor(Qt.WaitCursor)
 
-            # Read sql script
-            sql = ''
+            # Render sql script
             try:
-                with open(scriptPath, encoding="utf-8-sig") as f:
-                    sql = f.read()
-            except:
-                with open(scriptPath, encoding="ISO-8859-15") as f:
-                    sql = f.read()
+                sql = self.scripts.render(scriptPath, replaceDict)
+            except IOError as e:
+                QApplication.restoreOverrideCursor()
+                self.go = False
+                self.qc.updateLog(u"<b>Erreur lors du paramétrage des scripts d'import: %s</b>" % e)
+                return
 
             # Set schema if needed
             if self.dialog.dbType == 'postgis':
@@ -1065,78 +1762,272 @@ class cadastreImport(QObject):
                 sql = CadastreCommon.postgisToSpatialite(sql, self.targetSrid)
                 sql = CadastreCommon.postgisToSpatialiteLocal10(sql, self.dialog.dataYear)
 
+            # Split all SQL into single queries
+            statements = splitSqlStatements(sql)
+
+            # Only modify the given tables
+            if tables is not None:
+                statements = [
+                    a for a in statements
+                    if getStatementTarget(a) is None or getStatementTarget(a) in tables
+                ]
+                sql = ';'.join(statements)
+
             # Execute query
             if not divide:
                 # self.qc.updateLog('|%s|' % sql)
-                self.executeSqlQuery(sql, ignoreError)
+                self.executeProfiledSqlQuery(scriptPath, None, sql, ignoreError)
             else:
-                # Split all SQL into single queries
-                statements = sql.split(';')
                 self.totalSteps += len(statements)
                 self.updateProgressBar()
-                # Regex to find valid SQL queries
-                r = re.compile(
-                    r'select |insert |update |delete |alter |create |drop |truncate |comment |copy |vacuum |analyze ',
-                    re.IGNORECASE | re.MULTILINE)
-
-                # Loop through for each individual statement
-                for sqla in statements:
-                    # Break if an error has been raised before
-                    if not self.go:
-                        break
 
-                    # Regex to find comments which will be written in log
-                    cr = re.compile(r'^-- (.+)', re.IGNORECASE | re.MULTILINE)
+                # Comments and query to run, if any, of each statement
+                steps = [(getSqlStepComments(a), self.getScriptQuery(a)) for a in statements]
 
-                    # Write comment taken from "-- some comment" lines
-                    for comment in cr.findall(sqla):
+                executedInParallel = False
+                if parallel and self.sqlScriptWorkers > 1 \
+                        and self.dialog.dbType == 'postgis' and not self.hasConstraints:
+                    executedInParallel = self.executeSqlStepsInParallel(scriptPath, steps, ignoreError)
 
-                        # Update timer before writing the comment
-                        # it will show the time taken by the previous statement
-                        self.updateTimer()
+                if not executedInParallel:
+                    label = None
+                    for comments, sql in steps:
+                        # Break if an error has been raised before
+                        if not self.go:
+                            break
 
-                        # Write item. Ex: geo_borne_parcelle
-                        self.qc.updateLog('  - %s' % comment.strip(' \n\r\t'))
+                        # Write comment taken from "-- some comment" lines
+                        for comment in comments:
 
-                    # Do nothing if sql is only comment
-                    if not r.search(sqla) or not len(sqla.split('~')) == 1:
-                        continue
+                            # Update timer before writing the comment
+                            # it will show the time taken by the previous statement
+                            self.updateTimer()
 
-                    # Get SQL query
-                    sql = '%s' % sqla
-                    # self.qc.updateLog('@@%s$$' % sql)
-                    # self.updateProgressBar()
-
-                    # Spatialite performance adaptations
-                    # This is fragile as Sqlite perf evolves a lot through time & versions
-                    # Some queries runing fast earlier can perform poorly in some contexts
-                    # ex: https://github.com/3liz/QgisCadastrePlugin/issues/262
-                    avoid_query = False
-                    if self.dialog.dbType == 'spatialite':
-                        spatialite_avoid_list = [
-                            'geo_borne_annee_idx',
-                        ]
-                        for avoid_item in spatialite_avoid_list:
-                            if avoid_item in sql:
-                                avoid_query = True
-                    if avoid_query:
-                        # self.qc.updateLog('AVOID FOR SPATIALITE')
-                        continue
+                            # Write item. Ex: geo_borne_parcelle
+                            self.qc.updateLog('  - %s' % comment)
+                            label = comment
 
-                    # Execute query
-                    self.executeSqlQuery(sql, ignoreError)
+                        # Do nothing if sql is only comment
+                        if sql is None:
+                            continue
 
-                    self.updateProgressBar()
+                        # Execute query
+                        self.executeProfiledSqlQuery(scriptPath, label, sql, ignoreError)
+
+                        self.updateProgressBar()
             QApplication.restoreOverrideCursor()
 
         return None
 
+    def getScriptQuery(self, sql):
+        """
+        Get the query to run for a statement of a divided script,
+        or None if it must be skipped
+        """
+        # Do nothing if sql is only comment
+        if not isSqlQuery(sql):
+            return None
+
+        # Spatialite performance adaptations
+        # This is fragile as Sqlite perf evolves a lot through time & versions
+        # Some queries runing fast earlier can perform poorly in some contexts
+        # ex: https://github.com/3liz/QgisCadastrePlugin/issues/262
+        if self.dialog.dbType == 'spatialite':
+            spatialite_avoid_list = [
+                'geo_borne_annee_idx',
+            ]
+            for avoid_item in spatialite_avoid_list:
+                if avoid_item in sql:
+                    return None
+
+        # MAJIC data already decoded into the formatted tables
+        if self.majicDecoder and self.majicDecoder.handles(sql):
+            return None
+
+        return sql
+
+    def executeSqlStepsInParallel(self, scriptPath, steps, ignoreError=False):
+        """
+        Run the queries of a divided script on a pool of PostGIS connections.
+        Only the queries annotated with "--@parallel" run alongside other ones,
+        when the previous queries using the same tables are finished.
+        The other ones wait for all the previous queries (see getStatementDependencies).
+        The comments, progress and profile are written in the order of the script.
+        After the first error, no other query is started and the import stops.
+        Each query is committed on its own: the annotated queries placed
+        after the failing one in the script may have been run already.
+        Returns False if the connections cannot be opened,
+        or if no query of the script is annotated
+        """
+        import psycopg2
+
+        queries = [i for i, (comments, sql) in enumerate(steps) if sql is not None]
+        if len(queries) < 2 or not any(isParallelStatement(steps[i][1]) for i in queries):
+            return False
+
+        nbWorkers = min(self.sqlScriptWorkers, len(queries))
+        try:
+            openedConnections = self.openPostgisConnections(nbWorkers, True)
+        except Exception as e:
+            self.qc.updateLog(
+                u"Impossible d'ouvrir %s connexions pour exécuter le script en parallèle : %s" % (nbWorkers, e)
+            )
+            return False
+        connections = queue.Queue()
+        for connection in openedConnections:
+            connections.put(connection)
+
+        # Do not keep locks on the main connection while the workers change the tables
+        self.connector._commit()
+
+        dependencies = getStatementDependencies([steps[i][1] for i in queries])
+        waiting = [len(a) for a in dependencies]
+        dependents = [[] for _ in queries]
+        for k, deps in enumerate(dependencies):
+            for j in deps:
+                dependents[j].append(k)
+        queryOfStep = {i: k for k, i in enumerate(queries)}
+
+        def execute(sql):
+            connection = connections.get()
+            try:
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+                    return cursor.rowcount, time.perf_counter() - start
+            finally:
+                connections.put(connection)
+
+        futures = {}
+        results = {}
+        errors = {}
+        logged = [0, None]
+
+        def logSteps():
+            # Write the comments and the profile of the finished steps, in the order of the script
+            while logged[0] < len(steps):
+                comments, sql = steps[logged[0]]
+                k = queryOfStep.get(logged[0])
+                if k is not None and k not in results:
+                    return
+                for comment in comments:
+                    self.updateTimer()
+                    self.qc.updateLog('  - %s' % comment)
+                    logged[1] = comment
+                if k in errors:
+                    return
+                if k is not None:
+                    rowCount, duration = results[k]
+                    if self.sqlProfiler is not None:
+                        self.sqlProfiler.record(os.path.basename(scriptPath), logged[1], sql, duration, rowCount)
+                    self.updateProgressBar()
+                logged[0] += 1
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with ThreadPoolExecutor(max_workers=nbWorkers) as executor:
+
+                def submit(k):
+                    futures[executor.submit(execute, steps[queries[k]][1])] = k
+
+                for k in range(len(queries)):
+                    if not waiting[k]:
+                        submit(k)
+
+                while futures:
+                    done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        k = futures.pop(future)
+                        try:
+                            results[k] = future.result()
+                        except Exception as e:
+                            if isinstance(e, psycopg2.Error) and ignoreError \
+                                    or re.search(r'CREATE INDEX ', steps[queries[k]][1], re.IGNORECASE):
+                                results[k] = (None, 0)
+                            else:
+                                results[k] = None
+                                errors[k] = e
+                                continue
+
+                        # Start the queries waiting for this one, unless an error occurred
+                        if errors or not self.go:
+                            continue
+                        for j in dependents[k]:
+                            waiting[j] -= 1
+                            if not waiting[j]:
+                                submit(j)
+                    logSteps()
+                    QApplication.processEvents()
+        finally:
+            QApplication.restoreOverrideCursor()
+            for connection in openedConnections:
+                connection.close()
+
+        if errors:
+            k = min(errors)
+            e = DbError(errors[k], steps[queries[k]][1])
+            DlgDbError.showError(e, self.dialog)
+            self.go = False
+            self.qc.updateLog(e.msg)
+            after = len([j for j in results if j > k and results[j] is not None])
+            if after:
+                self.qc.updateLog(
+                    u'%s requêtes placées après celle en erreur dans le script ont déjà été exécutées' % after
+                )
+            skipped = len(queries) - len(results)
+            if skipped:
+                self.qc.updateLog(u'%s requêtes non exécutées après l\'erreur' % skipped)
+
+        return True
+
+    def executeProfiledSqlQuery(self, scriptPath, label, sql, ignoreError=False):
+        """
+        Execute a SQL query of a script
+        and add its duration and affected rows to the profile
+        """
+        if self.sqlProfiler is None:
+            return self.executeSqlQuery(sql, ignoreError)
+
+        start = time.perf_counter()
+        rowCount = self.executeSqlQuery(sql, ignoreError)
+        self.sqlProfiler.record(os.path.basename(scriptPath), label, sql, time.perf_counter() - start, rowCount)
+        return rowCount
+
+    def writeSqlProfile(self):
+        """
+        Write the profile of the SQL scripts
+        in the temporary folder, next to the checkpoint of the import
+        """
+        if not self.sqlProfiler or not self.sqlProfiler.records:
+            return
+
+        basePath = os.path.join(
+            self.tempDir,
+            'cadastre_import_profile_%s' % datetime.now().strftime('%Y%m%d_%H%M%S')
+        )
+        try:
+            paths = self.sqlProfiler.write(basePath)
+        except IOError as e:
+            self.qc.updateLog(u"<b>Erreur lors de l'écriture du profil des requêtes SQL : %s</b>" % e)
+            return
+
+        self.qc.updateLog(u'Profil des requêtes SQL : %s' % ', '.join(paths))
+        for item in self.sqlProfiler.slowest(5):
+            self.qc.updateLog(u'  - %.1f s (%s lignes) %s : %s' % (
+                item['duration'],
+                item['rows'] if item['rows'] is not None else '?',
+                item['script'],
+                item['label'] or item['statement'][:80]
+            ))
+
     def executeSqlQuery(self, sql, ignoreError=False):
         """
         Execute a SQL string query
         And commit
         NB: commit qgis/QGIS@14ab5eb changes QGIS DBmanager behaviour
+        Returns the number of rows affected, or None
         """
+        rowCount = None
         if self.go:
             QApplication.setOverrideCursor(Qt.WaitCursor)
 
@@ -1144,7 +2035,9 @@ class cadastreImport(QObject):
 
             if self.dialog.dbType == 'postgis':
                 try:
-                    c = self.connector._execute_and_commit(sql)
+                    c = self.connector._execute(None, sql)
+                    rowCount = c.rowcount
+                    self.connector._commit()
                 except BaseError as e:
                     if not ignoreError \
                             and not re.search(r'CREATE INDEX ', sql, re.IGNORECASE):
@@ -1153,7 +2046,9 @@ class cadastreImport(QObject):
                         self.qc.updateLog(e.msg)
                 except UnicodeDecodeError:
                     try:
-                        c = self.connector._execute_and_commit(sql)
+                        c = self.connector._execute(None, sql)
+                        rowCount = c.rowcount
+                        self.connector._commit()
                     except BaseError as e:
                         if not ignoreError \
                                 and not re.search(r'CREATE INDEX ', sql, re.IGNORECASE):
@@ -1196,7 +2091,9 @@ class cadastreImport(QObject):
                     c.connection.create_function('regexp', 2, regexp)
 
                     # Run query
+                    changes = c.connection.total_changes
                     c.executescript(sql)
+                    rowCount = c.connection.total_changes - changes
                 except BaseError as e:
                     if not re.search(r'CREATE INDEX ', sql, re.IGNORECASE):
                         self.go = False
@@ -1219,6 +2116,8 @@ class cadastreImport(QObject):
                             print("issue closing connection")
                             pass
 
+        return rowCount
+
     def importAllEdigeoToDatabase(self):
         """
         Loop through all THF files
@@ -1235,39 +2134,57 @@ class cadastreImport(QObject):
             # THF
             self.dialog.subStepLabel.setText(u'Import des fichiers via ogr2ogr (*.thf)')
             self.qc.updateLog(u'  - Import des fichiers via ogr2ogr')
-            # Get plain files in source directory
-            thfList1 = self.list_files_in_directory(self.dialog.edigeoSourceDir, ['thf'])
-            # Get files which have been uncompressed by plugin in temp folder
-            thfList2 = self.list_files_in_directory(self.edigeoPlainDir, ['thf'])
-            thfList = list(set(thfList1) | set(thfList2))
             self.step = 0
-            self.totalSteps = len(thfList)
-            for thf in thfList:
-                self.importEdigeoThfToDatabase(thf)
-                self.updateProgressBar()
-                if not self.go:
-                    break
+            self.totalSteps = 0
+            self.edigeoThfDurations = []
+            self.edigeoThfBackends = set()
+            self.edigeoThfSkipped = []
+            thfBatches = self.getEdigeoThfBatches()
+            importedInParallel = False
+            if self.dialog.dbType == 'postgis' and self.edigeoImportWorkers > 1:
+                importedInParallel = self.importEdigeoThfFilesInParallel(thfBatches)
+            if not importedInParallel:
+                self.importEdigeoThfFiles(thfBatches)
+            # Stop the extraction if the import has been interrupted
+            thfBatches.close()
+
+            if self.go and self.edigeoThfDurations:
+                duration, slowest = max(self.edigeoThfDurations)
+                self.qc.updateLog(
+                    u'  - %s fichiers THF importés via %s, durée cumulée %.1f s, import le plus long %.1f s : %s' % (
+                        self.step - len(self.edigeoThfSkipped),
+                        ', '.join(sorted(self.edigeoThfBackends)),
+                        sum(a[0] for a in self.edigeoThfDurations),
+                        duration,
+                        slowest
+                    )
+                )
+            if self.go and self.edigeoThfSkipped:
+                self.qc.updateLog(
+                    u'<b>  - %s feuilles ignorées :</b>\n%s' % (
+                        len(self.edigeoThfSkipped),
+                        '\n'.join(self.edigeoThfSkipped)
+                    )
+                )
 
         if self.go:
 
             # VEC - import relations between objects
             self.dialog.subStepLabel.setText(u'Import des relations (*.vec)')
             self.qc.updateLog(u'  - Import des relations (*.vec)')
-            # Get plain files in source directory
-            vecList1 = self.list_files_in_directory(self.dialog.edigeoSourceDir, ['vec'])
-            # Get files which have been uncompressed by plugin in temp folder
-            vecList2 = self.list_files_in_directory(self.edigeoPlainDir, ['vec'])
-            vecList = list(set(vecList1) | set(vecList2))
+            vecList = self.getEdigeoSourceFiles('vec')
             self.step = 0
             self.totalSteps = len(vecList)
-            for vec in vecList:
-                # import via ogr2ogr
-                self.importEdigeoVecToDatabase(vec)
-                # update mission multipolygons (ogr2ogr driver does not handle them yet)
-                self.updateMultipolygonFromVec(vec)
-                self.updateProgressBar()
-                if not self.go:
-                    break
+            importedInParallel = False
+            if self.edigeoImportWorkers > 1 and len(vecList) > 1:
+                importedInParallel = self.importEdigeoVecFilesInParallel(vecList)
+            if not importedInParallel:
+                for vec in vecList:
+                    # import relations and update missing multipolygons
+                    self.importEdigeoVecToDatabase(vec)
+                    self.updateProgressBar()
+                    if not self.go:
+                        break
             if self.go:
                 self.qc.updateLog(
                     u'  - %s multipolygones mis à jours dans la base de données' % self.multiPolygonUpdated)
@@ -1277,24 +2194,64 @@ class cadastreImport(QObject):
         self.totalSteps = initialTotalSteps
         QApplication.restoreOverrideCursor()
 
-    def importEdigeoThfToDatabase(self, filename):
+    def importEdigeoThfFiles(self, thfBatches):
         """
-        Import one edigeo THF files into database
+        Import the THF files into database in the current process,
+        through one destination session
+        and one transaction per group of files.
+        thfBatches yields the files as they become available
         source : db_manager/dlg_import_vector.py
         """
-        if self.go:
-            # Get options
-            targetSridOption = '-t_srs'
-            if self.sourceSridFull == self.targetSridFull:
-                targetSridOption = '-a_srs'
+        importOptions = self.getEdigeoThfImportOptions()
+        if not importOptions:
+            return
+        filesPerTransaction = importOptions['filesPerTransaction']
+        thfList = []
+        try:
+            for thfFiles in thfBatches:
+                thfList += [normEdigeoPath(a) for a in thfFiles]
+                while self.go and len(thfList) >= filesPerTransaction:
+                    self.importEdigeoThfGroup(thfList[:filesPerTransaction], importOptions)
+                    thfList = thfList[filesPerTransaction:]
+                if not self.go:
+                    return
+            if thfList:
+                self.importEdigeoThfGroup(thfList, importOptions)
+        finally:
+            # Release the destination before formatting the data
+            closeThfDestinations()
+
+    def importEdigeoThfGroup(self, thfList, importOptions):
+        """
+        Import a group of THF files in the current process
+        """
+        for result in importThfFiles(thfList, importOptions):
+            self.logEdigeoThfImport(result)
 
+    def getEdigeoThfImportOptions(self):
+        """
+        Build the options to import
+        the edigeo THF files into database,
+        used by GDAL VectorTranslate or ogr2ogr.py
+        """
+        if self.go:
             # Build ogr2ogr command
             conn_name = self.dialog.connectionName
             settings = QSettings()
             settings.beginGroup(u"/%s/%s" % (self.db.dbplugin().connectionSettingsKey(), conn_name))
 
-            # normalising file path
-            filename = os.path.normpath(filename)
+            importOptions = {
+                'srcSRS': self.sourceSridFull,
+                'dstSRS': self.targetSridFull,
+                'reproject': self.sourceSridFull != self.targetSridFull,
+                'layerCreationOptions': ['GEOMETRY_NAME=geom'],
+                'datasetCreationOptions': [],
+                'geometryType': 'GEOMETRY',
+                'groupTransactions': 50000,
+                'filesPerTransaction': 100,
+                'config': {'OGR_EDIGEO_CREATE_LABEL_LAYERS': 'NO'}
+            }
+
             if self.dialog.dbType == 'postgis':
                 if not settings.contains("database"):  # non-existent entry?
                     raise Exception(self.tr('There is no defined database connection "%s".') % conn_name)
@@ -1319,20 +2276,9 @@ class cadastreImport(QObject):
                         username,
                         password
                     )
-                cmdArgs = [
-                    '',
-                    '-s_srs', self.sourceSridFull,
-                    targetSridOption, self.targetSridFull,
-                    '-append',
-                    '-f', 'PostgreSQL',
-                    pg_access,
-                    filename,
-                    '-lco', 'GEOMETRY_NAME=geom',
-                    '-lco', 'PG_USE_COPY=YES',
-                    '-nlt', 'GEOMETRY',
-                    '-gt', '50000',
-                    '--config', 'OGR_EDIGEO_CREATE_LABEL_LAYERS', 'NO'
-                ]
+                importOptions['format'] = 'PostgreSQL'
+                importOptions['destination'] = pg_access
+                importOptions['layerCreationOptions'].append('PG_USE_COPY=YES')
                 # -c client_encoding=latin1
 
             if self.dialog.dbType == 'spatialite':
@@ -1340,118 +2286,236 @@ class cadastreImport(QObject):
                     self.go = False
                     raise Exception(u'there is no defined database connection "%s".' % conn_name)
 
-                database = settings.value("sqlitepath")
-
-                cmdArgs = [
-                    '',
-                    '-s_srs', self.sourceSridFull,
-                    targetSridOption, self.targetSridFull,
-                    '-append',
-                    '-f', 'SQLite',
-                    database,
-                    filename,
-                    '-lco', 'GEOMETRY_NAME=geom',
-                    '-nlt', 'GEOMETRY',
-                    '-dsco', 'SPATIALITE=YES',
-                    '-gt', '50000',
-                    '--config', 'OGR_EDIGEO_CREATE_LABEL_LAYERS', 'NO',
-                    '--config', 'OGR_SQLITE_SYNCHRONOUS', 'OFF',
-                    '--config', 'OGR_SQLITE_CACHE', '512'
-                ]
+                importOptions['format'] = 'SQLite'
+                importOptions['destination'] = settings.value("sqlitepath")
+                importOptions['datasetCreationOptions'].append('SPATIALITE=YES')
+                importOptions['config']['OGR_SQLITE_SYNCHRONOUS'] = 'OFF'
+                importOptions['config']['OGR_SQLITE_CACHE'] = '512'
 
-            # self.qc.updateLog( ' '.join(cmdArgs))
-            # Run only if ogr2ogr found
-            if self.go:
-                # Workaround to get ogr2ogr error messages via stdout
-                # as ogr2ogr.py does not return exceptions nor error messages
-                # but only prints the error before returning False
-                stdout = sys.stdout
+            return importOptions
+
+        return None
+
+    def logEdigeoThfImport(self, result):
+        """
+        Log the result of the import of a group of THF files,
+        update the progress bar and stop the import on error.
+        A sheet skipped after failing on its own is logged,
+        and the import goes on with the other ones
+        """
+        self.edigeoThfDurations.append((result['duration'], result['path']))
+        self.edigeoThfBackends.add(result['backend'])
+        for i in range(result['files']):
+            self.updateProgressBar()
+        if result.get('skipped'):
+            self.edigeoThfSkipped.append(result['path'])
+            self.qc.updateLog(
+                u"<b>Feuille ignorée - L'import via OGR2OGR a échoué:</b>\n\n%s\n\n%s" % (
+                    result['path'],
+                    '\n'.join(result['errors'])
+                )
+            )
+        elif not result['ok']:
+            self.go = False
+            self.qc.updateLog(
+                u"<b>Erreur - L'import des données via OGR2OGR a échoué:</b>\n\n%s\n\n%s" % (
+                    result['path'],
+                    '\n'.join(result['errors'])
+                )
+            )
+            if result['files'] > 1:
+                self.qc.updateLog(u'Fichiers du groupe :\n%s' % '\n'.join(result['filenames']))
+
+    def importEdigeoThfFilesInParallel(self, thfBatches):
+        """
+        Import THF files concurrently in worker processes,
+        each one keeping its own destination session
+        and committing once per group of files.
+        The groups are sent as soon as their files are available.
+        The first file is imported beforehand, so that the workers
+        do not race to create the missing tables.
+        Returns False if the process pool cannot be started
+        """
+        nbWorkers = self.edigeoImportWorkers
+        pool = createProcessPool(nbWorkers)
+        if pool is None:
+            self.qc.updateLog(u"Interpréteur Python introuvable, import séquentiel des fichiers THF")
+            return False
+
+        self.qc.updateLog(u'* Import des fichiers THF avec %s processus' % nbWorkers)
+        importOptions = self.getEdigeoThfImportOptions()
+        if not importOptions:
+            return True
+
+        # Smaller groups than in sequential mode, to balance the workers load
+        filesPerTransaction = max(1, importOptions['filesPerTransaction'] // nbWorkers)
+        futures = set()
+
+        def collect(timeout):
+            done, pending = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.discard(future)
+                if future.cancelled():
+                    continue
                 try:
-                    sys.stdout = file = io.StringIO()
-                    self.go = ogr2ogr(cmdArgs)
-                    printedString = file.getvalue()
-                finally:
-                    sys.stdout = stdout
+                    results = future.result()
+                except Exception as e:
+                    # Broken pool: the worker process died
+                    self.go = False
+                    self.qc.updateLog(u"<b>Erreur lors de l'import des fichiers THF</b> : %s" % e)
+                    continue
+                for result in results:
+                    self.logEdigeoThfImport(result)
 
-                if not self.go:
-                    self.qc.updateLog(
-                        u"<b>Erreur - L'import des données via OGR2OGR a échoué:</b>\n\n%s\n\n%s" % (
-                            printedString,
-                            cmdArgs
-                        )
-                    )
+        def submit(thfList):
+            futures.add(pool.submit(importThfFiles, thfList, importOptions))
 
-        return None
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with pool:
+                thfList = []
+                firstImported = False
+                for thfFiles in thfBatches:
+                    thfList += [normEdigeoPath(a) for a in thfFiles]
+                    if thfList and not firstImported:
+                        firstImported = True
+                        self.importEdigeoThfFiles([thfList[:1]])
+                        thfList = thfList[1:]
+                    while self.go and len(thfList) >= filesPerTransaction:
+                        submit(thfList[:filesPerTransaction])
+                        thfList = thfList[filesPerTransaction:]
+                    if futures:
+                        collect(0)
+                    if not self.go:
+                        break
+
+                if self.go and thfList:
+                    submit(thfList)
+                while futures:
+                    if not self.go:
+                        # Stop the remaining imports after the first error
+                        for future in futures:
+                            future.cancel()
+                    collect(0.5)
+                    QApplication.processEvents()
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        return True
 
     def importEdigeoVecToDatabase(self, path):
         """
-        Get edigeo relations between objects
-        from a .VEC file
-        and add them in edigeo_rel table
+        Read a .VEC file in one pass,
+        add the edigeo relations between objects in edigeo_rel table
+        and update the multipolygons
+        (ogr2ogr driver does not handle them yet)
         """
+        if not self.go:
+            return
+
+        relations, multipolygons = readVecFile(path)
+        self.insertEdigeoRelations(relations)
         if self.go:
-            reg = '^RID[a-zA-z]{1}[a-zA-z]{1}[0-9]{2}:(Rel_.+)_(Objet_[0-9]+)_(Objet_[0-9]+)'
-            try:
-                with open(path) as inputFile:
-                    # Get a list of RID relations combining a "Rel" and two "_Objet"
-                    l = [a[0] for a in [re.findall(r'%s' % reg, line) for line in inputFile] if a]
-            except:
-                with open(path, encoding="ISO-8859-15") as inputFile:
-                    # Get a list of RID relations combining a "Rel" and two "_Objet"
-                    l = [a[0] for a in [re.findall(r'%s' % reg, line) for line in inputFile] if a]
-
-            if l:
-                # Create a sql script to insert all items
-                if self.dialog.dbType == 'postgis':
-                    sql = "BEGIN;"
-                    for item in l:
-                        sql += "INSERT INTO edigeo_rel ( nom, de, vers) VALUES ( '%s', '%s', '%s');" % (
-                        item[0], item[1], item[2])
-                    sql += "COMMIT;"
-                    sql = CadastreCommon.setSearchPath(sql, self.dialog.schema)
-                    self.executeSqlQuery(sql)
-                if self.dialog.dbType == 'spatialite':
-                    c = self.connector._get_cursor()
-                    query = 'INSERT INTO edigeo_rel (nom, de, vers) VALUES (?, ?, ?)'
-                    try:
-                        c.executemany(query, [(item[0], item[1], item[2]) for item in l])
-                        self.connector._commit()
-                    except:
-                        self.qc.updateLog('<b>Erreurs pendant la requête :</b> %s' % sql)
-                    finally:
-                        c.close()
-                        del c
+            self.updateMultipolygons(self.getMultipolygonRows(multipolygons))
 
-    def updateMultipolygonFromVec(self, path, layerType='edigeo'):
+    def importEdigeoVecFilesInParallel(self, vecList):
         """
-        Run the update multipolygon query
-        for each VEC files on the given layer type
-        (edigeo = import tables, cadastre = cadastre geo_* tables)
+        Read VEC files concurrently in worker processes.
+        The relations and multipolygons are written
+        by the main thread in the order of the files,
+        grouped in batches of maxInsertRows rows.
+        Returns False if the process pool cannot be started
         """
-        # Get SQL update queries
-        sqlList = self.getUpdateMultipolygonFromVecQuery(path, layerType)
+        nbWorkers = min(self.edigeoImportWorkers, len(vecList))
+        pool = createProcessPool(nbWorkers)
+        if pool is None:
+            self.qc.updateLog(u"Interpréteur Python introuvable, lecture séquentielle des fichiers VEC")
+            return False
 
-        # Run each query
-        for sql in sqlList:
-            if self.dialog.dbType == 'postgis':
-                sql = CadastreCommon.setSearchPath(sql, self.dialog.schema)
-            self.executeSqlQuery(sql)
+        self.qc.updateLog(u'* Lecture des fichiers VEC avec %s processus' % nbWorkers)
+        relations = []
+        multipolygonRows = []
+
+        def flush():
+            self.insertEdigeoRelations(relations)
+            if self.go:
+                self.updateMultipolygons(multipolygonRows)
+            del relations[:]
+            del multipolygonRows[:]
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with pool:
+                # Only a few files are read ahead, to limit the memory used by the results
+                vecFiles = iter(vecList)
+                futures = [pool.submit(readVecFile, vec) for vec in itertools.islice(vecFiles, 2 * nbWorkers)]
+                while futures and self.go:
+                    done, _ = wait(futures[:1], timeout=0.5)
+                    QApplication.processEvents()
+                    if not done:
+                        continue
+                    future = futures.pop(0)
+                    try:
+                        fileRelations, multipolygons = future.result()
+                    except Exception as e:
+                        # Broken pool or unreadable file
+                        self.go = False
+                        self.qc.updateLog(u"<b>Erreur lors de la lecture des fichiers VEC</b> : %s" % e)
+                        break
+                    futures += [pool.submit(readVecFile, vec) for vec in itertools.islice(vecFiles, 1)]
+
+                    relations += fileRelations
+                    multipolygonRows += self.getMultipolygonRows(multipolygons)
+                    if len(relations) + len(multipolygonRows) >= self.maxInsertRows:
+                        flush()
+                    self.updateProgressBar()
 
-    def getUpdateMultipolygonFromVecQuery(self, path, layerType='edigeo'):
+                if self.go:
+                    flush()
+                # Stop the remaining readings after an error
+                for future in futures:
+                    future.cancel()
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        return True
+
+    def insertEdigeoRelations(self, relations):
         """
-        EDIGEO ogr driver does not import multipolygon.
-        This method is a patch : it parses the vec file
-        and get WKT.
-        Then the method build an SQL update query
-        adapted on the given layer type
-        (edigeo = import tables, cadastre = cadastre geo_* tables)
+        Bulk load (nom, de, vers) relations into edigeo_rel table,
+        with COPY FROM STDIN on PostGIS and executemany on Spatialite
         """
-        sqlList = []
+        if not relations:
+            return
 
-        # Class wich get multipolygons
-        from .getmultipolygonfromvec import GetMultiPolygonFromVec
-        getMultiPolygon = GetMultiPolygonFromVec()
+        c = self.connector._get_cursor()
+        try:
+            if self.dialog.dbType == 'postgis':
+                if self.canCopy:
+                    copyRows(c, self.dialog.schema, 'edigeo_rel', ['nom', 'de', 'vers'], relations)
+                else:
+                    c.executemany(
+                        'INSERT INTO "%s".edigeo_rel (nom, de, vers) VALUES (%%s, %%s, %%s)' % self.dialog.schema,
+                        relations
+                    )
+            else:
+                c.executemany('INSERT INTO edigeo_rel (nom, de, vers) VALUES (?, ?, ?)', relations)
+            self.connector._commit()
+        except self.connector.error_types() as e:
+            self.connector._rollback()
+            e = DbError(e, 'INSERT INTO edigeo_rel')
+            DlgDbError.showError(e, self.dialog)
+            self.go = False
+            self.qc.updateLog(e.msg)
+        finally:
+            c.close()
+            del c
 
+    def getMultipolygonRows(self, multipolygons, layerType='edigeo'):
+        """
+        (table, object_rid, wkb) rows of the multipolygons
+        of a VEC file for the given layer type
+        """
         # Relations between edigeo import tables and geo_* cadastre table
         impCadRel = {
             'batiment_id': 'geo_batiment',
@@ -1466,46 +2530,121 @@ class cadastreImport(QObject):
             'tsurf_id': 'geo_tsurf'
         }
 
-        # Get dictionnary
-        dic = getMultiPolygon(path)
-        if dic:
-            # Loop for each layer found in VEC with multi-polygon to update
-            for layer, item in list(dic.items()):
-                table = layer.lower()
+        rows = []
+        for layer, item in multipolygons.items():
+            table = layer.lower()
 
-                # do the changes only for polygon layers
-                if table not in impCadRel:
-                    continue
+            # do the changes only for polygon layers
+            if table not in impCadRel:
+                continue
+
+            # Replace table name if the update is not done on edigeo import table
+            # but on the cadastre geo_* layers instead
+            if layerType == 'cadastre':
+                table = impCadRel[table]
+
+            rows += [(table, str(obj), wkb) for obj, wkb in item.items()]
+
+        return rows
+
+    def updateMultipolygons(self, rows):
+        """
+        Load the (table, object_rid, wkb) rows of the multipolygons
+        found in VEC files into a temporary table,
+        then update each layer with one query joining this table.
+        Only the geometries actually updated are counted
+        """
+        if not rows or not self.loadMultipolygons(rows):
+            return
 
-                # Replace table name if the update is not done on edigeo import table
-                # but on the cadastre geo_* layers instead
-                if layerType == 'cadastre':
-                    table = impCadRel[table]
-
-                # Build SQL
-                sql = ''
-                for obj, wkt in list(item.items()):
-                    self.multiPolygonUpdated += 1
-                    sql += " UPDATE %s SET geom = ST_Transform(ST_GeomFromText('%s', %s), %s)" % (
-                        table,
-                        wkt,
+        for table in sorted(set(row[0] for row in rows)):
+            sql = self.getUpdateMultipolygonFromVecQuery(table)
+            if self.dialog.dbType == 'postgis':
+                sql = CadastreCommon.setSearchPath(sql, self.dialog.schema)
+            self.multiPolygonUpdated += self.executeSqlQuery(sql) or 0
+
+    def loadMultipolygons(self, rows):
+        """
+        Bulk load (table, object_rid, wkb) rows
+        into the temporary table edigeo_multipolygon,
+        with COPY FROM STDIN on PostGIS and executemany on Spatialite.
+        The geometries are transformed once, while loading them.
+        """
+        if self.dialog.dbType == 'postgis':
+            sql = 'CREATE TEMP TABLE IF NOT EXISTS edigeo_multipolygon ('
+            sql += 'tablename text, object_rid text, wkb text, geom geometry);'
+            sql += 'TRUNCATE edigeo_multipolygon;'
+        else:
+            sql = 'CREATE TEMP TABLE IF NOT EXISTS edigeo_multipolygon ('
+            sql += 'tablename text, object_rid text, geom blob);'
+            sql += 'DELETE FROM edigeo_multipolygon;'
+        self.executeSqlQuery(sql)
+        if not self.go:
+            return False
+
+        c = self.connector._get_cursor()
+        try:
+            if self.dialog.dbType == 'postgis':
+                rows = [(table, obj, wkb.hex()) for table, obj, wkb in rows]
+                if self.canCopy:
+                    copyRows(c, 'pg_temp', 'edigeo_multipolygon', ['tablename', 'object_rid', 'wkb'], rows)
+                else:
+                    c.executemany(
+                        'INSERT INTO edigeo_multipolygon (tablename, object_rid, wkb) VALUES (%s, %s, %s)',
+                        rows
+                    )
+                c.execute(
+                    "UPDATE edigeo_multipolygon SET geom = ST_Transform(ST_GeomFromWKB(decode(wkb, 'hex'), %s), %s)" % (
                         self.sourceSrid,
                         self.targetSrid
                     )
-                    # only for given object id
-                    sql += " WHERE object_rid = '%s' " % str(obj)
-                    # only if the 2 geometries are indeed different. To be debbuged : geom <> geom : operator is not unique
-                    # ~ sql+= " AND geom != ST_Transform(ST_GeomFromText('%s', %s), %s) " % (wkt, self.sourceSrid, self.targetSrid)
-                    # only if the 2 geometries are related (object_rid is not unique)
-                    if self.dialog.dbType == 'postgis':
-                        sql += " AND geom @ ST_Transform(ST_GeomFromText('%s', %s), %s) ; " % (
-                        wkt, self.sourceSrid, self.targetSrid)
-                    else:
-                        sql += " AND ST_Intersects(geom, ST_Transform(ST_GeomFromText('%s', %s), %s) ); " % (
-                        wkt, self.sourceSrid, self.targetSrid)
-                sqlList.append(sql)
+                )
+            else:
+                c.executemany(
+                    'INSERT INTO edigeo_multipolygon (tablename, object_rid, geom) '
+                    'VALUES (?, ?, ST_Transform(ST_GeomFromWKB(?, %s), %s))' % (
+                        self.sourceSrid,
+                        self.targetSrid
+                    ),
+                    rows
+                )
+            self.connector._commit()
+        except self.connector.error_types() as e:
+            self.connector._rollback()
+            e = DbError(e, 'INSERT INTO edigeo_multipolygon')
+            DlgDbError.showError(e, self.dialog)
+            self.go = False
+            self.qc.updateLog(e.msg)
+        finally:
+            c.close()
+            del c
 
-        return sqlList
+        return self.go
+
+    def getUpdateMultipolygonFromVecQuery(self, table):
+        """
+        Build the SQL query updating the geometries of the given table
+        from the multipolygons loaded in edigeo_multipolygon
+        """
+        if self.dialog.dbType == 'postgis':
+            # only if the 2 geometries are related (object_rid is not unique)
+            sql = "UPDATE %s t SET geom = m.geom FROM edigeo_multipolygon m" % table
+            sql += " WHERE m.tablename = '%s' AND t.object_rid = m.object_rid" % table
+            sql += " AND t.geom @ m.geom;"
+        elif sqlite.sqlite_version_info >= (3, 33, 0):
+            sql = "UPDATE %s SET geom = m.geom FROM edigeo_multipolygon m" % table
+            sql += " WHERE m.tablename = '%s' AND %s.object_rid = m.object_rid" % (table, table)
+            sql += " AND ST_Intersects(%s.geom, m.geom);" % table
+        else:
+            # UPDATE FROM is not available before SQLite 3.33
+            join = "FROM edigeo_multipolygon m WHERE m.tablename = '%s' AND m.object_rid = %s.object_rid" % (
+                table,
+                table
+            )
+            join += " AND ST_Intersects(%s.geom, m.geom)" % table
+            sql = "UPDATE %s SET geom = (SELECT m.geom %s) WHERE EXISTS (SELECT 1 %s);" % (table, join, join)
+
+        return sql
 
     def dropEdigeoRawData(self):
         """
@@ -1514,32 +2653,8 @@ class cadastreImport(QObject):
 
         if self.go:
             # DROP edigeo import tables
-            edigeoImportTables = [
-                'batiment_id',
-                'borne_id',
-                'boulon_id',
-                'commune_id',
-                'croix_id',
-                'id_s_obj_z_1_2_2',
-                'lieudit_id',
-                'numvoie_id',
-                'parcelle_id',
-                'ptcanv_id',
-                'section_id',
-                'subdfisc_id',
-                'subdsect_id',
-                'symblim_id',
-                'tline_id',
-                'tpoint_id',
-                'tronfluv_id',
-                'tronroute_id',
-                'tsurf_id',
-                'voiep_id',
-                'zoncommuni_id'
-                # ~ 'edigeo_rel',
-            ]
             sql = ''
-            for table in edigeoImportTables:
+            for table in self.edigeoImportTables:
                 sql += 'DROP TABLE IF EXISTS "%s";' % table
             if self.dialog.dbType == 'postgis':
                 sql = CadastreCommon.setSearchPath(sql, self.dialog.schema)
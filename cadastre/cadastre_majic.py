@@ -0,0 +1,550 @@
+"""
+Cadastre - MAJIC source files tools
+
+This plugins helps users to import the french land registry ('cadastre')
+into a database. It is meant to ease the use of the data in QGIs
+by providing search tools and appropriate layer symbology.
+
+begin     : 2021-01-18
+copyright : (C) 2021 by 3liz
+email     : info@3liz.com
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+"""
+import bz2
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+
+from collections import namedtuple
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from .cadastre_majic_layouts import Param, const
+from .cadastre_sql import CopyStream, copyRows, splitSqlStatements
+
+# Translation table replacing all bytes not in the range in ASCII table
+# from space to ~ by a space, except the line feed which ends the lines
+PRINTABLE_BYTES = bytes(c if 32 <= c <= 126 or c == 10 else 32 for c in range(256))
+
+# Size of the blocks read from the MAJIC files
+MAJIC_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Version of the MAJIC source index cache format
+MAJIC_INDEX_VERSION = 2
+
+# MAJIC files can be read from archives: compressed files
+# (REVBATI.800.gz) or zip archives (/path/majic.zip/REVBATI.800)
+MAJIC_COMPRESSED_FILES = {'.gz': gzip.open, '.bz2': bz2.open}
+ZIP_MEMBER_PATH = re.compile(r'^(.+?\.zip)/(.+)$', re.IGNORECASE)
+
+# Regexes to find the formatting queries which read the raw tables
+RAW_TABLE_SOURCE = re.compile(r'\bFROM\s+(?:"[^"]+"\.)?"?(?:bati|fanr|lloc|nbat|pdll|prop)\b', re.IGNORECASE)
+INSERT_TARGET = re.compile(r'\bINSERT\s+INTO\s+(?:"[^"]+"\.)?"?(\w+)', re.IGNORECASE)
+
+# Record type of the lines of the raw MAJIC tables: (position, length, codes)
+# used to partition the raw tables so that the formatting queries,
+# filtered on SUBSTRING(tmp, position, length), only read the rows they need
+MAJIC_RAW_PARTITIONS = {
+    'bati': (31, 2, ['00', '10', '21', '30', '31', '36', '40', '50', '52', '60']),
+    'nbat': (20, 2, ['10', '21', '30', '36']),
+    'pdll': (26, 2, ['10', '20', '30']),
+}
+
+# Regexes to find the table modified by a query, and the tables it reads
+STATEMENT_TARGET = re.compile(
+    r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(?:\[PREFIXE\]|"[^"]+"\.)?"?(\w+)',
+    re.IGNORECASE | re.MULTILINE
+)
+STATEMENT_SOURCES = re.compile(r'\b(?:FROM|JOIN)\s+(?:\[PREFIXE\]|"[^"]+"\.)?"?(\w+)', re.IGNORECASE)
+
+MajicRecord = namedtuple('MajicRecord', ['table', 'fields', 'where', 'distinct'])
+
+
+def openMajicFile(fpath: str) -> BinaryIO:
+    """
+    Open a MAJIC file in binary mode.
+    The path can be a plain file, a compressed file (.gz, .bz2)
+    or a file inside a zip archive (/path/majic.zip/REVBATI.800)
+    """
+    if os.path.isfile(fpath):
+        ext = os.path.splitext(fpath)[1].lower()
+        return MAJIC_COMPRESSED_FILES.get(ext, open)(fpath, 'rb')
+
+    match = ZIP_MEMBER_PATH.match(fpath)
+    if not match:
+        raise FileNotFoundError(fpath)
+    # The archive file stays open until the member is closed
+    with zipfile.ZipFile(match.group(1)) as archive:
+        return archive.open(match.group(2))
+
+
+def getMajicFileSize(fpath: str) -> int:
+    """
+    Get the size of a MAJIC file,
+    uncompressed size for the files inside a zip archive
+    """
+    match = ZIP_MEMBER_PATH.match(fpath)
+    if match and not os.path.isfile(fpath):
+        with zipfile.ZipFile(match.group(1)) as archive:
+            return archive.getinfo(match.group(2)).file_size
+    return os.path.getsize(fpath)
+
+
+def getMajicFileQuickFingerprint(mtime: float) -> str:
+    """
+    Get a fingerprint of a MAJIC file from its modification time
+    """
+    return 'mtime:%d' % mtime
+
+
+def getMajicFileFingerprint(fpath: str) -> str:
+    """
+    Get the md5 hash of the (uncompressed) content of a MAJIC file
+    """
+    md5 = hashlib.md5()
+    with openMajicFile(fpath) as fin:
+        for block in iter(lambda: fin.read(MAJIC_BUFFER_SIZE), b''):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+def compareMajicFile(fpath: str, size: int, mtime: float, previous: Tuple[int, str] = None) -> Tuple[bool, str]:
+    """
+    Compare a MAJIC file with the size and fingerprint recorded
+    by the previous import, and return (changed, fingerprint to record).
+    The fingerprint is mtime:<time>, followed by ;md5:<hash> once the file
+    has been hashed. A file is only hashed when its size is the same
+    as the recorded one and its modification time is not:
+    it has changed if its hash differs from the recorded one
+    """
+    fingerprint = getMajicFileQuickFingerprint(mtime)
+    if not previous or previous[0] != size:
+        return True, fingerprint
+    parts = previous[1].split(';')
+    if parts[0] == fingerprint:
+        return False, previous[1]
+    md5 = 'md5:%s' % getMajicFileFingerprint(fpath)
+    return md5 not in parts[1:], '%s;%s' % (fingerprint, md5)
+
+
+def readMajicDepdir(fpath: str) -> str:
+    """
+    Get the departement and direction code
+    from the first line with content of a MAJIC file
+    """
+    with openMajicFile(fpath) as fin:
+        for line in fin:
+            if len(line) < 4:
+                continue
+            return line[0:3].decode('ascii', errors='replace')
+    return None
+
+
+def buildMajicSourceIndex(sourceDir: str, fileNames: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Walk once through the source directory
+    and list the MAJIC files with their type (raw table),
+    size, modification time and departement/direction.
+    Files are also searched in zip archives and as .gz or .bz2 files.
+    fileNames maps each configured file name to its raw table.
+    """
+    directories = {}
+    files = []
+
+    def addFile(fpath, table, size, mtime, archive=None):
+        item = {
+            'path': fpath,
+            'table': table,
+            'size': size,
+            'mtime': mtime,
+            # avoid fantoir, as now it is given for the whole country
+            'depdir': None if table == 'fanr' else readMajicDepdir(fpath)
+        }
+        if archive:
+            item['archive'] = archive
+        files.append(item)
+
+    for root, dirs, names in os.walk(sourceDir):
+        dirs.sort()
+        directories[root] = os.stat(root).st_mtime
+        for name in sorted(names):
+            fpath = os.path.join(root, name)
+            base, ext = os.path.splitext(name)
+            ext = ext.lower()
+            if name in fileNames:
+                stat = os.stat(fpath)
+                addFile(fpath, fileNames[name], stat.st_size, stat.st_mtime)
+            elif ext in MAJIC_COMPRESSED_FILES and base in fileNames:
+                stat = os.stat(fpath)
+                addFile(fpath, fileNames[base], stat.st_size, stat.st_mtime)
+            elif ext == '.zip':
+                stat = os.stat(fpath)
+                try:
+                    with zipfile.ZipFile(fpath) as archive:
+                        members = [
+                            a for a in archive.infolist()
+                            if not a.is_dir() and a.filename.split('/')[-1] in fileNames
+                        ]
+                except zipfile.BadZipFile:
+                    continue
+                for member in sorted(members, key=lambda a: a.filename):
+                    addFile(
+                        '%s/%s' % (fpath, member.filename),
+                        fileNames[member.filename.split('/')[-1]],
+                        member.file_size,
+                        stat.st_mtime,
+                        fpath
+                    )
+
+    return {
+        'version': MAJIC_INDEX_VERSION,
+        'sourceDir': sourceDir,
+        'fileNames': fileNames,
+        'directories': directories,
+        'files': files
+    }
+
+
+def isMajicSourceIndexValid(index: Dict[str, Any], sourceDir: str, fileNames: Dict[str, str]) -> bool:
+    """
+    Check that a cached index still describes the source directory:
+    same configuration, same directory modification times
+    and same size and modification time for each file
+    """
+    if index.get('version') != MAJIC_INDEX_VERSION \
+            or index.get('sourceDir') != sourceDir \
+            or index.get('fileNames') != fileNames:
+        return False
+    try:
+        for path, mtime in index['directories'].items():
+            if os.stat(path).st_mtime != mtime:
+                return False
+        for item in index['files']:
+            if 'archive' in item:
+                # Files inside a zip archive: check the archive
+                if os.stat(item['archive']).st_mtime != item['mtime']:
+                    return False
+                continue
+            stat = os.stat(item['path'])
+            if stat.st_size != item['size'] or stat.st_mtime != item['mtime']:
+                return False
+    except OSError:
+        return False
+    return True
+
+
+def getMajicSourceIndex(sourceDir: str, fileNames: Dict[str, str], cacheDir: str = None) -> List[Dict[str, Any]]:
+    """
+    Get the list of MAJIC files found in the source directory.
+    The index is cached as a JSON file in cacheDir
+    and reused as long as the directories modification times do not change
+    """
+    sourceDir = os.path.abspath(sourceDir)
+    cachePath = None
+    if cacheDir and os.path.isdir(cacheDir):
+        key = hashlib.md5(sourceDir.encode('utf-8')).hexdigest()
+        cachePath = os.path.join(cacheDir, 'cadastre_majic_index_%s.json' % key)
+        try:
+            with open(cachePath, encoding='utf-8') as fin:
+                index = json.load(fin)
+            if isMajicSourceIndexValid(index, sourceDir, fileNames):
+                return index['files']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = buildMajicSourceIndex(sourceDir, fileNames)
+
+    if cachePath:
+        try:
+            with open(cachePath, 'w', encoding='utf-8') as fout:
+                json.dump(index, fout)
+        except OSError:
+            # The cache is only an optimization
+            pass
+
+    return index['files']
+
+
+def getStatementTarget(sql: str) -> str:
+    """
+    Get the table modified by an INSERT, UPDATE or DELETE query
+    """
+    match = STATEMENT_TARGET.search(sql)
+    return match.group(1).lower() if match else None
+
+
+def getMajicDependentTables(sql: str, tables: Iterable[str]) -> Set[str]:
+    """
+    Get the given tables and all the tables filled by the queries
+    of a formatting script from them, directly or through other formatted tables.
+    Ex: prop -> proprietaire -> comptecommunal
+    """
+    statements = []
+    for statement in splitSqlStatements(sql):
+        target = getStatementTarget(statement)
+        if target:
+            sources = set(a.lower() for a in STATEMENT_SOURCES.findall(statement))
+            statements.append((target, sources - {target}))
+
+    dependents = set(tables)
+    changed = True
+    while changed:
+        changed = False
+        for target, sources in statements:
+            if target not in dependents and sources & dependents:
+                dependents.add(target)
+                changed = True
+    return dependents
+
+
+def majicRawPartitionSql(schema: str, table: str) -> str:
+    """
+    Get the SQL replacing a raw MAJIC table by a table partitioned by record type
+    (bati_00, bati_10, ..., bati_default) for PostgreSQL >= 11.
+    Existing lines are kept.
+    """
+    position, length, codes = MAJIC_RAW_PARTITIONS[table]
+    sql = 'ALTER TABLE "{0}"."{1}" RENAME TO "{1}_unpartitioned";'
+    sql += 'CREATE TABLE "{0}"."{1}" (tmp text) PARTITION BY LIST (substring(tmp, %s, %s));' % (position, length)
+    for code in codes:
+        sql += 'CREATE TABLE "{0}"."{1}_%s" PARTITION OF "{0}"."{1}" FOR VALUES IN (\'%s\');' % (code, code)
+    sql += 'CREATE TABLE "{0}"."{1}_default" PARTITION OF "{0}"."{1}" DEFAULT;'
+    sql += 'INSERT INTO "{0}"."{1}" SELECT tmp FROM "{0}"."{1}_unpartitioned";'
+    sql += 'DROP TABLE "{0}"."{1}_unpartitioned";'
+    return sql.format(schema, table)
+
+
+def sanitizeMajicBlock(block: bytes, prefix: bytes, lineFilter: Any) -> bytes:
+    """
+    Replace non printable bytes in a block of complete lines
+    and keep only the lines which start with the given prefix
+    """
+    block = block.replace(b'\r\n', b'\n').translate(PRINTABLE_BYTES)
+    # Usually every line belongs to the same departement and direction:
+    # then the whole block is kept without splitting it into lines
+    if block.startswith(prefix) and block.count(b'\n' + prefix) == block.count(b'\n') - 1:
+        return block
+    return b''.join(lineFilter.findall(block))
+
+
+def majicBlocks(fin: BinaryIO, depdir: str, bufferSize: int = MAJIC_BUFFER_SIZE) -> Iterator[bytes]:
+    """
+    Yield sanitized blocks of complete lines of a MAJIC file
+    opened in binary mode, keeping only the lines
+    which belong to the given departement and direction
+    """
+    prefix = depdir.encode('ascii')
+    lineFilter = re.compile(b'^' + re.escape(prefix) + b'.*\n', re.MULTILINE)
+    rest = b''
+    while True:
+        data = fin.read(bufferSize)
+        if not data:
+            break
+        end = data.rfind(b'\n') + 1
+        if not end:
+            rest += data
+            continue
+        block = sanitizeMajicBlock(rest + data[:end], prefix, lineFilter)
+        rest = data[end:]
+        if block:
+            yield block
+
+    if rest:
+        block = sanitizeMajicBlock(rest + b'\n', prefix, lineFilter)
+        if block:
+            yield block
+
+
+def majicLines(fin: BinaryIO, depdir: str) -> Iterator[str]:
+    """
+    Yield the sanitized lines of a MAJIC file opened in binary mode
+    which belong to the given departement and direction
+    """
+    for block in majicBlocks(fin, depdir):
+        yield from block.decode('ascii').splitlines()
+
+
+def copyMajicFile(connection: Any, fpath: str, schema: str, table: str, depdir: str) -> int:
+    """
+    Stream one MAJIC file into its raw table
+    with COPY FROM STDIN on the given psycopg2 connection
+    and commit. Returns the number of imported lines.
+    Errors are raised after a rollback.
+    """
+    sql = 'COPY "%s"."%s" (tmp) FROM STDIN' % (schema, table)
+    with openMajicFile(fpath) as fin:
+        cursor = connection.cursor()
+        try:
+            # Backslash is the only special character left after sanitization
+            cursor.copy_expert(sql, CopyStream(majicBlocks(fin, depdir)))
+            rowCount = cursor.rowcount
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    return rowCount
+
+
+class MajicDecoder:
+    """
+    Decode MAJIC lines into rows of the formatted tables
+    (parcelle, suf, local00, proprietaire, etc.)
+    with the declarative layouts of a data version.
+    The keys of the rows of the DISTINCT tables are kept
+    until all the files of their raw source are decoded (see releaseSource)
+    """
+
+    def __init__(self, layouts: Dict[str, Dict[str, Any]], replaceDict: Dict[str, str]):
+        self.columns = {}
+        self.selectors = {}
+        self.filters = {}
+        self.seen = {}
+        self.locks = {}
+        self.distinctTables = {}
+
+        for table, layout in layouts.items():
+            self.columns[table] = [column for column, field in layout['columns']]
+            fields = [
+                const(replaceDict[field]) if isinstance(field, Param) else field
+                for column, field in layout['columns']
+            ]
+            distinct = layout.get('distinct')
+            if distinct and distinct is not True:
+                distinct = [self.columns[table].index(column) for column in distinct]
+            source = layout['source']
+            if distinct:
+                self.seen[table] = set()
+                self.locks[table] = threading.Lock()
+                self.distinctTables.setdefault(source, []).append(table)
+            record = MajicRecord(table, fields, layout.get('where', []), distinct)
+
+            if 'code' in layout:
+                position, length, code = layout['code']
+                selector = (position - 1, position - 1 + length)
+                codes = self.selectors.setdefault(source, {}).setdefault(selector, {})
+                codes.setdefault(code, []).append(record)
+            else:
+                self.filters.setdefault(source, []).append(record)
+
+    @property
+    def tables(self) -> List[str]:
+        """
+        Formatted tables filled by the decoder
+        """
+        return list(self.columns)
+
+    def handles(self, sql: str) -> bool:
+        """
+        Check if a formatting query fills one of the decoded tables
+        from the raw tables, and can then be skipped
+        """
+        target = INSERT_TARGET.search(sql)
+        return bool(target and target.group(1) in self.columns and RAW_TABLE_SOURCE.search(sql))
+
+    def isNew(self, record: MajicRecord, row: List[Any]) -> bool:
+        """
+        Check that a row of a DISTINCT table has not been seen yet
+        """
+        if record.distinct is True:
+            rowKey = tuple(row)
+        else:
+            rowKey = tuple(row[i] for i in record.distinct)
+        seen = self.seen[record.table]
+        with self.locks[record.table]:
+            if rowKey in seen:
+                return False
+            seen.add(rowKey)
+        return True
+
+    def releaseSource(self, source: str):
+        """
+        Forget the rows seen in the files of a raw source,
+        once all of them have been decoded
+        """
+        for table in self.distinctTables.get(source, []):
+            with self.locks[table]:
+                self.seen[table] = set()
+
+    def decode(self, lines: Iterable[str], source: str) -> Iterator[Tuple[str, List[Any]]]:
+        """
+        Yield (table, row) for each record found in the lines
+        of the given raw source (bati, nbat, prop, etc.)
+        """
+        selectors = list(self.selectors.get(source, {}).items())
+        filters = self.filters.get(source, [])
+        for line in lines:
+            records = []
+            for (start, end), codes in selectors:
+                records += codes.get(line[start:end], [])
+            for record in filters:
+                if all(condition(line) for condition in record.where):
+                    records.append(record)
+
+            for record in records:
+                row = [field(line) for field in record.fields]
+                if record.distinct and not self.isNew(record, row):
+                    continue
+                yield record.table, row
+
+
+def decodeMajicFile(
+        fpath: str, source: str, depdir: str, decoder: MajicDecoder,
+        writeRows: Callable[[str, List[str], List[List[Any]]], None], batchSize: int = 50000) -> int:
+    """
+    Decode one MAJIC file and give the rows to writeRows
+    by batches of batchSize rows per table.
+    Returns the number of decoded rows.
+    """
+    buffers = {}
+    rowCount = 0
+    with openMajicFile(fpath) as fin:
+        for table, row in decoder.decode(majicLines(fin, depdir), source):
+            rows = buffers.setdefault(table, [])
+            rows.append(row)
+            rowCount += 1
+            if len(rows) >= batchSize:
+                writeRows(table, decoder.columns[table], rows)
+                buffers[table] = []
+
+    for table, rows in buffers.items():
+        if rows:
+            writeRows(table, decoder.columns[table], rows)
+
+    return rowCount
+
+
+def copyDecodedMajicFile(
+        connection: Any, fpath: str, schema: str, source: str, depdir: str,
+        decoder: MajicDecoder, batchSize: int = 50000) -> int:
+    """
+    Decode one MAJIC file straight into the formatted tables
+    with COPY FROM STDIN on the given psycopg2 connection
+    and commit. Returns the number of imported rows.
+    Errors are raised after a rollback.
+    """
+    cursor = connection.cursor()
+    try:
+        rowCount = decodeMajicFile(
+            fpath, source, depdir, decoder,
+            lambda table, columns, rows: copyRows(cursor, schema, table, columns, rows),
+            batchSize
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return rowCount
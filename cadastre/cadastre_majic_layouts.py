@@ -0,0 +1,971 @@
+"""
+Cadastre - MAJIC fixed-width record layouts
+
+This plugins helps users to import the french land registry ('cadastre')
+into a database. It is meant to ease the use of the data in QGIs
+by providing search tools and appropriate layer symbology.
+
+begin     : 2021-01-18
+copyright : (C) 2021 by 3liz
+email     : info@3liz.com
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+"""
+from typing import Any, Callable
+
+# Each field is a function which takes a MAJIC line and returns a value.
+# Positions and lengths are the ones used by SUBSTRING(tmp, position, length)
+# in scripts/plugin/<version>/majic3_formatage_donnees.sql
+
+Field = Callable[[str], Any]
+
+
+class Param(str):
+    """
+    Import parameter, like [ANNEE] or [LOT],
+    replaced by its value when the layout is compiled
+    """
+
+
+ANNEE = Param('[ANNEE]')
+LOT = Param('[LOT]')
+
+
+def text(position: int, length: int) -> Field:
+    """ SUBSTRING(tmp, position, length) """
+    start = position - 1
+    end = start + length
+    return lambda line: line[start:end]
+
+
+def trimmed(position: int, length: int) -> Field:
+    """ trim(SUBSTRING(tmp, position, length)) """
+    start = position - 1
+    end = start + length
+    return lambda line: line[start:end].strip(' ')
+
+
+def blankNull(position: int, length: int, *nullValues: str) -> Field:
+    """ SUBSTRING(tmp, position, length) or NULL if blank or in nullValues """
+    start = position - 1
+    end = start + length
+
+    def field(line):
+        value = line[start:end]
+        if not value.strip(' ') or value in nullValues:
+            return None
+        return value
+    return field
+
+
+def trimNull(position: int, length: int) -> Field:
+    """ trim(SUBSTRING(tmp, position, length)) or NULL if blank """
+    start = position - 1
+    end = start + length
+    return lambda line: line[start:end].strip(' ') or None
+
+
+def toNumber(value: str, digits: int) -> int:
+    """
+    Convert a MAJIC number like to_number(value, '99...9') does,
+    with a format of `digits` digits: each digit of the format reads
+    one character, after skipping a space, and the other characters
+    are ignored. A minus sign before the first digit makes the number
+    negative. Raise ValueError if there is no digit, like PostgreSQL
+    """
+    if len(value) <= digits and value.isdigit() and value.isascii():
+        return int(value)
+    number = ''
+    sign = ''
+    pos = 0
+    for _ in range(digits):
+        if pos < len(value) and value[pos] == ' ':
+            pos += 1
+        if pos < len(value) and value[pos] == '-' and not number and not sign:
+            sign = '-'
+            pos += 1
+        if pos >= len(value):
+            break
+        if '0' <= value[pos] <= '9':
+            number += value[pos]
+        pos += 1
+    if not number:
+        raise ValueError('invalid input syntax for type numeric: "{}"'.format(value))
+    return int(sign + number)
+
+
+def number(position: int, length: int, divisor: int = None, digits: int = None, strip: bool = False) -> Field:
+    """
+    CASE WHEN trim(SUBSTRING(tmp, position, length)) = '' THEN NULL
+    ELSE to_number([trim](SUBSTRING(tmp, position, length)), '9' * digits) [/ divisor] END
+
+    The format has `length` digits unless `digits` is given
+    """
+    start = position - 1
+    end = start + length
+    digits = digits or length
+
+    def field(line):
+        value = line[start:end]
+        if not value.strip(' '):
+            return None
+        value = toNumber(value.strip(' ') if strip else value, digits)
+        if divisor is None:
+            return value
+        return value / divisor
+    return field
+
+
+def requiredNumber(position: int, length: int) -> Field:
+    """
+    to_number(SUBSTRING(tmp, position, length), '9' * length),
+    without any check: a blank value is an error, like in the script
+    """
+    start = position - 1
+    end = start + length
+    return lambda line: toNumber(line[start:end], length)
+
+
+def concat(*parts: Field) -> Field:
+    """ part1 || part2 || ... """
+    return lambda line: ''.join(part(line) for part in parts)
+
+
+def key(*parts: Field) -> Field:
+    """ REPLACE(part1 || part2 || ..., ' ', '0') """
+    return lambda line: ''.join(part(line) for part in parts).replace(' ', '0')
+
+
+def keyIf(position: int, length: int, *parts: Field) -> Field:
+    """ key(parts) or NULL if SUBSTRING(tmp, position, length) is blank """
+    start = position - 1
+    end = start + length
+    build = key(*parts)
+    return lambda line: build(line) if line[start:end].strip(' ') else None
+
+
+def flag(position: int) -> Field:
+    """ '1' if SUBSTRING(tmp, position, 1) is '1', '0' otherwise """
+    start = position - 1
+    return lambda line: '1' if line[start:start + 1] == '1' else '0'
+
+
+def const(value: Any) -> Field:
+    """ Constant value """
+    return lambda line: value
+
+
+def blank(position: int, length: int) -> Callable[[str], bool]:
+    """ trim(SUBSTRING(tmp, position, length)) = '' """
+    start = position - 1
+    end = start + length
+    return lambda line: not line[start:end].strip(' ')
+
+
+def filled(position: int, length: int) -> Callable[[str], bool]:
+    """ trim(SUBSTRING(tmp, position, length)) != '' """
+    start = position - 1
+    end = start + length
+    return lambda line: bool(line[start:end].strip(' '))
+
+
+def differs(position: int, length: int, value: str) -> Callable[[str], bool]:
+    """ SUBSTRING(tmp, position, length) != value, without blank padding """
+    start = position - 1
+    end = start + length
+    return lambda line: line[start:end] != value
+
+
+# Layouts of the formatted MAJIC tables, by data version.
+# For each table:
+# * source: raw MAJIC table (bati, fanr, lloc, nbat, pdll, prop)
+# * code: (position, length, value) of the record type, if any
+# * where: list of conditions the line must match, if any
+# * distinct: True to skip duplicated rows,
+#   or the columns which identify a row (DISTINCT ON)
+# * columns: ordered list of (column, field)
+MAJIC_LAYOUTS = {
+    '2020': {
+        'parcelle': {
+            'source': 'nbat',
+            'code': (20, 2, '10'),
+            'columns': [
+                ('parcelle', key(text(1, 15))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('ccopre', text(7, 3)),
+                ('ccosec', text(10, 2)),
+                ('dnupla', text(12, 4)),
+                ('dcntpa', requiredNumber(22, 9)),
+                ('dsrpar', const(None)),
+                ('dnupro', text(32, 6)),
+                ('jdatat', blankNull(38, 8)),
+                ('dreflf', text(46, 5)),
+                ('gpdl', text(51, 1)),
+                ('cprsecr', text(52, 3)),
+                ('ccosecr', text(55, 2)),
+                ('dnuplar', text(57, 4)),
+                ('dnupdl', blankNull(61, 3)),
+                ('gurbpa', text(64, 1)),
+                ('dparpi', text(65, 4)),
+                ('ccoarp', text(69, 1)),
+                ('gparnf', flag(70)),
+                ('gparbat', flag(71)),
+                ('parrev', text(72, 12)),
+                ('gpardp', flag(84)),
+                ('fviti', text(85, 1)),
+                ('dnvoiri', text(86, 4)),
+                ('dindic', text(90, 1)),
+                ('ccovoi', text(91, 5)),
+                ('ccoriv', text(96, 4)),
+                ('ccocif', text(100, 4)),
+                ('ccpper', text(122, 3)),
+                ('gpafpd', text(104, 1)),
+                ('ajoutcoherence', const('N')),
+                ('comptecommunal', key(text(1, 2), text(3, 4), text(32, 6))),
+                ('pdl', keyIf(61, 3, text(1, 6), text(52, 9), text(61, 3))),
+                ('voie', keyIf(91, 5, text(1, 6), text(91, 5), text(96, 4))),
+                ('cconvo', trimmed(136, 4)),
+                ('dvoilib', text(140, 26)),
+                ('ccocomm', blankNull(166, 3)),
+                ('ccoprem', blankNull(169, 3)),
+                ('ccosecm', blankNull(172, 2)),
+                ('dnuplam', blankNull(174, 4)),
+                ('parcellefiliation', keyIf(174, 4, text(1, 3), text(166, 12))),
+                ('type_filiation', text(178, 1)),
+                ('ccoifp', number(179, 3)),
+                ('inspireid', key(const('FR'), text(1, 15))),
+                ('lot', LOT),
+            ]
+        },
+        'suf': {
+            'source': 'nbat',
+            'code': (20, 2, '21'),
+            'columns': [
+                ('suf', key(text(1, 15), trimmed(16, 2))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('ccopre', text(7, 3)),
+                ('ccosec', text(10, 2)),
+                ('dnupla', text(12, 4)),
+                ('ccosub', trimmed(16, 2)),
+                ('dcntsf', number(22, 9)),
+                ('dnupro', text(31, 6)),
+                ('gnexps', blankNull(37, 2)),
+                ('drcsub', number(39, 10, 100)),
+                ('drcsuba', number(49, 10, 100)),
+                ('ccostn', text(59, 1)),
+                ('cgrnum', blankNull(60, 2)),
+                ('dsgrpf', trimNull(62, 2)),
+                ('dclssf', text(64, 2)),
+                ('cnatsp', trimNull(66, 5)),
+                ('drgpos', text(71, 1)),
+                ('ccoprel', text(72, 3)),
+                ('ccosecl', text(75, 2)),
+                ('dnuplal', text(77, 4)),
+                ('dnupdl', blankNull(81, 3)),
+                ('dnulot', text(84, 7)),
+                ('rclsi', text(91, 46)),
+                ('gnidom', text(137, 1)),
+                ('topja', text(138, 1)),
+                ('datja', blankNull(139, 8)),
+                ('postel', text(147, 1)),
+                ('ccortar', number(148, 3)),
+                ('parcelle', key(text(1, 15))),
+                ('comptecommunal', key(text(1, 2), text(3, 4), text(31, 6))),
+                ('pdl', keyIf(81, 3, text(1, 6), text(72, 9), text(81, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'sufexoneration': {
+            'source': 'nbat',
+            'code': (20, 2, '30'),
+            'columns': [
+                ('sufexoneration', key(text(1, 15), trimmed(16, 2), text(18, 2))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('ccopre', text(7, 3)),
+                ('ccosec', text(10, 2)),
+                ('dnupla', text(12, 4)),
+                ('ccosub', trimmed(16, 2)),
+                ('rnuexn', text(18, 2)),
+                ('ccolloc', trimNull(32, 2)),
+                ('pexn', number(34, 5)),
+                ('gnexts', trimNull(39, 2)),
+                ('jandeb', text(41, 4)),
+                ('jfinex', text(45, 4)),
+                ('fcexn', text(49, 10)),
+                ('fcexna', text(59, 10)),
+                ('rcexna', text(69, 10)),
+                ('rcexnba', number(79, 10, 100)),
+                ('mpexnba', text(90, 10)),
+                ('suf', key(text(1, 15), trimmed(16, 2))),
+                ('lot', LOT),
+            ]
+        },
+        'suftaxation': {
+            'source': 'nbat',
+            'code': (20, 2, '36'),
+            'columns': [
+                ('suftaxation', key(text(1, 15), trimmed(16, 2))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('ccopre', text(7, 3)),
+                ('ccosec', text(10, 2)),
+                ('dnupla', text(12, 4)),
+                ('ccosub', trimmed(16, 2)),
+                ('c1majposa', number(23, 10, 100)),
+                ('c1bisufad', number(34, 10, 100)),
+                ('c2majposa', number(45, 10, 100)),
+                ('c2bisufad', number(56, 10, 100)),
+                ('c3majposa', number(67, 10, 100)),
+                ('c3bisufad', number(78, 10, 100)),
+                ('c4majposa', number(89, 10, 100)),
+                ('c4bisufad', number(100, 10, 100)),
+                ('cntmajtc', number(110, 9)),
+                ('suf', key(text(1, 15), trimmed(16, 2))),
+                ('lot', LOT),
+            ]
+        },
+        'local00': {
+            'source': 'bati',
+            'code': (31, 2, '00'),
+            'columns': [
+                ('local00', key(text(1, 3), text(7, 10))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('ccopre', text(36, 3)),
+                ('ccosec', text(39, 2)),
+                ('dnupla', text(41, 4)),
+                ('dnubat', text(46, 2)),
+                ('descr', text(48, 2)),
+                ('dniv', text(50, 2)),
+                ('dpor', text(52, 5)),
+                ('ccoriv', text(57, 4)),
+                ('ccovoi', text(62, 5)),
+                ('dnvoiri', text(67, 4)),
+                ('dindic', text(71, 1)),
+                ('ccocif', text(72, 4)),
+                ('dvoilib', text(76, 30)),
+                ('cleinvar', text(106, 1)),
+                ('ccpper', text(125, 3)),
+                ('locinc', text(107, 1)),
+                ('parcelle', key(text(1, 6), text(36, 9))),
+                ('voie', concat(key(text(1, 6), text(62, 5)), text(57, 4))),
+                ('lot', LOT),
+            ]
+        },
+        'local10': {
+            'source': 'bati',
+            'code': (31, 2, '10'),
+            'columns': [
+                ('local10', key(text(1, 3), text(7, 10))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('gpdl', text(36, 1)),
+                ('dsrpar', const(None)),
+                ('dnupro', text(38, 6)),
+                ('jdatat', blankNull(44, 8)),
+                ('dnufnl', text(52, 6)),
+                ('ccoeva', trimNull(58, 1)),
+                ('ccitlv', text(59, 1)),
+                ('dteloc', trimNull(60, 1)),
+                ('gtauom', text(61, 2)),
+                ('dcomrd', text(63, 3)),
+                ('ccoplc', text(66, 1)),
+                ('cconlc', trimNull(67, 2)),
+                ('dvltrt', number(69, 9)),
+                ('ccoape', text(78, 4)),
+                ('cc48lc', text(82, 2)),
+                ('dloy48a', number(84, 9)),
+                ('top48a', trimNull(93, 1)),
+                ('dnatlc', trimNull(94, 1)),
+                ('dnupas', text(95, 8)),
+                ('gnexcf', text(103, 2)),
+                ('dtaucf', text(105, 3)),
+                ('cchpr', text(108, 1)),
+                ('jannat', text(109, 4)),
+                ('dnbniv', text(113, 2)),
+                ('hlmsem', trimNull(115, 1)),
+                ('postel', text(116, 1)),
+                ('dnatcg', text(117, 2)),
+                ('jdatcgl', blankNull(119, 8)),
+                ('dnutbx', text(127, 6)),
+                ('dvltla', text(133, 9)),
+                ('janloc', text(142, 4)),
+                ('ccsloc', text(146, 2)),
+                ('fburx', number(148, 1)),
+                ('gimtom', text(149, 1)),
+                ('cbtabt', text(150, 2)),
+                ('jdtabt', text(152, 4)),
+                ('jrtabt', text(156, 4)),
+                ('jacloc', text(160, 4)),
+                ('cconac', text(169, 5)),
+                ('toprev', text(174, 1)),
+                ('ccoifp', number(175, 3)),
+                ('comptecommunal', key(text(1, 2), text(3, 4), text(38, 6))),
+                ('lot', LOT),
+            ]
+        },
+        'pev': {
+            'source': 'bati',
+            'code': (31, 2, '21'),
+            'columns': [
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('dnupev', text(28, 3)),
+                ('ccoaff', trimNull(36, 1)),
+                ('ccostb', text(37, 1)),
+                ('dcapec', text(38, 2)),
+                ('dcetlc', number(40, 3, 100)),
+                ('ccocac', text(46, 4)),
+                ('dnutrf', text(50, 2)),
+                ('dcfloc', number(52, 3)),
+                ('dsupot', number(55, 6)),
+                ('dvlper', number(61, 9)),
+                ('dvlpera', number(70, 9)),
+                ('gnexpl', trimNull(79, 2)),
+                ('ccthp', text(111, 1)),
+                ('retimp', text(112, 1)),
+                ('dnuref', text(113, 3)),
+                ('gnidom', text(116, 1)),
+                ('dvltpe', number(130, 9)),
+                ('tpevtieom', number(144, 1)),
+                ('ccortar', number(145, 3)),
+                ('ccorvl', text(148, 2)),
+                ('dtaurv', number(150, 3)),
+                ('dcmloc', number(153, 3)),
+                ('dcsplca', text(156, 5)),
+                ('dcsglca', text(161, 5)),
+                ('dcralca', text(166, 5)),
+                ('local10', concat(text(1, 3), text(7, 10))),
+                ('lot', LOT),
+            ]
+        },
+        'pevexoneration': {
+            'source': 'bati',
+            'code': (31, 2, '30'),
+            'columns': [
+                ('pevexoneration', key(text(1, 3), text(7, 10), text(28, 3), text(33, 3), trimmed(24, 4))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('janbil', trimmed(24, 4)),
+                ('dnupev', text(28, 3)),
+                ('dnuexb', text(33, 3)),
+                ('ccolloc', trimNull(36, 2)),
+                ('pexb', number(38, 5, 100)),
+                ('gnextl', trimNull(43, 2)),
+                ('jandeb', text(45, 4)),
+                ('janimp', text(49, 4)),
+                ('vecdif', text(53, 9)),
+                ('vecdifa', text(63, 9)),
+                ('fcexb', text(73, 9)),
+                ('fcexba', text(83, 9)),
+                ('rcexba', text(93, 9)),
+                ('dvldif2', number(103, 9)),
+                ('dvldif2a', number(113, 9)),
+                ('fcexb2', number(123, 9)),
+                ('fcexba2', number(133, 9)),
+                ('rcexba2', number(143, 9)),
+                ('valplaf', blankNull(173, 10)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'pevexoneration_imposable': {
+            'source': 'bati',
+            'code': (31, 2, '30'),
+            'columns': [
+                ('pevexoneration_imposable', key(text(1, 3), text(7, 10), text(28, 3), text(33, 3), trimmed(24, 4))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('janbil', trimmed(24, 4)),
+                ('dnupev', text(28, 3)),
+                ('dnuexb', text(33, 3)),
+                ('ccolloc', trimNull(36, 2)),
+                ('pexb', number(38, 5, 100)),
+                ('gnextl', trimNull(43, 2)),
+                ('jandeb', text(45, 4)),
+                ('janimp', text(49, 4)),
+                ('vecdif', text(53, 9)),
+                ('vecdifa', text(63, 9)),
+                ('fcexb', text(73, 9)),
+                ('fcexba', text(83, 9)),
+                ('rcexba', text(93, 9)),
+                ('dvldif2', number(103, 9)),
+                ('dvldif2a', number(113, 9)),
+                ('fcexb2', number(123, 9)),
+                ('fcexba2', number(133, 9)),
+                ('rcexba2', number(143, 9)),
+                ('valplaf', blankNull(173, 10)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'pevexoneration_imposee': {
+            'source': 'bati',
+            'code': (31, 2, '31'),
+            'columns': [
+                ('pevexoneration_imposee', key(text(1, 3), text(7, 10), text(28, 3), text(33, 3), trimmed(24, 4))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('janbil', trimmed(24, 4)),
+                ('dnupev', text(28, 3)),
+                ('dnuexb', text(33, 3)),
+                ('ccolloc', trimNull(36, 2)),
+                ('pexb', number(38, 5, 100)),
+                ('gnextl', trimNull(43, 2)),
+                ('jandeb', text(45, 4)),
+                ('janimp', text(49, 4)),
+                ('vecdif', text(53, 9)),
+                ('vecdifa', text(63, 9)),
+                ('fcexb', text(73, 9)),
+                ('fcexba', text(83, 9)),
+                ('rcexba', text(93, 9)),
+                ('dvldif2', number(103, 9)),
+                ('dvldif2a', number(113, 9)),
+                ('fcexb2', number(123, 9)),
+                ('fcexba2', number(133, 9)),
+                ('rcexba2', number(143, 9)),
+                ('valplaf', blankNull(173, 10)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'pevtaxation': {
+            'source': 'bati',
+            'code': (31, 2, '36'),
+            'columns': [
+                ('pevtaxation', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('janbil', text(24, 4)),
+                ('dnupev', text(28, 3)),
+                ('co_vlbai', number(36, 9)),
+                ('co_vlbaia', number(46, 9)),
+                ('co_bipevla', number(56, 9)),
+                ('de_vlbai', number(66, 9)),
+                ('de_vlbaia', number(76, 9)),
+                ('de_bipevla', number(86, 9)),
+                ('tse_vlbai', number(96, 9)),
+                ('tse_vlbaia', number(106, 9)),
+                ('tse_bipevla', number(116, 9)),
+                ('gp_vlbai', number(126, 9)),
+                ('gp_vlbaia', number(136, 9)),
+                ('gp_bipevla', number(146, 9)),
+                ('bateom', number(156, 9)),
+                ('baomec', number(166, 9)),
+                ('mvltieomx', number(175, 6)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'pevprincipale': {
+            'source': 'bati',
+            'code': (31, 2, '40'),
+            'columns': [
+                ('pevprincipale', key(text(1, 3), text(7, 10), text(28, 3), trimmed(33, 3))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('dnupev', text(28, 3)),
+                ('dnudes', trimmed(33, 3)),
+                ('dep1_cconad', trimNull(36, 2)),
+                ('dep1_dsueic', number(38, 6)),
+                ('dep1_dcimei', number(44, 2, 10)),
+                ('dep2_cconad', trimNull(46, 2)),
+                ('dep2_dsueic', number(48, 6)),
+                ('dep2_dcimei', number(54, 2, 10)),
+                ('dep3_cconad', trimNull(56, 2)),
+                ('dep3_dsueic', number(58, 6)),
+                ('dep3_dcimei', number(64, 2, 10)),
+                ('dep4_cconad', trimNull(66, 2)),
+                ('dep4_dsueic', number(68, 6)),
+                ('dep4_dcimei', number(74, 2, 10)),
+                ('geaulc', text(76, 1)),
+                ('gelelc', text(77, 1)),
+                ('gesclc', text(78, 1)),
+                ('ggazlc', text(79, 1)),
+                ('gasclc', text(80, 1)),
+                ('gchclc', text(81, 1)),
+                ('gvorlc', text(82, 1)),
+                ('gteglc', text(83, 1)),
+                ('dnbbai', text(84, 2)),
+                ('dnbdou', text(86, 2)),
+                ('dnblav', text(88, 2)),
+                ('dnbwc', text(90, 2)),
+                ('deqdha', number(92, 3)),
+                ('dnbppr', text(95, 2)),
+                ('dnbsam', text(97, 2)),
+                ('dnbcha', text(99, 2)),
+                ('dnbcu8', text(101, 2)),
+                ('dnbcu9', text(103, 2)),
+                ('dnbsea', text(105, 2)),
+                ('dnbann', text(107, 2)),
+                ('dnbpdc', text(109, 2)),
+                ('dsupdc', number(111, 6)),
+                ('dmatgm', text(117, 2)),
+                ('dmatto', text(119, 2)),
+                ('jannat', text(121, 4)),
+                ('detent', text(125, 1)),
+                ('dnbniv', text(126, 2)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'pevprofessionnelle': {
+            'source': 'bati',
+            'code': (31, 2, '50'),
+            'columns': [
+                ('pevprofessionnelle', key(text(1, 3), text(7, 10), text(28, 3), text(33, 3))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('dnupev', text(28, 3)),
+                ('dsupot', number(36, 9)),
+                ('dsup1', number(45, 9)),
+                ('dsup2', number(54, 9)),
+                ('dsup3', number(63, 9)),
+                ('dsupk1', number(72, 9)),
+                ('dsupk2', number(81, 9)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'pevlissage': {
+            'source': 'bati',
+            'code': (31, 2, '52'),
+            'distinct': True,
+            'columns': [
+                ('pevlissage', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('dnupev', text(28, 3)),
+                ('mlbcom', number(36, 11)),
+                ('mlbsyn', number(48, 11)),
+                ('mlbcu', number(60, 11)),
+                ('mlbdep', number(72, 11)),
+                ('mlbts1', number(84, 11)),
+                ('mlbts2', number(96, 11)),
+                ('mlbtas', number(108, 11)),
+                ('mlbgem', number(120, 11)),
+                ('mlbtom', number(132, 11)),
+                ('tbfpas', number(144, 11)),
+                ('mlbtfc', number(168, 11)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'pevdependances': {
+            'source': 'bati',
+            'code': (31, 2, '60'),
+            'columns': [
+                ('pevdependances', key(text(1, 3), text(7, 10), text(28, 3), text(33, 3))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('invar', text(7, 10)),
+                ('dnupev', text(28, 3)),
+                ('dnudes', text(33, 3)),
+                ('dsudep', number(36, 6)),
+                ('cconad', trimNull(42, 2)),
+                ('asitet', text(44, 6)),
+                ('dmatgm', text(50, 2)),
+                ('dmatto', text(52, 2)),
+                ('detent', text(54, 1)),
+                ('geaulc', text(55, 1)),
+                ('gelelc', text(56, 1)),
+                ('gchclc', text(57, 1)),
+                ('dnbbai', text(58, 2)),
+                ('dnbdou', text(60, 2)),
+                ('dnblav', text(62, 2)),
+                ('dnbwc', text(64, 2)),
+                ('deqtlc', number(66, 3)),
+                ('dcimlc', number(69, 2, 10)),
+                ('dcetde', number(71, 3, 100)),
+                ('dcspde', text(74, 3)),
+                ('dcspdea', text(77, 6)),
+                ('pev', key(text(1, 3), text(7, 10), text(28, 3))),
+                ('lot', LOT),
+            ]
+        },
+        'commune_majic': {
+            'source': 'bati',
+            'where': [blank(31, 2), filled(4, 3)],
+            'columns': [
+                ('commune', key(text(1, 6))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('libcom', text(17, 30)),
+                ('lot', LOT),
+            ]
+        },
+        'proprietaire': {
+            'source': 'prop',
+            'where': [filled(7, 6)],
+            'distinct': ('ccodep', 'ccocom', 'dnupro', 'dnulp', 'dnuper'),
+            'columns': [
+                ('proprietaire', key(text(1, 2), text(7, 6), text(13, 2), text(19, 6))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('dnupro', text(7, 6)),
+                ('dnulp', text(13, 2)),
+                ('ccocif', text(15, 4)),
+                ('dnuper', text(19, 6)),
+                ('ccodro', trimNull(25, 1)),
+                ('ccodem', trimNull(26, 1)),
+                ('gdesip', text(27, 1)),
+                ('gtoper', trimNull(28, 1)),
+                ('ccoqua', trimNull(29, 1)),
+                ('dnatpr', trimNull(35, 3)),
+                ('ccogrm', trimNull(38, 2)),
+                ('dsglpm', text(40, 10)),
+                ('dforme', text(50, 4)),
+                ('ddenom', text(57, 60)),
+                ('gtyp3', trimNull(117, 1)),
+                ('gtyp4', trimNull(118, 1)),
+                ('gtyp5', trimNull(119, 1)),
+                ('gtyp6', trimNull(120, 1)),
+                ('dlign3', text(121, 30)),
+                ('dlign4', text(151, 36)),
+                ('dlign5', text(187, 30)),
+                ('dlign6', text(217, 32)),
+                ('ccopay', text(249, 3)),
+                ('ccodep1a2', text(252, 2)),
+                ('ccodira', text(254, 1)),
+                ('ccocom_adr', text(255, 3)),
+                ('ccovoi', text(258, 5)),
+                ('ccoriv', text(263, 4)),
+                ('dnvoiri', text(267, 4)),
+                ('dindic', text(271, 1)),
+                ('ccopos', text(272, 5)),
+                ('dqualp', text(287, 3)),
+                ('dnomlp', text(290, 30)),
+                ('dprnlp', text(320, 15)),
+                ('jdatnss', blankNull(335, 10, '00/00/0000')),
+                ('dldnss', text(345, 58)),
+                ('epxnee', const(None)),
+                ('dnomcp', const(None)),
+                ('dprncp', const(None)),
+                ('dsiren', text(467, 9)),
+                ('topja', text(478, 1)),
+                ('datja', blankNull(479, 8)),
+                ('dformjur', text(534, 4)),
+                ('dnomus', text(538, 60)),
+                ('dprnus', text(598, 40)),
+                ('comptecommunal', key(text(1, 2), text(3, 4), text(7, 6))),
+                ('lot', LOT),
+            ]
+        },
+        'pdl': {
+            'source': 'pdll',
+            'code': (26, 2, '10'),
+            'columns': [
+                ('pdl', key(text(1, 18))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('ccopre', text(7, 3)),
+                ('ccosec', text(10, 2)),
+                ('dnupla', text(12, 4)),
+                ('dnupdl', text(16, 3)),
+                ('dnivim', text(28, 1)),
+                ('ctpdl', trimNull(29, 3)),
+                ('dmrpdl', text(62, 20)),
+                ('gprmut', text(82, 1)),
+                ('dnupro', text(83, 6)),
+                ('ccocif', text(94, 4)),
+                ('parcelle', key(text(1, 15))),
+                ('comptecommunal', key(text(1, 2), text(3, 4), text(83, 6))),
+                ('lot', LOT),
+            ]
+        },
+        'parcellecomposante': {
+            'source': 'pdll',
+            'code': (26, 2, '20'),
+            'columns': [
+                ('parcellecomposante', key(text(1, 18), text(28, 9))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('ccopre', text(7, 3)),
+                ('ccosec', text(10, 2)),
+                ('dnupla', text(12, 4)),
+                ('dnupdl', text(16, 3)),
+                ('ccoprea', text(28, 3)),
+                ('ccoseca', text(31, 2)),
+                ('dnuplaa', text(33, 4)),
+                ('ccocif', text(94, 4)),
+                ('pdl', key(text(1, 18))),
+                ('parcelle', key(text(1, 15))),
+                ('parcellea', keyIf(33, 4, text(1, 6), text(28, 9))),
+                ('lot', LOT),
+            ]
+        },
+        'lots': {
+            'source': 'pdll',
+            'code': (26, 2, '30'),
+            'columns': [
+                ('lots', key(text(1, 25))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('ccopre', text(7, 3)),
+                ('ccosec', text(10, 2)),
+                ('dnupla', text(12, 4)),
+                ('dnupdl', text(16, 3)),
+                ('dnulot', text(19, 7)),
+                ('cconlo', trimNull(28, 1)),
+                ('dcntlo', number(29, 9)),
+                ('dnumql', number(38, 7)),
+                ('ddenql', number(45, 7, digits=6)),
+                ('dfilot', text(52, 20)),
+                ('datact', blankNull(72, 8)),
+                ('dnuprol', text(83, 6)),
+                ('dreflf', text(89, 5)),
+                ('ccocif', text(94, 4)),
+                ('pdl', key(text(1, 18))),
+                ('comptecommunal', key(text(1, 2), text(3, 4), text(83, 6))),
+                ('parcelle', key(text(1, 15))),
+                ('lot', LOT),
+            ]
+        },
+        'lotslocaux': {
+            'source': 'lloc',
+            'distinct': True,
+            'columns': [
+                ('lotslocaux', key(text(1, 25), text(37, 10))),
+                ('annee', ANNEE),
+                ('ccodepl', text(1, 2)),
+                ('ccodirl', text(3, 1)),
+                ('ccocoml', text(4, 3)),
+                ('ccoprel', text(7, 3)),
+                ('ccosecl', text(10, 2)),
+                ('dnuplal', text(12, 4)),
+                ('dnupdl', text(16, 3)),
+                ('dnulot', text(19, 7)),
+                ('ccodebpb', text(28, 2)),
+                ('ccodird', text(30, 1)),
+                ('ccocomb', text(31, 3)),
+                ('ccopreb', text(34, 3)),
+                ('invloc', text(37, 10)),
+                ('dnumql', text(47, 7)),
+                ('ddenql', text(54, 7)),
+                ('lots', key(text(1, 25))),
+                ('local00', key(text(1, 3), text(37, 10))),
+                ('local10', key(text(1, 3), text(37, 10))),
+                ('lot', LOT),
+            ]
+        },
+        'commune': {
+            'source': 'fanr',
+            'where': [differs(4, 3, ' '), blank(7, 4)],
+            'columns': [
+                ('commune', key(text(1, 6))),
+                ('geo_commune', key(text(1, 6))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('clerivili', text(11, 1)),
+                ('libcom', text(12, 30)),
+                ('typcom', trimNull(43, 1)),
+                ('ruract', text(46, 1)),
+                ('carvoi', text(49, 1)),
+                ('indpop', text(50, 1)),
+                ('poprel', number(53, 7, strip=True)),
+                ('poppart', requiredNumber(60, 7)),
+                ('popfict', requiredNumber(67, 7)),
+                ('annul', text(74, 1)),
+                ('dteannul', text(75, 7)),
+                ('dtecreart', text(82, 7)),
+                ('codvoi', text(104, 5)),
+                ('typvoi', text(109, 1)),
+                ('indldnbat', text(110, 1)),
+                ('motclas', text(113, 8)),
+                ('lot', LOT),
+            ]
+        },
+        'voie': {
+            'source': 'fanr',
+            'where': [filled(4, 3), filled(7, 4)],
+            'columns': [
+                ('voie', key(text(1, 6), text(104, 5), text(7, 4))),
+                ('annee', ANNEE),
+                ('ccodep', text(1, 2)),
+                ('ccodir', text(3, 1)),
+                ('ccocom', text(4, 3)),
+                ('natvoiriv', trimNull(7, 1)),
+                ('ccoriv', text(7, 4)),
+                ('clerivili', text(11, 1)),
+                ('natvoi', trimmed(12, 4)),
+                ('libvoi', text(16, 26)),
+                ('typcom', trimNull(43, 1)),
+                ('ruract', text(46, 1)),
+                ('carvoi', trimNull(49, 1)),
+                ('indpop', text(50, 1)),
+                ('poprel', text(53, 7)),
+                ('poppart', requiredNumber(60, 7)),
+                ('popfict', requiredNumber(67, 7)),
+                ('annul', trimNull(74, 1)),
+                ('dteannul', text(75, 7)),
+                ('dtecreart', text(82, 7)),
+                ('codvoi', text(104, 5)),
+                ('typvoi', trimNull(109, 1)),
+                ('indldnbat', trimNull(110, 1)),
+                ('motclas', text(113, 8)),
+                ('commune', key(text(1, 6))),
+                ('lot', LOT),
+            ]
+        },
+    }
+}
@@ -0,0 +1,437 @@
+"""
+Cadastre - SQL scripts tools
+
+This plugins helps users to import the french land registry ('cadastre')
+into a database. It is meant to ease the use of the data in QGIs
+by providing search tools and appropriate layer symbology.
+
+begin     : 2021-02-15
+copyright : (C) 2021 by 3liz
+email     : info@3liz.com
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+"""
+import csv
+import io
+import json
+import os
+import re
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Pattern, Set, Tuple
+
+# Start of the SQL tokens in which a semicolon does not end the statement:
+# comments, string literals, quoted identifiers and dollar quoted bodies
+SQL_SPECIAL_TOKEN = re.compile(r"""--|/\*|(?<!\w)[eE]'|'|"|\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$|;""")
+
+# End of the tokens
+SQL_STRING_END = re.compile(r"(?:[^']|'')*'")
+SQL_ESCAPE_STRING_END = re.compile(r"(?:[^'\\]|''|\\.)*'", re.DOTALL)
+SQL_IDENTIFIER_END = re.compile(r'(?:[^"]|"")*"')
+
+# Keywords of the statements to execute
+SQL_QUERY_KEYWORDS = re.compile(
+    r'select |insert |update |delete |alter |create |drop |truncate |comment |copy |vacuum |analyze ',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Comments written in the log: "-- some comment" lines
+SQL_STEP_COMMENT = re.compile(r'^-- (.+)', re.IGNORECASE | re.MULTILINE)
+
+# Annotation of the statements which can run alongside the other annotated ones:
+# they only use the tables named in their text, not through views, functions or triggers
+SQL_PARALLEL_ANNOTATION = re.compile(r'^--@parallel\s*$', re.MULTILINE)
+
+# Table or index written by a statement, and the table of an index
+SQL_TABLE_NAME = r'(?:\[PREFIXE\]|"[^"]+"\.|\w+\.)?"?(\w+)'
+SQL_STATEMENT_WRITE = re.compile(
+    r'\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|ANALYZE|VACUUM(?:\s+ANALYZE)?'
+    r'|(?:CREATE|ALTER|DROP)\s+TABLE(?:\s+IF(?:\s+NOT)?\s+EXISTS)?'
+    r'|(?:CREATE|DROP)\s+(?:UNIQUE\s+)?INDEX(?:\s+CONCURRENTLY)?(?:\s+IF(?:\s+NOT)?\s+EXISTS)?)\s+'
+    r'%s' % SQL_TABLE_NAME,
+    re.IGNORECASE
+)
+SQL_INDEX_TABLE = re.compile(r'\bON\s+(?:ONLY\s+)?' + SQL_TABLE_NAME, re.IGNORECASE)
+
+# Tables read by a statement: the lists of tables after FROM, JOIN and USING,
+# with their aliases, comma joins included
+SQL_TABLE_SOURCE = re.compile(r'\b(?:FROM|JOIN|USING)\s+', re.IGNORECASE)
+SQL_TABLE_REFERENCE = re.compile(
+    SQL_TABLE_NAME + r'"?(?:\s+(?:AS\s+)?(?!(?:WHERE|ON|USING|JOIN|LEFT|RIGHT|INNER|FULL|CROSS|NATURAL|GROUP'
+    r'|ORDER|HAVING|LIMIT|OFFSET|UNION|EXCEPT|INTERSECT|WINDOW|FETCH|FOR|SET|RETURNING)\b)"?\w+"?)?\s*(,\s*)?',
+    re.IGNORECASE
+)
+
+# Whitespaces collapsed in the profile
+SQL_WHITESPACES = re.compile(r'\s+')
+
+# Special characters of the values written with the COPY text format
+COPY_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def scanSqlTokens(sql: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Find the semicolons and the comments of an SQL script,
+    skipping string literals, quoted identifiers and dollar quoted bodies.
+    Yields (token, start, end) tuples, token being ';', '--' or '/*'
+    """
+    pos = 0
+    length = len(sql)
+    while pos < length:
+        match = SQL_SPECIAL_TOKEN.search(sql, pos)
+        if not match:
+            break
+        token = match.group(0)
+        pos = match.end()
+        if token == ';':
+            yield token, match.start(), pos
+        elif token == '--':
+            end = sql.find('\n', pos)
+            pos = length if end < 0 else end
+            yield token, match.start(), pos
+        elif token == '/*':
+            end = sql.find('*/', pos)
+            pos = length if end < 0 else end + 2
+            yield token, match.start(), pos
+        elif token in ("e'", "E'"):
+            end = SQL_ESCAPE_STRING_END.match(sql, pos)
+            pos = end.end() if end else length
+        elif token == "'":
+            end = SQL_STRING_END.match(sql, pos)
+            pos = end.end() if end else length
+        elif token == '"':
+            end = SQL_IDENTIFIER_END.match(sql, pos)
+            pos = end.end() if end else length
+        else:
+            # Dollar quoted body, ended by the same tag
+            end = sql.find(token, pos)
+            pos = length if end < 0 else end + len(token)
+
+
+def splitSqlStatements(sql: str) -> List[str]:
+    """
+    Split an SQL script on the semicolons ending its statements.
+    Semicolons inside comments, string literals, quoted identifiers
+    and dollar quoted bodies are kept.
+    The texts between the semicolons are returned, comments included,
+    as str.split(';') does
+    """
+    statements = []
+    start = 0
+    for token, tokenStart, tokenEnd in scanSqlTokens(sql):
+        if token == ';':
+            statements.append(sql[start:tokenStart])
+            start = tokenEnd
+    statements.append(sql[start:])
+
+    return statements
+
+
+def stripSqlComments(sql: str) -> str:
+    """
+    Remove the comments of an SQL statement
+    """
+    chunks = []
+    start = 0
+    for token, tokenStart, tokenEnd in scanSqlTokens(sql):
+        if token != ';':
+            chunks.append(sql[start:tokenStart])
+            start = tokenEnd
+    chunks.append(sql[start:])
+
+    return ''.join(chunks)
+
+
+def isSqlQuery(sql: str) -> bool:
+    """
+    Check if a statement of a script has to be executed:
+    it is not only made of comments,
+    and does not contain ~ (legacy filter of the scripts)
+    """
+    code = stripSqlComments(sql)
+    return bool(SQL_QUERY_KEYWORDS.search(code)) and '~' not in code
+
+
+def getSqlStepComments(sql: str) -> List[str]:
+    """
+    Get the "-- some comment" lines of a statement
+    """
+    return [a.strip(' \n\r\t;') for a in SQL_STEP_COMMENT.findall(sql)]
+
+
+def isParallelStatement(sql: str) -> bool:
+    """
+    Check if a statement is annotated with a "--@parallel" line
+    """
+    return bool(SQL_PARALLEL_ANNOTATION.search(sql))
+
+
+def getStatementTables(sql: str) -> Optional[Tuple[Set[str], Set[str]]]:
+    """
+    Get the tables (and indexes) written and read by a statement,
+    or None if they cannot be inferred from its text.
+    The read tables are the ones listed after FROM, JOIN and USING,
+    in the statement and in its subqueries
+    """
+    code = stripSqlComments(sql)
+    match = SQL_STATEMENT_WRITE.match(code)
+    if not match:
+        return None
+
+    writes = {match.group(1).lower()}
+    if re.match(r'\s*CREATE', code, re.IGNORECASE):
+        # The table of a new index
+        table = SQL_INDEX_TABLE.search(code, match.end())
+        if table:
+            writes.add(table.group(1).lower())
+    reads = set()
+    for source in SQL_TABLE_SOURCE.finditer(code):
+        pos = source.end()
+        while True:
+            reference = SQL_TABLE_REFERENCE.match(code, pos)
+            if not reference:
+                break
+            reads.add(reference.group(1).lower())
+            if not reference.group(2):
+                break
+            pos = reference.end()
+    reads -= writes
+
+    return writes, reads
+
+
+def getStatementDependencies(statements: List[str]) -> List[Set[int]]:
+    """
+    For each statement of a script, get the indexes of the previous statements
+    which must be finished before running it: the last statements writing
+    the tables it reads or writes, and the statements reading the tables it writes.
+    A statement which is not annotated with "--@parallel", or whose tables
+    cannot be inferred, waits for all the previous ones, and all the next ones wait for it
+    """
+    dependencies = []
+    lastWriter = {}
+    readers = {}
+    barrier = None
+    sinceBarrier = []
+    for i, sql in enumerate(statements):
+        tables = getStatementTables(sql) if isParallelStatement(sql) else None
+        if tables is None:
+            dependencies.append(set(sinceBarrier) | ({barrier} if barrier is not None else set()))
+            lastWriter = {}
+            readers = {}
+            barrier = i
+            sinceBarrier = []
+            continue
+
+        writes, reads = tables
+        deps = {barrier} if barrier is not None else set()
+        for table in reads | writes:
+            if table in lastWriter:
+                deps.add(lastWriter[table])
+        for table in writes:
+            deps |= readers.get(table, set())
+        deps.discard(i)
+        dependencies.append(deps)
+
+        for table in reads:
+            readers.setdefault(table, set()).add(i)
+        for table in writes:
+            lastWriter[table] = i
+            readers[table] = set()
+        sinceBarrier.append(i)
+
+    return dependencies
+
+
+def tablesPersistenceSql(schema: str, tables: List[str], unlogged: bool = True) -> str:
+    """
+    Get the query listing the given PostGIS tables, or their partitions,
+    which are LOGGED, or UNLOGGED if unlogged is False
+    """
+    names = ', '.join("'%s'" % a.replace("'", "''") for a in tables)
+    sql = "SELECT c.relname FROM pg_class c "
+    sql += "JOIN pg_namespace n ON n.oid = c.relnamespace "
+    sql += "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+    sql += "LEFT JOIN pg_class p ON p.oid = i.inhparent "
+    sql += "WHERE n.nspname = '%s' AND c.relkind = 'r' AND c.relpersistence = %s " % (
+        schema.replace("'", "''"),
+        "'p'" if unlogged else "'u'"
+    )
+    sql += "AND (c.relname IN (%s) OR p.relname IN (%s))" % (names, names)
+    return sql
+
+
+def setTablesPersistenceSql(schema: str, tables: List[str], unlogged: bool = True) -> str:
+    """
+    Get the SQL setting the given PostGIS tables as UNLOGGED,
+    or back to LOGGED if unlogged is False
+    """
+    return ''.join(
+        'ALTER TABLE "%s"."%s" SET %s;' % (schema, table, 'UNLOGGED' if unlogged else 'LOGGED')
+        for table in tables
+    )
+
+
+def temporaryTablesSql(tables: List[str]) -> str:
+    """
+    Get the SQL creating the given raw tables in the temporary database
+    of a Spatialite connection: they take precedence over the tables
+    of the same name of the main database
+    """
+    return ''.join(
+        'DROP TABLE IF EXISTS temp."%s";CREATE TEMP TABLE "%s" (tmp text);' % (table, table)
+        for table in tables
+    )
+
+
+class CopyStream:
+    """
+    File like object used by cursor.copy_expert
+    to stream blocks of lines already in the COPY text format,
+    except for the backslashes which are escaped here
+    """
+
+    def __init__(self, blocks: Iterable[bytes]):
+        self.blocks = iter(blocks)
+
+    def read(self, size: int = 8192) -> bytes:
+        """
+        Return the next block of data
+        or an empty bytes string when all blocks have been sent
+        """
+        for block in self.blocks:
+            return block.replace(b'\\', b'\\\\')
+        return b''
+
+
+def copyRows(cursor: Any, schema: str, table: str, columns: List[str], rows: Iterable[Iterable[Any]]):
+    """
+    Write rows into a table with COPY FROM STDIN
+    on the given psycopg2 cursor. None values are written as NULL
+    """
+    data = io.StringIO(''.join(
+        '%s\n' % '\t'.join(
+            '\\N' if value is None else str(value).translate(COPY_TEXT_ESCAPES) for value in row
+        ) for row in rows
+    ))
+    sql = 'COPY "%s"."%s" (%s) FROM STDIN' % (schema, table, ', '.join(columns))
+    cursor.copy_expert(sql, data)
+
+
+class SqlProfiler:
+    """
+    Record the duration and the number of rows affected
+    by each executed statement, with the label of its step
+    """
+
+    FIELDS = ['script', 'label', 'duration', 'rows', 'statement']
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, script: str, label: Optional[str], statement: str, duration: float, rows: Optional[int]):
+        """
+        Add an executed statement
+        """
+        self.records.append({
+            'script': script,
+            'label': label,
+            'duration': round(duration, 6),
+            'rows': rows if rows is not None and rows >= 0 else None,
+            'statement': SQL_WHITESPACES.sub(' ', statement).strip()[:500],
+        })
+
+    def slowest(self, count: int = 10) -> List[Dict[str, Any]]:
+        """
+        The statements which took the most time
+        """
+        return sorted(self.records, key=lambda a: a['duration'], reverse=True)[:count]
+
+    def write(self, basePath: str) -> List[str]:
+        """
+        Write the profile in basePath.json and basePath.csv
+        and return the paths of the files
+        """
+        jsonPath = '%s.json' % basePath
+        with open(jsonPath, 'w', encoding='utf-8') as fout:
+            json.dump(self.records, fout, ensure_ascii=False, indent=1)
+
+        csvPath = '%s.csv' % basePath
+        with open(csvPath, 'w', encoding='utf-8', newline='') as fout:
+            writer = csv.DictWriter(fout, fieldnames=self.FIELDS, delimiter=';')
+            writer.writeheader()
+            writer.writerows(self.records)
+
+        return [jsonPath, csvPath]
+
+
+class SqlScriptRepository:
+    """
+    SQL script templates of a directory, read once and rendered in memory
+    with the parameters of the import.
+    If dumpDir is given, the rendered scripts are also written in it
+    """
+
+    def __init__(self, sourceDir: str, dumpDir: Optional[str] = None):
+        self.sourceDir = sourceDir
+        self.dumpDir = dumpDir
+        self.templates = {}
+        self.patterns = {}
+
+    def exists(self, name: str) -> bool:
+        """
+        Check if a script template exists
+        """
+        return name in self.templates or os.path.isfile(os.path.join(self.sourceDir, name))
+
+    def getTemplate(self, name: str) -> str:
+        """
+        Text of a script, name being relative to the source directory
+        """
+        if name not in self.templates:
+            path = os.path.join(self.sourceDir, name)
+            try:
+                with open(path, encoding='utf-8-sig') as fin:
+                    self.templates[name] = fin.read()
+            except UnicodeDecodeError:
+                with open(path, encoding='ISO-8859-15') as fin:
+                    self.templates[name] = fin.read()
+        return self.templates[name]
+
+    def getPattern(self, replaceDict: Dict[str, str]) -> Optional[Pattern]:
+        """
+        Compiled pattern matching the parameters of replaceDict, whatever their case.
+        The longest parameters are tried first, so the pattern does not depend
+        on the order of the keys of replaceDict
+        """
+        key = tuple(sorted(set(x.upper() for x in replaceDict), key=lambda x: (-len(x), x)))
+        if key not in self.patterns:
+            self.patterns[key] = re.compile(
+                '|'.join(re.escape(x) for x in key), re.IGNORECASE
+            ) if key else None
+        return self.patterns[key]
+
+    def replaceParameters(self, string: str, replaceDict: Dict[str, str]) -> str:
+        """
+        Replace all occurences of the parameters in string, whatever their case
+        """
+        pattern = self.getPattern(replaceDict)
+        if pattern is None:
+            return string
+        values = {key.upper(): value for key, value in replaceDict.items()}
+        return pattern.sub(lambda match: values[match.group(0).upper()], string)
+
+    def render(self, name: str, replaceDict: Optional[Dict[str, str]] = None) -> str:
+        """
+        Text of a script with its parameters replaced
+        """
+        sql = self.replaceParameters(self.getTemplate(name), replaceDict or {})
+        if self.dumpDir:
+            path = os.path.join(self.dumpDir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as fout:
+                fout.write(sql)
+        return sql
@@ -1,39 +1,42 @@
-import os
+import bisect
+import io
+import re
+import struct
+import sys
+from array import array
+
+from .cadastre_edigeo import normEdigeoPath, readEdigeoFile
+
+# Identifier of a relation between two objects: name, from, to
+RELATION_RID = re.compile(r'(Rel_.+)_(Objet_[0-9]+)_(Objet_[0-9]+)')
 
 
 class GetMultiPolygonFromVec:
     __slots__ = (
-    'listPar', 'listPfe', 'listFea', 'mapLyFea', 'mapFeaPfe', 'mapPfePar', 'mapParCor', 'mapParPno', 'mapPnoPar',
-    'path')
+    'listPar', 'listPfe', 'listFea', 'mapLyFea', 'mapFeaPfe', 'mapPfePar', 'mapParCor', 'relations', 'path')
 
     def __init__(self):
-        self.listPar = []
-        self.listPfe = []
-        self.listFea = []
+        self.listPar = {}
+        self.listPfe = {}
+        self.listFea = {}
         self.mapLyFea = {}
         self.mapFeaPfe = {}
         self.mapPfePar = {}
         self.mapParCor = {}
-        self.mapParPno = {}
-        self.mapPnoPar = {}
+        self.relations = []
         self.path = None
 
     def __call__(self, path):
-        self.listPar = []
-        self.listPfe = []
-        self.listFea = []
+        self.listPar = {}
+        self.listPfe = {}
+        self.listFea = {}
         self.mapLyFea = {}
         self.mapFeaPfe = {}
         self.mapPfePar = {}
         self.mapParCor = {}
-        self.mapParPno = {}
-        self.mapPnoPar = {}
-        self.path = os.path.abspath(path)
-        if not self.__features__(): return {}
-        if not self.__layers__(): return {}
-        if not self.__arcs__(): return {}
-        if not self.__coords__(): return {}
-        if not self.__nodes__(): return {}
+        self.relations = []
+        self.path = normEdigeoPath(path)
+        if not self.__read__(): return {}
         mapPfePoly = self.__polygons__()
 
         mapLyFeaMulti = {}
@@ -43,345 +46,282 @@ class GetMultiPolygonFromVec:
                 multipolygon = []
                 for pfe in self.mapFeaPfe[fea]:
                     multipolygon += mapPfePoly[pfe]
-                mapLyFeaMulti[ly][fea] = 'MULTIPOLYGON(' + ', '.join(['(' + ', '.join(
-                    ['(' + '),('.join([','.join([str(x) + ' ' + str(y) for x, y in ring])]) + ')' for ring in
-                     poly]) + ')' for poly in multipolygon]) + ')'
+                mapLyFeaMulti[ly][fea] = multiPolygonWkb(multipolygon)
         return mapLyFeaMulti
 
-    def __features__(self):
-        """ Find features with more than 1 faces """
+    def __open__(self):
+        """ Open the VEC file, on disk or inside an archive """
+        data = readEdigeoFile(self.path)
+        try:
+            return io.StringIO(data.decode())
+        except UnicodeDecodeError:
+            return io.StringIO(data.decode('ISO-8859-15'))
+
+    def __read__(self):
+        """ Read the VEC file in one pass
+
+        Collect the relations between objects,
+        the features with more than 1 face and their layer,
+        the links between arcs and faces, and the raw coordinates
+        of the arcs. Only the items related to these features are kept """
         if not self.path: return False
 
-        f = open(self.path, 'r', encoding='ISO-8859-1')
+        f = self.__open__()
         if not f: return False
 
+        feaLayer = {}
+        parFaces = []
+        parCoords = {}
+
         osRTY = ''
         osRID = ''
         osSCP = ''
         lnkNb = 0
-        lnkStartType = ''
-        lnkStartName = ''
-        lnkFaces = []
-        for line in f:
-            line = line.replace('\n', '').replace('\r', '')
-            if len(line) < 8:
-                continue
-            if line[:5] == 'RTYSA':
-                osRTY = line[8:]
-                osRID = ''
-                osSCP = ''
-                lnkNb = 0
-                lnkStartType = ''
-                lnkStartName = ''
-                lnkFaces = []
-            elif osRTY == 'LNK' and line[:5] == 'RIDSA':
-                osRID = line[8:]
-            elif osRTY == 'LNK' and line[:5] == 'SCPCP':
-                osSCP = line[8:]
-            elif osRTY == 'LNK' and line[:5] == 'FTCSN':
-                lnkNb = int(line[8:])
-            elif osRTY == 'LNK' and lnkNb > 2 and line[:5] == 'FTPCP':
-                lnkArray = line[8:].split(';')
-                if not lnkStartType:
-                    lnkStartType = lnkArray[2]
-                    lnkStartName = lnkArray[3]
-                elif lnkStartType and lnkStartType == 'FEA' and lnkArray[2] == 'PFE':
-                    lnkFaces.append(lnkArray[3])
-            elif osRTY == 'LNK' and lnkNb > 2 and len(lnkFaces) == lnkNb - 1:
-                lnkNb = 0
-                self.mapFeaPfe[lnkStartName] = lnkFaces
-                self.listPfe += lnkFaces
-                self.listFea.append(lnkStartName)
-        f.close()
-        if not self.listFea: return False
-        return True
+        lnkLinks = []
+        coords = None
 
-    def __layers__(self):
-        """ Find the layers for the features """
-        if not self.path: return False
-
-        f = open(self.path, 'r')
-        if not f: return False
+        def endRecord():
+            """ Store the links of the LNK record """
+            if len(lnkLinks) < 2:
+                return
+            startType, startName = lnkLinks[0]
+            endType, endName = lnkLinks[1]
+            if lnkNb > 2 and startType == 'FEA':
+                faces = [name for linkType, name in lnkLinks[1:] if linkType == 'PFE']
+                if len(faces) == lnkNb - 1:
+                    self.mapFeaPfe[startName] = faces
+                    self.listFea[startName] = True
+                    for face in faces:
+                        self.listPfe[face] = True
+            elif startType == 'PAR' and endType == 'PFE':
+                parFaces.append((startName, endName))
 
-        osRTY = ''
-        osRID = ''
         for line in f:
-            line = line.replace('\n', '').replace('\r', '')
+            line = line.rstrip('\r\n')
             if len(line) < 8:
                 continue
-            if line[:5] == 'RTYSA':
+            tag = line[:5]
+            if tag == 'RTYSA':
+                if osRTY == 'LNK':
+                    endRecord()
                 osRTY = line[8:]
                 osRID = ''
-            elif osRTY == 'FEA' and line[:5] == 'RIDSA':
+                lnkNb = 0
+                lnkLinks = []
+                coords = None
+            elif tag == 'RIDSA':
                 osRID = line[8:]
-            elif osRTY == 'FEA' and line[:5] == 'SCPCP':
-                osSCP = line[8:]
-            elif osRTY == 'FEA' and osRID in self.listFea and osSCP:
-                scpArray = osSCP.split(';')
-                ly = scpArray[3]
-                if ly in self.mapLyFea:
-                    self.mapLyFea[ly].append(osRID)
-                else:
-                    self.mapLyFea[ly] = [osRID]
-                osRID = ''
-        f.close()
-        return True
-
-    def __arcs__(self):
-        """ Find the arcs for the faces """
-        if not self.path: return False
+                if osRID.startswith('Rel_'):
+                    relation = RELATION_RID.match(osRID)
+                    if relation:
+                        self.relations.append(relation.groups())
+                if osRTY == 'PAR':
+                    coords = parCoords[osRID] = []
+            elif osRTY == 'PAR':
+                if tag == 'CORCC' and coords is not None:
+                    coords.append(line[8:])
+            elif osRTY == 'LNK':
+                if tag == 'FTCSN':
+                    lnkNb = int(line[8:])
+                elif tag == 'FTPCP':
+                    lnkArray = line[8:].split(';')
+                    lnkLinks.append((lnkArray[2], lnkArray[3]))
+            elif osRTY == 'FEA':
+                if tag == 'SCPCP':
+                    osSCP = line[8:]
+                    if osRID:
+                        feaLayer[osRID] = osSCP.split(';')[3]
+        if osRTY == 'LNK':
+            endRecord()
 
-        f = open(self.path, 'r')
-        if not f: return False
+        if not self.listFea: return False
 
-        osRTY = ''
-        osRID = ''
-        osSCP = ''
-        lnkStartType = ''
-        lnkStartName = ''
-        lnkEndType = ''
-        lnkEndName = ''
-        for line in f:
-            line = line.replace('\n', '').replace('\r', '')
-            if len(line) < 8:
-                continue
-            if lnkStartType == 'PAR' and lnkEndType == 'PFE' and lnkEndName in self.listPfe:
-                if lnkEndName in self.mapPfePar:
-                    self.mapPfePar[lnkEndName].append(lnkStartName)
-                else:
-                    self.mapPfePar[lnkEndName] = [lnkStartName]
-                if lnkStartName not in self.listPar:
-                    self.listPar.append(lnkStartName)
-                lnkStartType = ''
-                lnkStartName = ''
-                lnkEndType = ''
-                lnkEndName = ''
-            if line[:5] == 'RTYSA':
-                osRTY = line[8:]
-                osRID = ''
-                osSCP = ''
-                lnkStartType = ''
-                lnkStartName = ''
-                lnkEndType = ''
-                lnkEndName = ''
-            elif osRTY == 'LNK' and line[:5] == 'RIDSA':
-                osRID = line[8:]
-            elif osRTY == 'LNK' and line[:5] == 'SCPCP':
-                osSCP = line[8:]
-            elif osRTY == 'LNK' and line[:5] == 'FTPCP':
-                lnkArray = line[8:].split(';')
-                if not lnkStartType:
-                    lnkStartType = lnkArray[2]
-                    lnkStartName = lnkArray[3]
+        # Layers of the features, in the order of the file
+        for fea, ly in feaLayer.items():
+            if fea in self.listFea:
+                if ly in self.mapLyFea:
+                    self.mapLyFea[ly].append(fea)
                 else:
-                    lnkEndType = lnkArray[2]
-                    lnkEndName = lnkArray[3]
-        f.close()
-        return True
-
-    def __coords__(self):
-        """ Find the coords for the arcs """
-        if not self.path: return False
-
-        f = open(self.path, 'r')
-        if not f: return False
+                    self.mapLyFea[ly] = [fea]
 
-        osRTY = ''
-        osRID = ''
-        for line in f:
-            line = line.replace('\n', '').replace('\r', '')
-            if len(line) < 8:
-                continue
-            if line[:5] == 'RTYSA':
-                osRTY = line[8:]
-                osRID = ''
-            elif osRTY == 'PAR' and line[:5] == 'RIDSA':
-                osRID = line[8:]
-            elif osRTY == 'PAR' and osRID in self.listPar and line[:5] == 'CORCC':
-                pts = line[8:].split(';')
-                if osRID in self.mapParCor:
-                    self.mapParCor[osRID].append([float(pts[0]), float(pts[1])])
+        # Arcs of the faces
+        for par, pfe in parFaces:
+            if pfe in self.listPfe:
+                if pfe in self.mapPfePar:
+                    self.mapPfePar[pfe].append(par)
                 else:
-                    self.mapParCor[osRID] = [[float(pts[0]), float(pts[1])]]
-        f.close()
-        return True
+                    self.mapPfePar[pfe] = [par]
+                self.listPar[par] = True
 
-    def __nodes__(self):
-        """ Find the noeuds for the arcs """
-        if not self.path: return False
-
-        f = open(self.path, 'r')
-        if not f: return False
+        # Coordinates of the arcs, x and y interleaved ("x;y;" values)
+        for par in self.listPar:
+            if par in parCoords:
+                self.mapParCor[par] = array('d', map(float, ''.join(parCoords[par]).split(';')[:-1]))
 
-        osRTY = ''
-        osRID = ''
-        osSCP = ''
-        lnkStartType = ''
-        lnkStartName = ''
-        lnkEndType = ''
-        lnkEndName = ''
-        for line in f:
-            line = line.replace('\n', '').replace('\r', '')
-            if len(line) < 8:
-                continue
-            if osRTY == 'LNK' and lnkStartType == 'PAR' and lnkStartName in self.listPar and lnkEndType == 'PNO':
-                if lnkEndName in self.mapPnoPar:
-                    self.mapPnoPar[lnkEndName].append(lnkStartName)
-                else:
-                    self.mapPnoPar[lnkEndName] = [lnkStartName]
-                if lnkStartName in self.mapParPno:
-                    self.mapParPno[lnkStartName].append(lnkEndName)
-                else:
-                    self.mapParPno[lnkStartName] = [lnkEndName]
-                lnkStartType = ''
-                lnkStartName = ''
-                lnkEndType = ''
-                lnkEndName = ''
-            if osRTY == 'LNK' and lnkStartType == 'PNO' and lnkEndType == 'PAR' and lnkEndName in self.listPar:
-                if lnkEndName in self.mapParPno:
-                    self.mapParPno[lnkEndName].append(lnkStartName)
-                else:
-                    self.mapParPno[lnkEndName] = [lnkStartName]
-                if lnkStartName in self.mapPnoPar:
-                    self.mapPnoPar[lnkStartName].append(lnkEndName)
-                else:
-                    self.mapPnoPar[lnkStartName] = [lnkEndName]
-                lnkStartType = ''
-                lnkStartName = ''
-                lnkEndType = ''
-                lnkEndName = ''
-            if line[:5] == 'RTYSA':
-                osRTY = line[8:]
-                osRID = ''
-                osSCP = ''
-                lnkStartType = ''
-                lnkStartName = ''
-                lnkEndType = ''
-                lnkEndName = ''
-            elif osRTY == 'LNK' and line[:5] == 'RIDSA':
-                osRID = line[8:]
-            elif osRTY == 'LNK' and line[:5] == 'SCPCP':
-                osSCP = line[8:]
-            elif osRTY == 'LNK' and line[:5] == 'FTPCP':
-                lnkArray = line[8:].split(';')
-                if not lnkStartType:
-                    lnkStartType = lnkArray[2]
-                    lnkStartName = lnkArray[3]
-                else:
-                    lnkEndType = lnkArray[2]
-                    lnkEndName = lnkArray[3]
-        f.close()
         return True
 
     def __polygons__(self):
-        """ Face to polygon """
+        """ Face to polygons: each ring is a shell,
+        or a hole of the smallest ring containing it """
         mapPfePoly = {}
         for face in self.listPfe:
-            arcs = self.mapPfePar[face][:]
-            rings = self.__getRings__(arcs)
+            rings = self.__getRings__(self.mapPfePar[face])
             if len(rings) == 1:
                 mapPfePoly[face] = [rings]
-            elif len(rings) > 1:
-                bboxes = []
-                bboxRing = {}
-                for ring in rings:
-                    coords = ring[:]
-                    coord = coords.pop(0)
-                    minx = coord[0]
-                    maxx = coord[0]
-                    miny = coord[1]
-                    maxy = coord[1]
-                    while coords:
-                        coord = coords.pop(0)
-                        if coord[0] < minx:
-                            minx = coord[0]
-                        elif coord[0] > maxx:
-                            maxx = coord[0]
-                        if coord[1] < miny:
-                            miny = coord[1]
-                        elif coord[1] > maxy:
-                            maxy = coord[1]
-                    bboxes.append((minx, miny, maxx, maxy))
-                    bboxRing[(minx, miny, maxx, maxy)] = ring
-                bboxes.sort()
-                bbox = bboxes.pop(0)
-                bboxPolygons = [[bbox]]
-                while bboxes:
-                    bbox = bboxes.pop(0)
-                    inserted = False
-                    for p in bboxPolygons:
-                        extBbox = p[0]
-                        if bbox[0] >= extBbox[0] and bbox[1] >= extBbox[1] and bbox[2] <= extBbox[2] and bbox[3] <= \
-                                extBbox[3]:
-                            p.append(bbox)
-                            inserted = True
-                            break
-                        elif extBbox[0] >= bbox[0] and extBbox[1] >= bbox[1] and extBbox[2] <= bbox[2] and extBbox[3] <= \
-                                bbox[3]:
-                            p.insert(0, bbox)
-                            inserted = True
-                            break
-                    if not inserted:
-                        bboxPolygons.append([bbox])
-                polygons = []
-                for bboxes in bboxPolygons:
-                    polygon = []
-                    for bbox in bboxes:
-                        polygon.append(bboxRing[bbox])
-                    polygons.append(polygon)
-                mapPfePoly[face] = polygons
+                continue
+
+            # Largest rings first, so that the containing rings are known
+            items = sorted(
+                ((abs(ringArea(ring)), ringBbox(ring), ring) for ring in rings),
+                key=lambda item: -item[0]
+            )
+            # Bbox index of the rings already placed, sorted by minx
+            index = []
+            depths = []
+            polygons = []
+            polygonOfRing = []
+            for i, (area, bbox, ring) in enumerate(items):
+                parent = None
+                # Only the rings starting left of this one can contain it
+                for minx, j in index[:bisect.bisect_right(index, (bbox[0], len(items)))]:
+                    other = items[j][1]
+                    if other[1] <= bbox[1] and other[2] >= bbox[2] and other[3] >= bbox[3] \
+                            and ringInRing(ring, items[j][2]):
+                        # Smallest container
+                        if parent is None or items[j][0] < items[parent][0]:
+                            parent = j
+                bisect.insort(index, (bbox[0], i))
+                depth = 0 if parent is None else depths[parent] + 1
+                depths.append(depth)
+                if depth % 2 == 0:
+                    # Shell, or island inside a hole
+                    polygonOfRing.append(len(polygons))
+                    polygons.append([ring])
+                else:
+                    polygonOfRing.append(polygonOfRing[parent])
+                    polygons[polygonOfRing[parent]].append(ring)
+            mapPfePoly[face] = polygons
         return mapPfePoly
 
-    def __concatArc__(self, arc, ring):
-        coords = self.mapParCor[arc][:]
-        if ring[-1] == coords[0]:
-            ring = ring[:] + coords[1:]
-        elif ring[0] == coords[-1]:
-            ring = coords[:-1] + ring[:]
-        elif ring[-1] == coords[-1]:
-            coords = coords[:-1]
-            coords.reverse()
-            ring = ring[:] + coords[:]
-        elif ring[0] == coords[0]:
-            coords = coords[1:]
-            coords.reverse()
-            ring = coords[:] + ring[:]
-        return ring
-
-    def __getRings__(self, aArcs):
+    def __getRings__(self, arcs):
+        """ Assemble the arcs of a face into rings,
+        following the arcs sharing an endpoint """
         rings = []
-        if not aArcs or not isinstance(aArcs, list):
+        if not arcs:
             return rings
-        arcs = aArcs[:]
-        while arcs:
-            arc = arcs.pop(0)
-            if arc not in self.mapParPno:
-                rings.append(self.mapParCor[arc][:])
+
+        # Open arcs by endpoint
+        endpoints = {}
+        openArcs = []
+        for arc in arcs:
+            coords = self.mapParCor[arc]
+            start = (coords[0], coords[1])
+            end = (coords[-2], coords[-1])
+            if start == end:
+                rings.append(array('d', coords))
                 continue
-            ring = self.mapParCor[arc][:]
-            pnos = self.mapParPno[arc]
-            if len(pnos) < 2:
-                rings.append(ring)
+            endpoints.setdefault(start, []).append(len(openArcs))
+            endpoints.setdefault(end, []).append(len(openArcs))
+            openArcs.append(coords)
+
+        used = [False] * len(openArcs)
+        for first in range(len(openArcs)):
+            if used[first]:
                 continue
-            pno = pnos[0]
-            pnoUsed = []
-            pnoArcs = self.mapPnoPar[pno][:]
-            while pnoArcs:
-                pnoArc = pnoArcs.pop(0)
-                if pnoArc in arcs:
-                    arcs.pop(arcs.index(pnoArc))
-                    arc = pnoArc
-                    ring = self.__concatArc__(arc, ring)
-                    pnoUsed.append(pno)
-                    pnos = self.mapParPno[arc]
-                    for p in pnos:
-                        if p not in pnoUsed:
-                            pno = p
-                    pnoArcs = self.mapPnoPar[pno][:]
+            used[first] = True
+            ring = array('d', openArcs[first])
+            start = (ring[0], ring[1])
+            end = (ring[-2], ring[-1])
+            while end != start:
+                # Next unused arc starting or ending at the end of the ring
+                following = None
+                for candidate in endpoints[end]:
+                    if not used[candidate]:
+                        following = candidate
+                        break
+                if following is None:
+                    break
+                used[following] = True
+                coords = openArcs[following]
+                if (coords[0], coords[1]) == end:
+                    ring.extend(coords[2:])
+                else:
+                    ring.extend(reversedPoints(coords)[2:])
+                end = (ring[-2], ring[-1])
             rings.append(ring)
         return rings
 
-# import glob
-# getMultiPolygon = GetMultiPolygonFromVec()
-# for path in glob.glob('*/*/*.VEC') :
-#  getMultiPolygon( path )
+
+def readVecFile(path):
+    """ Relations and multipolygons of a VEC file,
+    in a function which can run in a worker process """
+    getMultiPolygon = GetMultiPolygonFromVec()
+    multipolygons = getMultiPolygon(path)
+    return getMultiPolygon.relations, multipolygons
+
+
+def reversedPoints(coords):
+    """ Interleaved coordinates with the points in reverse order """
+    points = array('d', coords)
+    points[0::2] = coords[-2::-2]
+    points[1::2] = coords[-1::-2]
+    return points
+
+
+def ringArea(ring):
+    """ Signed area of a ring (shoelace formula) """
+    area = 0.0
+    x0, y0 = ring[-2], ring[-1]
+    for x1, y1 in zip(ring[0::2], ring[1::2]):
+        area += x0 * y1 - x1 * y0
+        x0, y0 = x1, y1
+    return area / 2
+
+
+def ringBbox(ring):
+    """ Bounding box of a ring: minx, miny, maxx, maxy """
+    xs = ring[0::2]
+    ys = ring[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def pointInRing(x, y, ring):
+    """ Ray casting test: True inside, False outside, None on the boundary """
+    inside = False
+    x0, y0 = ring[-2], ring[-1]
+    for x1, y1 in zip(ring[0::2], ring[1::2]):
+        if (x0, y0) == (x, y):
+            return None
+        if (y1 > y) != (y0 > y):
+            xCross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+            if xCross == x:
+                return None
+            if xCross > x:
+                inside = not inside
+        x0, y0 = x1, y1
+    return inside
+
+
+def ringInRing(ring, other):
+    """ Whether ring is inside other. Rings only touch at nodes,
+    so the first vertex which is not on the boundary decides """
+    for x, y in zip(ring[0::2], ring[1::2]):
+        inside = pointInRing(x, y, other)
+        if inside is not None:
+            return inside
+    return False
+
+
+def multiPolygonWkb(polygons):
+    """ Little endian WKB of a multipolygon,
+    written from the coordinate buffers of its rings """
+    chunks = [struct.pack('<BII', 1, 6, len(polygons))]
+    for polygon in polygons:
+        chunks.append(struct.pack('<BII', 1, 3, len(polygon)))
+        for ring in polygon:
+            chunks.append(struct.pack('<I', len(ring) // 2))
+            if sys.byteorder != 'little':
+                ring = array('d', ring)
+                ring.byteswap()
+            chunks.append(ring.tobytes())
+    return b''.join(chunks)
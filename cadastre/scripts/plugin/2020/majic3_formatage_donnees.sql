@@ -2,6 +2,7 @@
 BEGIN;
 
 -- Traitement: parcelle
+--@parallel
 INSERT INTO [PREFIXE]parcelle
 (
  parcelle, annee, ccodep, ccodir, ccocom, ccopre, ccosec, dnupla, dcntpa, dsrpar, dnupro, jdatat, dreflf, gpdl, cprsecr, ccosecr, dnuplar, dnupdl, gurbpa,
@@ -71,6 +72,7 @@ SELECT
 FROM [PREFIXE]nbat WHERE SUBSTRING(tmp,20,2) ='10';
 
 -- Traitement: suf
+--@parallel
 INSERT INTO [PREFIXE]suf
 (
  suf, annee,ccodep, ccodir, ccocom, ccopre, ccosec, dnupla, ccosub, dcntsf, dnupro, gnexps, drcsub, drcsuba, ccostn, cgrnum, dsgrpf, dclssf, cnatsp,
@@ -122,6 +124,7 @@ SELECT
 FROM [PREFIXE]nbat WHERE SUBSTRING(tmp,20,2) ='21';
 
 -- Traitement: sufexoneration
+--@parallel
 INSERT INTO [PREFIXE]sufexoneration
 (
  sufexoneration, annee, ccodep, ccodir, ccocom, ccopre, ccosec, dnupla, ccosub, rnuexn, ccolloc, pexn, gnexts, jandeb, jfinex, fcexn, fcexna, rcexna,
@@ -153,6 +156,7 @@ SELECT
 FROM [PREFIXE]nbat WHERE SUBSTRING(tmp,20,2) ='30';
 
 -- Traitement: suftaxation
+--@parallel
 INSERT INTO [PREFIXE]suftaxation
 (
  suftaxation, annee,ccodep, ccodir, ccocom, ccopre, ccosec, dnupla, ccosub, c1majposa, c1bisufad, c2majposa, c2bisufad, c3majposa, c3bisufad, c4majposa, c4bisufad, cntmajtc,
@@ -182,6 +186,7 @@ SELECT
 FROM [PREFIXE]nbat WHERE SUBSTRING(tmp,20,2) ='36';
 
 -- Traitement: local00
+--@parallel
 INSERT INTO [PREFIXE]local00
 (
  local00, annee, ccodep, ccodir, ccocom, invar, ccopre, ccosec, dnupla, dnubat, descr, dniv, dpor, ccoriv, ccovoi, dnvoiri, dindic, ccocif, dvoilib, cleinvar,
@@ -219,6 +224,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='00';
 
 -- Traitement: local10
+--@parallel
 INSERT INTO [PREFIXE]local10
 (
  local10, annee,ccodep, ccodir, ccocom, invar, gpdl, dsrpar, dnupro, jdatat, dnufnl, ccoeva, ccitlv, dteloc, gtauom, dcomrd, ccoplc, cconlc, dvltrt,
@@ -291,10 +297,15 @@ SELECT
   '[LOT]' as lot
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='10';
 
+--@parallel
 CREATE INDEX idxan_local00 ON local00 (annee);
+--@parallel
 CREATE INDEX idxan_local10 ON local10 (annee);
+--@parallel
 CREATE INDEX idx_local10_invar ON [PREFIXE]local10 (invar);
+--@parallel
 CREATE INDEX idx_local00_invar ON [PREFIXE]local00 (invar);
+--@parallel
 UPDATE [PREFIXE]local10 SET
   ccopre = local00.ccopre,
   ccosec = local00.ccosec,
@@ -309,6 +320,7 @@ FROM [PREFIXE]local00
 WHERE local00.ccodep = local10.ccodep AND local00.ccodir = local10.ccodir AND local00.invar = local10.invar AND local00.annee='[ANNEE]' AND local10.annee='[ANNEE]';
 
 -- Traitement: pev
+--@parallel
 INSERT INTO [PREFIXE]pev
 (
  pev, annee, ccodep, ccodir, ccocom, invar,
@@ -366,6 +378,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='21';
 
 -- Traitement: pevexoneration
+--@parallel
 INSERT INTO [PREFIXE]pevexoneration
 (
  pevexoneration, annee,ccodep, ccodir, ccocom, invar, Janbil, dnupev, dnuexb, ccolloc, pexb, gnextl, jandeb, janimp, vecdif, vecdifa, fcexb, fcexba, rcexba,
@@ -416,6 +429,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='30';
 
 -- Traitement: pevexoneration_imposable
+--@parallel
 INSERT INTO [PREFIXE]pevexoneration_imposable
 (
  pevexoneration_imposable, annee,ccodep, ccodir, ccocom, invar, Janbil, dnupev, dnuexb, ccolloc, pexb, gnextl, jandeb, janimp, vecdif, vecdifa, fcexb, fcexba, rcexba,
@@ -466,6 +480,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='30';
 
 -- Traitement: pevexoneration_imposee
+--@parallel
 INSERT INTO [PREFIXE]pevexoneration_imposee
 (
  pevexoneration_imposee, annee,ccodep, ccodir, ccocom, invar, Janbil, dnupev, dnuexb, ccolloc, pexb, gnextl, jandeb, janimp, vecdif, vecdifa, fcexb, fcexba, rcexba,
@@ -516,6 +531,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='31';
 
 -- Traitement: pevtaxation
+--@parallel
 INSERT INTO [PREFIXE]pevtaxation
 (
  pevtaxation, annee,ccodep, ccodir, ccocom, invar, janbil, dnupev, co_vlbai, co_vlbaia, co_bipevla, de_vlbai, de_vlbaia, de_bipevla,
@@ -559,6 +575,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='36';
 
 -- Traitement: pevprincipale
+--@parallel
 INSERT INTO [PREFIXE]pevprincipale
 (
  pevprincipale, annee,ccodep, ccodir, ccocom, invar, dnupev, dnudes, dep1_cconad, dep1_dsueic, dep1_dcimei, dep2_cconad, dep2_dsueic, dep2_dcimei, dep3_cconad,
@@ -625,6 +642,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='40';
 
 -- Traitement: pevprofessionnelle
+--@parallel
 INSERT INTO [PREFIXE]pevprofessionnelle
 (
  pevprofessionnelle, annee,
@@ -656,6 +674,7 @@ SELECT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='50';
 
 -- Traitement:
+--@parallel
 INSERT INTO [PREFIXE]pevlissage
 (
  pevlissage, annee,
@@ -695,6 +714,7 @@ SELECT DISTINCT
 FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='52';
 
 -- Traitement: pevdependances
+--@parallel
 INSERT INTO [PREFIXE]pevdependances
 (
  pevdependances, annee, ccodep, ccodir, ccocom, invar, dnupev, dnudes, dsudep, cconad, asitet, dmatgm, dmatto, detent, geaulc, gelelc, gchclc, dnbbai, dnbdou,
@@ -740,6 +760,7 @@ FROM [PREFIXE]bati WHERE SUBSTRING(tmp,31,2) ='60';
 
 
 -- Traitement: commune_majic
+--@parallel
 INSERT INTO [PREFIXE]commune_majic
 (
     commune, annee, ccodep, ccodir, ccocom, libcom, lot
@@ -756,6 +777,7 @@ FROM [PREFIXE]bati WHERE trim(SUBSTRING(tmp,31,2))='' AND trim(SUBSTRING(tmp,4,3
 
 
 -- Traitement: proprietaire
+--@parallel
 INSERT INTO [PREFIXE]proprietaire
 (
  proprietaire, annee, ccodep, ccodir, ccocom, dnupro, dnulp, ccocif, dnuper, ccodro, ccodem, gdesip, gtoper, ccoqua, dnatpr, ccogrm, dsglpm, dforme,
@@ -830,7 +852,9 @@ WHERE trim(SUBSTRING(tmp,7,6)) != ''
 ORDER BY ccodep,ccocom,dnupro,dnulp,dnuper;
 
 -- création: comptecommunal à partir de proprietaire
+--@parallel
 CREATE INDEX idxan_proprietaire ON proprietaire (annee);
+--@parallel
 INSERT INTO [PREFIXE]comptecommunal
   (comptecommunal, annee, ccodep, ccodir, ccocom, dnupro, ajoutcoherence, lot)
 SELECT
@@ -847,6 +871,7 @@ WHERE annee='[ANNEE]' AND lot='[LOT]'
 GROUP BY ccodep, ccodir, ccocom, dnupro;
 
 -- Traitement: pdl
+--@parallel
 INSERT INTO [PREFIXE]pdl
 (
  pdl, annee, ccodep, ccodir, ccocom, ccopre, ccosec, dnupla, dnupdl, dnivim, ctpdl, dmrpdl, gprmut, dnupro, ccocif,
@@ -874,6 +899,7 @@ SELECT
 FROM [PREFIXE]pdll WHERE SUBSTRING(tmp,26,2) ='10';
 
 -- Traitement: parcellecomposante
+--@parallel
 INSERT INTO [PREFIXE]parcellecomposante
 (
  parcellecomposante, annee, ccodep, ccodir, ccocom, ccopre, ccosec, dnupla, dnupdl, ccoprea, ccoseca, dnuplaa, ccocif,
@@ -900,6 +926,7 @@ SELECT
 FROM [PREFIXE]pdll WHERE SUBSTRING(tmp,26,2) ='20';
 
 -- Traitement: lots
+--@parallel
 INSERT INTO [PREFIXE]lots
 (
  lots, annee, ccodep, ccodir, ccocom, ccopre, ccosec, dnupla, dnupdl, dnulot, cconlo, dcntlo, dnumql, ddenql, dfilot, datact, dnuprol, dreflf, ccocif,
@@ -932,6 +959,7 @@ SELECT
 FROM [PREFIXE]pdll WHERE SUBSTRING(tmp,26,2) ='30';
 
 -- Traitement: lotslocaux
+--@parallel
 INSERT INTO [PREFIXE]lotslocaux
 (
  lotslocaux, annee, ccodepl, ccodirl, ccocoml, ccoprel, ccosecl, dnuplal, dnupdl, dnulot, ccodebpb, ccodird, ccocomb, ccopreb, invloc, dnumql, ddenql,
@@ -962,6 +990,7 @@ SELECT DISTINCT
 FROM [PREFIXE]lloc;
 
 -- Traitement: commune
+--@parallel
 INSERT INTO [PREFIXE]commune
 (
  commune, geo_commune, annee, ccodep, ccodir, ccocom, clerivili, libcom, typcom, ruract, carvoi, indpop, poprel, poppart, popfict, annul, dteannul, dtecreart, codvoi,
@@ -994,6 +1023,7 @@ SELECT
 FROM [PREFIXE]fanr WHERE SUBSTRING(tmp,4,3)  != ' ' AND trim(SUBSTRING(tmp,7,4))='';
 
 -- Traitement: voie
+--@parallel
 INSERT INTO [PREFIXE]voie
 (
  voie, annee, ccodep, ccodir, ccocom, natvoiriv, ccoriv, clerivili, natvoi, libvoi, typcom, ruract, carvoi, indpop, poprel, poppart, popfict, annul, dteannul,
@@ -1030,64 +1060,119 @@ SELECT
 FROM [PREFIXE]fanr WHERE trim(SUBSTRING(tmp,4,3))  != '' AND trim(SUBSTRING(tmp,7,4))  != '';
 
 -- purge des doublons : voie
+--@parallel
 CREATE INDEX idxan_voie ON voie (annee);
 
 -- INDEXES
+--@parallel
 CREATE INDEX idxan_suf ON suf (annee);
+--@parallel
 CREATE INDEX idxan_sufexoneration ON sufexoneration (annee);
+--@parallel
 CREATE INDEX idxan_suftaxation ON suftaxation (annee);
+--@parallel
 CREATE INDEX idxan_pev ON pev (annee);
+--@parallel
 CREATE INDEX idxan_pevexoneration_imposable ON pevexoneration_imposable (annee);
+--@parallel
 CREATE INDEX idxan_pevexoneration_imposee ON pevexoneration_imposee (annee);
+--@parallel
 CREATE INDEX idxan_pevtaxation ON pevtaxation (annee);
+--@parallel
 CREATE INDEX idxan_pevprincipale ON pevprincipale (annee);
+--@parallel
 CREATE INDEX idxan_pevprofessionnelle ON pevprofessionnelle (annee);
+--@parallel
 CREATE INDEX idxan_pevdependances ON pevdependances (annee);
+--@parallel
 CREATE INDEX idxan_pdl ON pdl (annee);
+--@parallel
 CREATE INDEX idxan_parcellecomposante ON parcellecomposante (annee);
+--@parallel
 CREATE INDEX idx_lots_tmp1 ON lots (annee, ccodep, ccodir, ccocom, dnuprol);
+--@parallel
 CREATE INDEX idxan_lotslocaux ON lotslocaux (annee);
+--@parallel
 CREATE INDEX idxan_commune ON commune (annee);
+--@parallel
 CREATE INDEX proprietaire_dnupro_idx ON proprietaire (dnupro);
+--@parallel
 CREATE INDEX proprietaire_ddenom_idx ON proprietaire (ddenom);
+--@parallel
 CREATE INDEX parcelle_dnupro_idx ON parcelle (dnupro);
+--@parallel
 CREATE INDEX suf_parcelle_idx ON suf (parcelle);
+--@parallel
 CREATE INDEX sufexoneration_suf_idx ON sufexoneration (suf);
+--@parallel
 CREATE INDEX idx_proprietaire_ccocom  ON proprietaire (ccocom);
+--@parallel
 CREATE INDEX idx_commune_ccocom  ON commune (ccocom);
+--@parallel
 CREATE INDEX idx_proprietaire_ccodro  ON proprietaire (ccodro);
+--@parallel
 CREATE INDEX idx_proprietaire_comptecommunal ON proprietaire (comptecommunal);
+--@parallel
 CREATE INDEX idx_local00_parcelle  ON local00 (parcelle);
+--@parallel
 CREATE INDEX idx_local00_voie  ON local00 (voie);
+--@parallel
 CREATE INDEX idx_local10_local00  ON local10 (local00);
+--@parallel
 CREATE INDEX idx_local10_comptecommunal  ON local10 (comptecommunal);
+--@parallel
 CREATE INDEX idx_pevexoneration_imposable_pev ON pevexoneration_imposable (pev);
+--@parallel
 CREATE INDEX idx_pevexoneration_imposee_pev ON pevexoneration_imposee (pev);
+--@parallel
 CREATE INDEX idx_pevtaxation_pev ON pevtaxation (pev);
+--@parallel
 CREATE INDEX idx_parcelle_voie ON parcelle (voie);
+--@parallel
 CREATE INDEX idx_parcelle_comptecommunal ON parcelle (comptecommunal);
 
 -- ANALYSES;
+--@parallel
 ANALYZE [PREFIXE]parcelle;
+--@parallel
 ANALYZE [PREFIXE]suf;
+--@parallel
 ANALYZE [PREFIXE]sufexoneration;
+--@parallel
 ANALYZE [PREFIXE]suftaxation;
+--@parallel
 ANALYZE [PREFIXE]local00;
+--@parallel
 ANALYZE [PREFIXE]local10;
+--@parallel
 ANALYZE [PREFIXE]pev;
+--@parallel
 ANALYZE [PREFIXE]pevexoneration_imposable;
+--@parallel
 ANALYZE [PREFIXE]pevexoneration_imposee;
+--@parallel
 ANALYZE [PREFIXE]pevtaxation;
+--@parallel
 ANALYZE [PREFIXE]pevprincipale;
+--@parallel
 ANALYZE [PREFIXE]pevprofessionnelle;
+--@parallel
 ANALYZE [PREFIXE]pevdependances;
+--@parallel
 ANALYZE [PREFIXE]proprietaire;
+--@parallel
 ANALYZE [PREFIXE]comptecommunal;
+--@parallel
 ANALYZE [PREFIXE]pdl;
+--@parallel
 ANALYZE [PREFIXE]parcellecomposante;
+--@parallel
 ANALYZE [PREFIXE]lots;
+--@parallel
 ANALYZE [PREFIXE]lotslocaux;
+--@parallel
 ANALYZE [PREFIXE]commune;
+--@parallel
 ANALYZE [PREFIXE]voie;
 COMMIT;
 -- FORMATAGE DONNEES : FIN;
@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS majic_import_fichier (
+    lot text,
+    annee text,
+    fichier text,
+    type_fichier text,
+    taille bigint,
+    empreinte text,
+    date_import text
+);
+
+COMMENT ON TABLE majic_import_fichier IS 'Fichiers MAJIC importés par lot, avec leur taille et leur empreinte, pour ne recharger que les données modifiées';
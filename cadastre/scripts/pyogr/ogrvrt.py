@@ -170,3 +170,31 @@ def ogr2vrt(infile,
         f.close()
 
     return vrt
+
+def ogr2unionvrt(layer_sources,
+                 outfile = None,
+                 relative = "0"):
+    """ Build a VRT with one OGRVRTUnionLayer per layer name,
+    merging the layer of the same name of each source datasource.
+    layer_sources maps each layer name to the list of its datasources """
+
+    vrt = '<OGRVRTDataSource>\n'
+
+    for name, sources in layer_sources.items():
+        vrt += '  <OGRVRTUnionLayer name="%s">\n' % Esc(name)
+        for i, infile in enumerate(sources):
+            vrt += '    <OGRVRTLayer name="%s_%d">\n' % (Esc(name), i)
+            vrt += '      <SrcDataSource relativeToVRT="%s" shared="1">%s</SrcDataSource>\n' \
+                   % (relative, Esc(infile))
+            vrt += '      <SrcLayer>%s</SrcLayer>\n' % Esc(name)
+            vrt += '    </OGRVRTLayer>\n'
+        vrt += '  </OGRVRTUnionLayer>\n'
+
+    vrt += '</OGRVRTDataSource>\n'
+
+    if outfile is not None:
+        f = open(outfile, "w")
+        f.write(vrt)
+        f.close()
+
+    return vrt
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the MAJIC file readers.
+
+Compare the previous text reader (ASCII decoding, strip and regex per line)
+with the byte level reader of cadastre_majic on a synthetic REVNBAT file.
+Both readers feed a COPY like stream which is read until the end.
+
+Usage: python3 scripts/benchmark_majic_reader.py [--size 1024] [--file REVNBAT.800]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cadastre.cadastre_majic import majicBlocks  # noqa: E402
+from cadastre.cadastre_sql import CopyStream  # noqa: E402
+
+NON_PRINTABLE = re.compile(r"[^ -~]")
+DEPDIR = '380'
+
+
+def generateRevnbat(path, size):
+    """ Write a synthetic REVNBAT file of about size bytes """
+    random.seed(0)
+    lines = []
+    for i in range(1000):
+        code = random.choice(['10', '21', '30', '36'])
+        line = '%s024000A %04d   %s %s' % (DEPDIR, i, code, ''.join(random.choice('0123456789 ABCé') for _ in range(130)))
+        lines.append(line.encode('latin-1') + b'\r\n')
+    block = b''.join(lines)
+    with open(path, 'wb') as fout:
+        for _ in range(max(1, size // len(block))):
+            fout.write(block)
+
+
+def legacyStream(fpath):
+    """ Previous reader: text file, line by line sanitization """
+    with open(fpath, encoding='ascii', errors='replace') as fin:
+        lines = (
+            NON_PRINTABLE.sub(' ', line.strip('\r\n'))
+            for line in fin if line[0:3] == DEPDIR
+        )
+        data = True
+        while data:
+            chunks = []
+            length = 0
+            for line in lines:
+                line = '%s\n' % line.replace('\\', '\\\\')
+                chunks.append(line)
+                length += len(line)
+                if length >= 8192:
+                    break
+            data = ''.join(chunks)
+            yield len(data)
+
+
+def byteStream(fpath):
+    """ Byte level reader """
+    with open(fpath, 'rb') as fin:
+        stream = CopyStream(majicBlocks(fin, DEPDIR))
+        data = True
+        while data:
+            data = stream.read(8192)
+            yield len(data)
+
+
+def run(name, reader, fpath):
+    start = time.perf_counter()
+    total = sum(reader(fpath))
+    duration = time.perf_counter() - start
+    print('%-8s %8.2f s %8.1f Mo/s (%s octets)' % (name, duration, os.path.getsize(fpath) / duration / 1e6, total))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark des lecteurs de fichiers MAJIC')
+    parser.add_argument('--size', type=int, default=1024, help='taille du fichier généré en Mo')
+    parser.add_argument('--file', help='fichier REVNBAT existant à utiliser')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        fpath = args.file
+        if not fpath:
+            fpath = os.path.join(tmpDir, 'REVNBAT.800')
+            generateRevnbat(fpath, args.size * 1024 * 1024)
+        legacy = run('texte', legacyStream, fpath)
+        current = run('octets', byteStream, fpath)
+        if legacy != current:
+            print('Les deux lecteurs ne produisent pas le même volume de données')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Estimate the gain of running a formatting script on several PostGIS connections.
+
+Build the dependency graph of the statements of a script with cadastre_sql,
+as the import does, and simulate its execution on 1 to N connections. The
+duration of each statement is taken from the profile of a serial import
+(option "Profiler les requêtes SQL de l'import", cadastre_import_profile_*.json),
+or is 1 for every statement without profile. A previous version of
+cadastre_sql.py can be given to compare the estimations of both versions.
+
+Usage: python3 scripts/benchmark_sql_dependencies.py SCRIPT.sql [--profile P.json] [--workers 4]
+                                                     [--compare-with old.py]
+"""
+import argparse
+import heapq
+import importlib.util
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cadastre import cadastre_sql  # noqa: E402
+
+
+def loadModule(path):
+    """ Another version of cadastre_sql """
+    spec = importlib.util.spec_from_file_location('previous_cadastre_sql', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def readStatements(module, path):
+    """ Statements of the script which are executed by the import """
+    with open(path, encoding='utf-8-sig') as fin:
+        sql = fin.read()
+    return [a for a in module.splitSqlStatements(sql) if module.isSqlQuery(a)]
+
+
+def readDurations(path, script, count):
+    """ Durations of the statements of the script, in the order of the profile """
+    with open(path, encoding='utf-8') as fin:
+        records = [a for a in json.load(fin) if a['script'] == os.path.basename(script)]
+    if len(records) != count:
+        print('Le profil contient %s requêtes pour %s, le script %s' % (len(records), script, count))
+        sys.exit(1)
+    return [a['duration'] for a in records]
+
+
+def simulate(dependencies, durations, workers):
+    """ Duration of the script on the given number of connections, the first
+    statements of the script being started first, as the import does """
+    waiting = [len(a) for a in dependencies]
+    dependents = [[] for _ in dependencies]
+    for k, deps in enumerate(dependencies):
+        for j in deps:
+            dependents[j].append(k)
+    ready = [k for k, a in enumerate(waiting) if not a]
+    heapq.heapify(ready)
+    running = []
+    now = 0.0
+    while ready or running:
+        while ready and len(running) < workers:
+            k = heapq.heappop(ready)
+            heapq.heappush(running, (now + durations[k], k))
+        now, k = heapq.heappop(running)
+        for j in dependents[k]:
+            waiting[j] -= 1
+            if not waiting[j]:
+                heapq.heappush(ready, j)
+    return now
+
+
+def report(name, module, args):
+    statements = readStatements(module, args.script)
+    durations = readDurations(args.profile, args.script, len(statements)) if args.profile else [1.0] * len(statements)
+    dependencies = module.getStatementDependencies(statements)
+    serial = sum(durations)
+    print('%s : %s requêtes, durée séquentielle %.1f' % (name, len(statements), serial))
+    for workers in range(2, args.workers + 1):
+        duration = simulate(dependencies, durations, workers)
+        print('  %2d connexions : %8.1f (x %.2f)' % (workers, duration, serial / duration))
+    duration = simulate(dependencies, durations, len(statements))
+    print('  chemin critique : %6.1f (x %.2f)' % (duration, serial / duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimation de l'exécution parallèle d'un script SQL")
+    parser.add_argument('script', help='script SQL du plugin, par exemple cadastre/scripts/plugin/edigeo_formatage_donnees.sql')
+    parser.add_argument('--profile', help="profil JSON d'un import séquentiel")
+    parser.add_argument('--workers', type=int, default=4, help='nombre maximum de connexions')
+    parser.add_argument('--compare-with', help='autre version de cadastre_sql.py à comparer')
+    args = parser.parse_args()
+
+    report('actuel', cadastre_sql, args)
+    if args.compare_with:
+        report('précédent', loadModule(args.compare_with), args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
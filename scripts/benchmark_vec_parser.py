@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the EDIGEO VEC parser rebuilding the multipolygons.
+
+Run GetMultiPolygonFromVec of the plugin on a synthetic VEC file: a grid of
+square faces, with holes, grouped in features of several faces. A previous
+version of getmultipolygonfromvec.py can be given to compare the durations
+and check that both versions rebuild the same geometries, whatever the order
+and the starting point of their rings.
+
+Usage: python3 scripts/benchmark_vec_parser.py [--size 200] [--file X.VEC] [--compare-with old.py]
+"""
+import argparse
+import importlib.util
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cadastre.getmultipolygonfromvec import GetMultiPolygonFromVec  # noqa: E402
+
+# Number of vertices inside each arc
+ARC_VERTICES = 8
+
+
+def record(lines, rty, rid, *values):
+    """ Add an EDIGEO record """
+    lines.append('RTYSA03:%s' % rty)
+    lines.append('RIDSA%02d:%s' % (len(rid), rid))
+    for tag, value in values:
+        lines.append('%s%02d:%s' % (tag, len(value), value))
+
+
+def link(lines, rid, relation, *targets):
+    """ Add a LNK record between objects """
+    values = [('SCPCP', 'EDAB;;REL;%s' % relation), ('FTCSN', str(len(targets)))]
+    values += [('FTPCP', 'EDAB;;%s;%s' % target) for target in targets]
+    values += [('ATCSN', '0'), ('QACSN', '0')]
+    record(lines, 'LNK', rid, *values)
+
+
+def arcCoords(x1, y1, x2, y2):
+    """ Vertices of a straight arc """
+    return [
+        ('CORCC', '%s;%s;' % (x1 + (x2 - x1) * k / (ARC_VERTICES + 1), y1 + (y2 - y1) * k / (ARC_VERTICES + 1)))
+        for k in range(ARC_VERTICES + 2)
+    ]
+
+
+def generateVec(path, size):
+    """ Write a VEC file with a grid of size x size faces """
+    pars = []
+    pnos = []
+    pfes = []
+    feas = []
+    lnks = []
+
+    def arc(name, x1, y1, x2, y2, ini, fin, faces):
+        record(pars, 'PAR', name, ('SCPCP', 'EDAB;;PGE;ID_S_PRIM_ARC'), *arcCoords(x1, y1, x2, y2))
+        if ini:
+            link(lnks, 'LI_%s' % name, 'ID_S_RCO_NOEUD_INI', ('PAR', name), ('PNO', ini))
+            link(lnks, 'LF_%s' % name, 'ID_S_RCO_NOEUD_FIN', ('PAR', name), ('PNO', fin))
+        for face in faces:
+            link(lnks, 'LP_%s_%s' % (name, face), 'ID_S_RCO_FAC_DROITE', ('PAR', name), ('PFE', face))
+
+    def face(i, j):
+        return 'Face_%s_%s' % (i, j) if 0 <= i < size and 0 <= j < size else None
+
+    for i in range(size + 1):
+        for j in range(size + 1):
+            record(pnos, 'PNO', 'Noeud_%s_%s' % (i, j), ('SCPCP', 'EDAB;;PGE;ID_S_PRIM_NOEUD'),
+                   ('CORCC', '%s;%s;' % (i * 10.0, j * 10.0)))
+            node = 'Noeud_%s_%s' % (i, j)
+            if i < size:
+                faces = [a for a in (face(i, j), face(i, j - 1)) if a]
+                arc('Arc_h_%s_%s' % (i, j), i * 10.0, j * 10.0, i * 10.0 + 10, j * 10.0,
+                    node, 'Noeud_%s_%s' % (i + 1, j), faces)
+            if j < size:
+                faces = [a for a in (face(i, j), face(i - 1, j)) if a]
+                arc('Arc_v_%s_%s' % (i, j), i * 10.0, j * 10.0, i * 10.0, j * 10.0 + 10,
+                    node, 'Noeud_%s_%s' % (i, j + 1), faces)
+
+    for i in range(size):
+        for j in range(size):
+            name = face(i, j)
+            record(pfes, 'PFE', name, ('SCPCP', 'EDAB;;PGE;ID_S_PRIM_FACE'))
+            # A closed arc without node is a hole in one face out of 3
+            if (i + j) % 3 == 0:
+                x, y = i * 10.0 + 2, j * 10.0 + 2
+                coords = arcCoords(x, y, x + 6, y) + arcCoords(x + 6, y, x + 6, y + 6)[1:]
+                coords += arcCoords(x + 6, y + 6, x, y + 6)[1:] + arcCoords(x, y + 6, x, y)[1:]
+                record(pars, 'PAR', 'Trou_%s_%s' % (i, j), ('SCPCP', 'EDAB;;PGE;ID_S_PRIM_ARC'), *coords)
+                link(lnks, 'LT_%s' % name, 'ID_S_RCO_FAC_DROITE', ('PAR', 'Trou_%s_%s' % (i, j)), ('PFE', name))
+
+    # Features of 2 faces 2 rows apart, and features of 1 face
+    for i in range(size):
+        for j in range(size):
+            name = 'Objet_%s_%s' % (i, j)
+            if j % 4 in (0, 1) and j + 2 < size:
+                faces = [face(i, j), face(i, j + 2)]
+            elif j % 4 in (2, 3):
+                continue
+            else:
+                faces = [face(i, j)]
+            layer = 'PARCELLE_id' if i % 2 else 'BATIMENT_id'
+            record(feas, 'FEA', name, ('SCPCP', 'EDAB;;OBJ;%s' % layer), ('ATCSN', '0'), ('QACSN', '0'))
+            link(lnks, 'LO_%s' % name, 'ID_S_RCO_OBJ_FACE', ('FEA', name), *[('PFE', a) for a in faces])
+
+    with open(path, 'w', encoding='ISO-8859-1') as fout:
+        fout.write('\r\n'.join(pars + pnos + pfes + feas + lnks) + '\r\n')
+
+
+def normalizeRing(ring):
+    """ Ring without closing point, starting at its smallest vertex,
+    in counterclockwise order """
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring = ring[:-1]
+    area = sum(ring[k - 1][0] * ring[k][1] - ring[k][0] * ring[k - 1][1] for k in range(len(ring)))
+    if area < 0:
+        ring = ring[::-1]
+    start = ring.index(min(ring))
+    return tuple(ring[start:] + ring[:start])
+
+
+def wkbPolygons(wkb):
+    """ Rings of the polygons of a little endian WKB multipolygon """
+    polygons = []
+    offset = 9
+    for _ in range(struct.unpack_from('<I', wkb, 5)[0]):
+        rings = []
+        offset += 9
+        for _ in range(struct.unpack_from('<I', wkb, offset - 4)[0]):
+            count = struct.unpack_from('<I', wkb, offset)[0]
+            values = struct.unpack_from('<%sd' % (2 * count), wkb, offset + 4)
+            rings.append(list(zip(values[0::2], values[1::2])))
+            offset += 4 + 16 * count
+        polygons.append(rings)
+    return polygons
+
+
+def normalizeGeometry(geom):
+    """ Comparable form of a multipolygon, WKT or WKB: set of polygons,
+    each polygon is its shell and the set of its holes """
+    polygons = set()
+    if isinstance(geom, bytes):
+        for rings in wkbPolygons(geom):
+            rings = [normalizeRing(ring) for ring in rings]
+            polygons.add((rings[0], frozenset(rings[1:])))
+        return frozenset(polygons)
+    wkt = geom
+    body = wkt[wkt.index('(') + 1:wkt.rindex(')')].strip()
+    for polygon in re.split(r'\)\)\s*,\s*\(\(', body[2:-2]):
+        rings = [
+            normalizeRing([tuple(float(v) for v in point.split()) for point in ring.split(',')])
+            for ring in re.split(r'\)\s*,\s*\(', polygon)
+        ]
+        polygons.add((rings[0], frozenset(rings[1:])))
+    return frozenset(polygons)
+
+
+def normalizeResult(result):
+    """ Comparable form of the result of the parser """
+    return {
+        layer: {fea: normalizeGeometry(geom) for fea, geom in features.items()}
+        for layer, features in result.items()
+    }
+
+
+def loadParser(path):
+    """ GetMultiPolygonFromVec class of another version of the module """
+    spec = importlib.util.spec_from_file_location('previous_getmultipolygonfromvec', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.GetMultiPolygonFromVec
+
+
+def run(name, parserClass, fpath):
+    start = time.perf_counter()
+    result = parserClass()(fpath)
+    duration = time.perf_counter() - start
+    count = sum(len(a) for a in result.values())
+    print('%-10s %8.2f s (%s multipolygones)' % (name, duration, count))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la lecture des fichiers VEC')
+    parser.add_argument('--size', type=int, default=200, help='nombre de faces par côté de la grille générée')
+    parser.add_argument('--file', help='fichier VEC existant à utiliser')
+    parser.add_argument('--compare-with', help='autre version de getmultipolygonfromvec.py à comparer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        fpath = args.file
+        if not fpath:
+            fpath = os.path.join(tmpDir, 'EDAB01.VEC')
+            generateVec(fpath, args.size)
+        print('%s : %.1f Mo' % (fpath, os.path.getsize(fpath) / 1e6))
+        current = run('actuel', GetMultiPolygonFromVec, fpath)
+        if args.compare_with:
+            previous = run('précédent', loadParser(args.compare_with), fpath)
+            if normalizeResult(previous) != normalizeResult(current):
+                print('Les deux versions ne produisent pas les mêmes multipolygones')
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+""" Cadastre unit tests, without QGIS
+"""
+import os
+import sys
+
+# The cadastre package is imported from the root of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
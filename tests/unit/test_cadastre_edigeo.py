@@ -0,0 +1,49 @@
+""" Tests of the EDIGEO import tools
+"""
+import io
+import os
+import tarfile
+import zipfile
+
+from cadastre.cadastre_edigeo import extractEdigeoArchive
+
+
+def writeTarBz2(path, files):
+    """ Write a tar.bz2 archive with the given {name: content} files
+    """
+    with tarfile.open(path, 'w:bz2') as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+
+def test_extract_archive(tmp_path):
+    """ Test that an archive is extracted into its own folder,
+    with its nested archives returned to be extracted in turn
+    """
+    sourceDir = tmp_path / 'edigeo'
+    sourceDir.mkdir()
+    writeTarBz2(str(sourceDir / 'feuille.tar.bz2'), {'EDAB01/EDAB01.THF': b'thf', 'EDAB01/EDAB01.VEC': b'vec'})
+    path = str(sourceDir / 'dep.zip')
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.write(str(sourceDir / 'feuille.tar.bz2'), 'commune/feuille.tar.bz2')
+        archive.writestr('commune/EDAB02.thf', b'thf')
+
+    targetDir = str(tmp_path / 'target')
+    os.makedirs(targetDir)
+    archives, thfFiles = extractEdigeoArchive(path, targetDir)
+    assert os.path.isfile(path)
+    folder = os.path.dirname(os.path.dirname(archives[0]))
+    assert os.path.dirname(folder) == targetDir
+    assert os.path.basename(folder).startswith('dep_')
+    assert [os.path.relpath(a, folder) for a in archives] == [os.path.join('commune', 'feuille.tar.bz2')]
+    assert [os.path.relpath(a, folder) for a in thfFiles] == [os.path.join('commune', 'EDAB02.thf')]
+
+    # The nested archive is extracted into another folder, and removed
+    archives, thfFiles = extractEdigeoArchive(archives[0], targetDir, True)
+    assert not os.path.exists(os.path.join(folder, 'commune', 'feuille.tar.bz2'))
+    assert archives == []
+    assert [os.path.relpath(a, targetDir).split(os.sep)[1:] for a in thfFiles] == [['EDAB01', 'EDAB01.THF']]
+    with open(thfFiles[0], 'rb') as fin:
+        assert fin.read() == b'thf'
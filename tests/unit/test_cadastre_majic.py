@@ -0,0 +1,508 @@
+""" Tests of the MAJIC source files tools
+"""
+import gzip
+import hashlib
+import io
+import os
+import re
+import zipfile
+
+import pytest
+
+from cadastre.cadastre_majic import (
+    MAJIC_INDEX_VERSION,
+    RAW_TABLE_SOURCE,
+    MajicDecoder,
+    buildMajicSourceIndex,
+    compareMajicFile,
+    getMajicFileSize,
+    getMajicSourceIndex,
+    isMajicSourceIndexValid,
+    majicBlocks,
+    majicLines,
+    openMajicFile,
+    sanitizeMajicBlock,
+)
+from cadastre.cadastre_majic_layouts import MAJIC_LAYOUTS, toNumber
+from cadastre.cadastre_sql import splitSqlStatements, stripSqlComments
+
+SCRIPT = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'cadastre', 'scripts', 'plugin', '2020', 'majic3_formatage_donnees.sql'
+)
+
+REPLACE_DICT = {'[PREFIXE]': '', '[ANNEE]': '2020', '[LOT]': 'L1'}
+
+# Tokens of the expressions of the formatting script
+SQL_TOKEN = re.compile(r"\s*(?:'((?:[^']|'')*)'|(\d+)|(\w+)|(\|\||!=|<>|[(),=/]))")
+
+
+class SqlError(Exception):
+    """ Error raised by PostgreSQL while evaluating an expression
+    """
+
+
+def pgToNumber(value, digits):
+    """ to_number(value, '99...9') of PostgreSQL: each digit of the format
+    reads one character, after skipping a space. A minus sign before
+    the first digit makes the number negative. Without any digit,
+    the number cannot be parsed
+    """
+    number = ''
+    sign = ''
+    pos = 0
+    for i in range(digits):
+        if pos < len(value) and value[pos] == ' ':
+            pos += 1
+        if pos < len(value) and value[pos] == '-' and not number and not sign:
+            sign = '-'
+            pos += 1
+        if pos >= len(value):
+            break
+        if value[pos].isdigit():
+            number += value[pos]
+        pos += 1
+    if not number:
+        raise SqlError('invalid input syntax for type numeric: "%s"' % value)
+    return int(sign + number)
+
+
+class ExpressionEvaluator:
+    """ Evaluate the expressions of the formatting script on a line,
+    with the functions and operators it uses
+    """
+
+    def __init__(self, expression, line):
+        self.tokens = []
+        pos = 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = SQL_TOKEN.match(expression, pos)
+            assert match, expression[pos:]
+            string, number, word, symbol = match.groups()
+            if string is not None:
+                self.tokens.append(('string', string.replace("''", "'")))
+            elif number is not None:
+                self.tokens.append(('number', int(number)))
+            elif word is not None:
+                self.tokens.append(('word', word.upper()))
+            else:
+                self.tokens.append(('symbol', symbol))
+            pos = match.end()
+        self.pos = 0
+        self.line = line
+
+    def peek(self, *values):
+        if self.pos < len(self.tokens) and self.tokens[self.pos][1] in values:
+            return self.tokens[self.pos][1]
+        return None
+
+    def take(self, *values):
+        token = self.tokens[self.pos]
+        assert not values or token[1] in values, (token, values)
+        self.pos += 1
+        return token
+
+    def evaluate(self, condition=False):
+        value = self.condition() if condition else self.expression()
+        assert self.pos == len(self.tokens), self.tokens[self.pos:]
+        return value
+
+    def expression(self):
+        value = self.concatenation()
+        while self.peek('/'):
+            self.take()
+            divisor = self.take()[1]
+            value = None if value is None else value / divisor
+        return value
+
+    def concatenation(self):
+        value = self.primary()
+        while self.peek('||'):
+            self.take()
+            other = self.primary()
+            value = None if value is None or other is None else value + other
+        return value
+
+    def arguments(self):
+        self.take('(')
+        values = [self.expression()]
+        while self.peek(','):
+            self.take()
+            values.append(self.expression())
+        self.take(')')
+        return values
+
+    def primary(self):
+        kind, value = self.take()
+        if kind in ('string', 'number'):
+            return value
+        if value == 'NULL':
+            return None
+        if value == 'TMP':
+            return self.line
+        if value == 'CASE':
+            return self.case()
+        if value == 'SUBSTRING':
+            text, position, length = self.arguments()
+            return text[position - 1:position - 1 + length]
+        if value == 'TRIM':
+            text, = self.arguments()
+            return None if text is None else text.strip(' ')
+        if value == 'REPLACE':
+            text, old, new = self.arguments()
+            return None if text is None else text.replace(old, new)
+        if value == 'TO_NUMBER':
+            text, template = self.arguments()
+            return None if text is None else pgToNumber(text, len(template))
+        raise AssertionError('Unknown token %s' % value)
+
+    def case(self):
+        result = None
+        matched = False
+        while self.peek('WHEN'):
+            self.take()
+            condition = self.condition()
+            self.take('THEN')
+            # Every branch is parsed, only the first matching one is evaluated
+            if condition and not matched:
+                matched = True
+                result = self.expression()
+            else:
+                self.skipExpression()
+        if self.peek('ELSE'):
+            self.take()
+            if matched:
+                self.skipExpression()
+            else:
+                result = self.expression()
+        self.take('END')
+        return result
+
+    def skipExpression(self):
+        depth = 0
+        while depth or not self.peek('WHEN', 'ELSE', 'END'):
+            if self.peek('CASE'):
+                depth += 1
+            elif self.peek('END'):
+                depth -= 1
+            self.pos += 1
+
+    def condition(self):
+        value = self.comparison()
+        while self.peek('OR', 'AND'):
+            operator = self.take()[1]
+            other = self.comparison()
+            value = (value or other) if operator == 'OR' else (value and other)
+        return value
+
+    def comparison(self):
+        if self.peek('('):
+            self.take()
+            value = self.condition()
+            self.take(')')
+            return value
+        value = self.expression()
+        if self.peek('IS'):
+            self.take()
+            negate = bool(self.peek('NOT'))
+            if negate:
+                self.take()
+            self.take('NULL')
+            return (value is not None) if negate else (value is None)
+        operator = self.take('=', '!=', '<>')[1]
+        other = self.expression()
+        if value is None or other is None:
+            return None
+        return value == other if operator == '=' else value != other
+
+
+def splitList(text):
+    """ Items of a list separated by commas, outside parentheses and literals
+    """
+    items = []
+    depth = 0
+    quoted = False
+    start = 0
+    for i, char in enumerate(text):
+        if char == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and not depth:
+            items.append(text[start:i].strip())
+            start = i + 1
+    items.append(text[start:].strip())
+    return items
+
+
+def scriptQueries(decoder):
+    """ Raw source, column expressions and WHERE clause
+    of the formatting queries replaced by the decoder, by table
+    """
+    with open(SCRIPT, encoding='utf-8-sig') as fin:
+        sql = fin.read()
+    for key, value in REPLACE_DICT.items():
+        sql = sql.replace(key, value)
+    queries = {}
+    for statement in splitSqlStatements(sql):
+        code = stripSqlComments(statement)
+        if not decoder.handles(code):
+            continue
+        match = re.search(
+            r'INSERT\s+INTO\s+(\w+)\s*\((.*?)\)\s*SELECT\s+(?:DISTINCT\s+(?:ON\s*\([^)]*\)\s*)?)?',
+            code, re.DOTALL | re.IGNORECASE
+        )
+        source = RAW_TABLE_SOURCE.search(code)
+        # Unquoted identifiers are lower case
+        columns = [a.lower() for a in splitList(match.group(2))]
+        values = [
+            re.sub(r'\s+(?:AS\s+)?(?!END$)\w+$', '', a, flags=re.IGNORECASE)
+            for a in splitList(code[match.end():source.start()])
+        ]
+        assert len(columns) == len(values), match.group(1)
+        where = re.match(r'\s*(?:WHERE\s+(.*?))?\s*(?:ORDER\s+BY.*)?$', code[source.end():], re.DOTALL | re.IGNORECASE)
+        queries[match.group(1)] = {
+            'source': source.group(0).split()[-1].strip('"'),
+            'columns': dict(zip(columns, values)),
+            'where': where.group(1),
+        }
+    return queries
+
+
+def sampleLines(layout):
+    """ Lines of the record type of a layout: a different character
+    at each position with some blanks, digits with and without blanks,
+    a blank line, and lines cut in the middle of a field or of the commune
+    """
+    characters = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    lines = [
+        [' ' if k % 7 == 3 else characters[k % len(characters)] for k in range(600)],
+        [' ' if k % 11 in (0, 5) else characters[k % 10] for k in range(600)],
+        [characters[k % 10] for k in range(600)],
+        [' '] * 600,
+        # Minus signs, blanks at the end of the fields
+        ['-' if k % 13 == 0 else ' ' if k % 13 > 9 else characters[k % 10] for k in range(600)],
+    ]
+    for line in lines:
+        if 'code' in layout:
+            position, length, code = layout['code']
+            line[position - 1:position - 1 + length] = code
+        # Filled departement, direction and commune
+        line[:6] = '380123'
+    return [''.join(a) for a in lines] + [''.join(lines[0])[:40], '380 ']
+
+
+def writeSourceFiles(sourceDir):
+    """ Write a MAJIC source directory, with a sub directory
+    """
+    os.makedirs(os.path.join(sourceDir, 'sub'))
+    with open(os.path.join(sourceDir, 'REVBATI.800'), 'wb') as fout:
+        fout.write(b'380 bati\n')
+    with open(os.path.join(sourceDir, 'sub', 'REVPROP.800'), 'wb') as fout:
+        fout.write(b'\n381 prop\n')
+    with open(os.path.join(sourceDir, 'sub', 'README.txt'), 'wb') as fout:
+        fout.write(b'not a MAJIC file\n')
+
+
+def test_source_index(tmp_path):
+    """ Test the MAJIC files found in the source directory
+    """
+    sourceDir = str(tmp_path / 'majic')
+    writeSourceFiles(sourceDir)
+    fileNames = {'REVBATI.800': 'bati', 'REVPROP.800': 'prop'}
+    index = buildMajicSourceIndex(sourceDir, fileNames)
+    assert index['version'] == MAJIC_INDEX_VERSION
+    assert [(os.path.relpath(a['path'], sourceDir), a['table'], a['depdir']) for a in index['files']] == [
+        ('REVBATI.800', 'bati', '380'),
+        (os.path.join('sub', 'REVPROP.800'), 'prop', '381'),
+    ]
+    assert isMajicSourceIndexValid(index, sourceDir, fileNames)
+    assert not isMajicSourceIndexValid(index, sourceDir, {'REVBATI.800': 'bati'})
+
+    with open(os.path.join(sourceDir, 'REVBATI.800'), 'ab') as fout:
+        fout.write(b'380 bati\n')
+    assert not isMajicSourceIndexValid(index, sourceDir, fileNames)
+
+
+def test_source_index_archives(tmp_path):
+    """ Test the MAJIC files found in zip archives and compressed files
+    """
+    sourceDir = str(tmp_path / 'majic')
+    os.makedirs(sourceDir)
+    with gzip.open(os.path.join(sourceDir, 'REVBATI.800.gz'), 'wb') as fout:
+        fout.write(b'380 bati\n')
+    with zipfile.ZipFile(os.path.join(sourceDir, 'majic.zip'), 'w') as archive:
+        archive.writestr('dep/REVPROP.800', b'381 prop\n')
+        archive.writestr('dep/README.txt', b'not a MAJIC file\n')
+    fileNames = {'REVBATI.800': 'bati', 'REVPROP.800': 'prop'}
+    index = buildMajicSourceIndex(sourceDir, fileNames)
+    assert [(os.path.relpath(a['path'], sourceDir), a['table'], a['depdir']) for a in index['files']] == [
+        ('REVBATI.800.gz', 'bati', '380'),
+        (os.path.join('majic.zip', 'dep', 'REVPROP.800'), 'prop', '381'),
+    ]
+    member = index['files'][1]
+    assert member['archive'] == os.path.join(sourceDir, 'majic.zip')
+    assert getMajicFileSize(member['path']) == 9
+    with openMajicFile(member['path']) as fin:
+        assert list(majicLines(fin, '381')) == ['381 prop']
+    assert isMajicSourceIndexValid(index, sourceDir, fileNames)
+
+
+def test_source_index_cache(tmp_path):
+    """ Test that the cached index is used as long as the source directory does not change
+    """
+    sourceDir = str(tmp_path / 'majic')
+    cacheDir = str(tmp_path / 'cache')
+    os.makedirs(cacheDir)
+    writeSourceFiles(sourceDir)
+    fileNames = {'REVBATI.800': 'bati', 'REVPROP.800': 'prop'}
+    files = getMajicSourceIndex(sourceDir, fileNames, cacheDir)
+    assert len(files) == 2
+    cacheFiles = os.listdir(cacheDir)
+    assert len(cacheFiles) == 1
+
+    # A valid cache is returned as is
+    cachePath = os.path.join(cacheDir, cacheFiles[0])
+    with open(cachePath, encoding='utf-8') as fin:
+        cache = fin.read()
+    with open(cachePath, 'w', encoding='utf-8') as fout:
+        fout.write(cache.replace('"table": "bati"', '"table": "cached"'))
+    assert [a['table'] for a in getMajicSourceIndex(sourceDir, fileNames, cacheDir)] == ['cached', 'prop']
+
+    # A new file invalidates the cache
+    with open(os.path.join(sourceDir, 'sub', 'REVBATI.800'), 'wb') as fout:
+        fout.write(b'380 bati\n')
+    files = getMajicSourceIndex(sourceDir, fileNames, cacheDir)
+    assert [a['table'] for a in files] == ['bati', 'bati', 'prop']
+
+    # A corrupted cache is rebuilt
+    with open(cachePath, 'w', encoding='utf-8') as fout:
+        fout.write('{')
+    assert getMajicSourceIndex(sourceDir, fileNames, cacheDir) == files
+
+
+def test_to_number():
+    """ Test the conversion of the numbers like to_number of PostgreSQL
+    """
+    assert toNumber('000012345', 9) == 12345
+    assert toNumber('  12345', 7) == 12345
+    # Only the digits of the format are read
+    assert toNumber('1234567', 6) == 123456
+    assert toNumber(' 1234567', 6) == 123456
+    assert toNumber('-0001234', 7) == -1234
+    assert toNumber('12 45', 5) == 1245
+    with pytest.raises(ValueError):
+        toNumber('         ', 9)
+    for value, digits in [('000012345', 9), ('1234567', 6), ('  1 2 3 ', 8), ('-12', 3), ('1A2', 3)]:
+        assert toNumber(value, digits) == pgToNumber(value, digits)
+
+
+def test_decoder_equals_script():
+    """ Test that the decoder gives the rows of the formatting script
+    for lines of each record type: same filters and same values
+    """
+    layouts = MAJIC_LAYOUTS['2020']
+    queries = scriptQueries(MajicDecoder(layouts, REPLACE_DICT))
+    assert sorted(queries) == sorted(layouts)
+
+    checked = 0
+    for table, layout in layouts.items():
+        query = queries[table]
+        assert query['source'] == layout['source']
+        for line in sampleLines(layout):
+            decoder = MajicDecoder({table: layout}, REPLACE_DICT)
+            try:
+                rows = [row for _, row in decoder.decode([line], layout['source'])]
+                error = None
+            except ValueError as e:
+                rows = None
+                error = e
+            if query['where'] is not None and not ExpressionEvaluator(query['where'], line).evaluate(True):
+                assert rows == [], (table, line, error)
+                continue
+            try:
+                expected = {
+                    column: ExpressionEvaluator(expression, line).evaluate()
+                    for column, expression in query['columns'].items()
+                }
+            except SqlError:
+                # The decoder fails like the query
+                assert error is not None, (table, line)
+                continue
+            assert rows is not None and len(rows) == 1, (table, line, error)
+            assert dict(zip(decoder.columns[table], rows[0])) == expected, (table, line)
+            checked += 1
+    assert checked > 50
+
+
+def test_decoder_distinct():
+    """ Test that the duplicated rows are skipped until their source is released
+    """
+    layouts = MAJIC_LAYOUTS['2020']
+    decoder = MajicDecoder(layouts, REPLACE_DICT)
+    assert decoder.distinctTables == {'bati': ['pevlissage'], 'prop': ['proprietaire'], 'lloc': ['lotslocaux']}
+
+    line = sampleLines(layouts['proprietaire'])[0]
+    other = line[:200] + 'X' + line[201:]
+    assert len(list(decoder.decode([line, other], 'prop'))) == 1
+    assert list(decoder.decode([line], 'prop')) == []
+    decoder.releaseSource('lloc')
+    assert list(decoder.decode([line], 'prop')) == []
+    decoder.releaseSource('prop')
+    assert len(list(decoder.decode([line], 'prop'))) == 1
+
+
+def test_sanitize_block():
+    """ Test that the non printable bytes are replaced
+    and the lines of other departements are removed
+    """
+    lineFilter = re.compile(b'^' + re.escape(b'380') + b'.*\n', re.MULTILINE)
+    block = b'380A\xe9\tB\r\n380C\n'
+    assert sanitizeMajicBlock(block, b'380', lineFilter) == b'380A  B\n380C\n'
+    block = b'380A\n490B\n380C\n\n'
+    assert sanitizeMajicBlock(block, b'380', lineFilter) == b'380A\n380C\n'
+
+
+def test_majic_blocks():
+    """ Test that the blocks only contain complete lines,
+    the last line being kept without line feed
+    """
+    data = b'380 first line\n490 other\n380 second line\n380 last'
+    blocks = list(majicBlocks(io.BytesIO(data), '380', bufferSize=8))
+    assert all(a.endswith(b'\n') for a in blocks)
+    assert b''.join(blocks) == b'380 first line\n380 second line\n380 last\n'
+    assert list(majicLines(io.BytesIO(data), '380')) == ['380 first line', '380 second line', '380 last']
+
+
+def test_compare_file(tmp_path):
+    """ Test that a file is only hashed when its size is the same
+    and its modification time is not
+    """
+    fpath = str(tmp_path / 'REVBATI.800')
+    with open(fpath, 'wb') as fout:
+        fout.write(b'380 bati\n')
+    changed, fingerprint = compareMajicFile(fpath, 9, 1000)
+    assert changed
+    assert fingerprint == 'mtime:1000'
+    # Same modification time: the recorded fingerprint is kept
+    assert compareMajicFile(fpath, 9, 1000, (9, fingerprint)) == (False, fingerprint)
+    # Touched file without any recorded hash: hashed, and changed
+    os.utime(fpath, (2000, 2000))
+    changed, fingerprint = compareMajicFile(fpath, 9, os.stat(fpath).st_mtime, (9, fingerprint))
+    assert changed
+    assert fingerprint == 'mtime:2000;md5:%s' % hashlib.md5(b'380 bati\n').hexdigest()
+    # Touched again without changing its bytes: same hash, not changed
+    os.utime(fpath, (3000, 3000))
+    changed, newFingerprint = compareMajicFile(fpath, 9, os.stat(fpath).st_mtime, (9, fingerprint))
+    assert not changed
+    assert newFingerprint == fingerprint.replace('mtime:2000', 'mtime:3000')
+    # Same size, other bytes
+    with open(fpath, 'wb') as fout:
+        fout.write(b'380 BATI\n')
+    assert compareMajicFile(fpath, 9, os.stat(fpath).st_mtime, (9, newFingerprint))[0]
+    # Other size: changed, without hashing
+    assert compareMajicFile(fpath + '.missing', 10, 4000, (9, newFingerprint)) == (True, 'mtime:4000')
@@ -0,0 +1,290 @@
+""" Tests of the SQL scripts tools
+"""
+import csv
+import json
+import os
+import sqlite3
+
+from cadastre.cadastre_sql import (
+    CopyStream,
+    SqlProfiler,
+    SqlScriptRepository,
+    copyRows,
+    getSqlStepComments,
+    getStatementDependencies,
+    getStatementTables,
+    isParallelStatement,
+    isSqlQuery,
+    setTablesPersistenceSql,
+    splitSqlStatements,
+    stripSqlComments,
+    tablesPersistenceSql,
+    temporaryTablesSql,
+)
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'cadastre', 'scripts', 'plugin')
+
+
+class FakeCursor:
+    """ Cursor recording the data given to copy_expert
+    """
+
+    def __init__(self):
+        self.copies = []
+
+    def copy_expert(self, sql, stream):
+        chunks = []
+        while True:
+            data = stream.read(8192)
+            if not data:
+                break
+            chunks.append(data)
+        self.copies.append((sql, chunks[0][:0].join(chunks) if chunks else ''))
+
+
+def test_split_semicolons_in_literals():
+    """ Test that the semicolons of the literals and identifiers do not split the statements
+    """
+    sql = (
+        "INSERT INTO t VALUES ('a;b', 'it''s;');"
+        "SELECT E'\\';', \"c;d\" FROM t;"
+        "SELECT 1"
+    )
+    assert splitSqlStatements(sql) == [
+        "INSERT INTO t VALUES ('a;b', 'it''s;')",
+        "SELECT E'\\';', \"c;d\" FROM t",
+        "SELECT 1",
+    ]
+
+
+def test_split_dollar_quoting():
+    """ Test that the bodies of the functions are not split
+    """
+    sql = (
+        "CREATE FUNCTION f() RETURNS void AS $$ BEGIN DELETE FROM t; END; $$ LANGUAGE plpgsql;"
+        "CREATE FUNCTION g() RETURNS void AS $body$ SELECT '$$;'; $body$ LANGUAGE sql;"
+    )
+    statements = splitSqlStatements(sql)
+    assert len(statements) == 3
+    assert statements[0].endswith('$$ LANGUAGE plpgsql')
+    assert statements[1].endswith('$body$ LANGUAGE sql')
+    assert statements[2] == ''
+
+
+def test_split_comments():
+    """ Test that the semicolons of the comments do not split the statements
+    """
+    sql = "-- step; one\nSELECT 1 /* a; b */ + 2;\nSELECT 3; -- end;\n"
+    assert splitSqlStatements(sql) == [
+        "-- step; one\nSELECT 1 /* a; b */ + 2",
+        "\nSELECT 3",
+        " -- end;\n",
+    ]
+
+
+def test_strip_comments():
+    """ Test that only the comments are removed
+    """
+    sql = "-- step\nSELECT '--', \"/*\" /* comment */ FROM t -- end"
+    assert stripSqlComments(sql) == "\nSELECT '--', \"/*\"  FROM t "
+
+
+def test_is_sql_query():
+    """ Test the statements which are executed
+    """
+    assert isSqlQuery('\n-- Traitement: parcelle\nINSERT INTO parcelle SELECT 1')
+    assert not isSqlQuery('\n-- select the parcels\n/* update */\n')
+    assert not isSqlQuery('COMMIT')
+    assert not isSqlQuery("DELETE FROM t WHERE a ~ 'b'")
+    assert isSqlQuery("-- a ~ b\nDELETE FROM t")
+
+
+def test_step_comments():
+    """ Test the comments written in the log
+    """
+    sql = '\n-- Traitement: parcelle;\n--nope\nINSERT INTO parcelle SELECT 1'
+    assert getSqlStepComments(sql) == ['Traitement: parcelle']
+
+
+def test_statement_tables():
+    """ Test the tables written and read by the statements
+    """
+    assert getStatementTables(
+        'INSERT INTO "cadastre".parcelle SELECT * FROM nbat n, "cadastre"."prop" AS p '
+        'JOIN voie v ON v.id = p.id WHERE n.a = p.a'
+    ) == ({'parcelle'}, {'nbat', 'prop', 'voie'})
+    assert getStatementTables(
+        'UPDATE [PREFIXE]local10 SET a = 1 FROM [PREFIXE]local00 WHERE local00.id = local10.id'
+    ) == ({'local10'}, {'local00'})
+    assert getStatementTables(
+        'CREATE INDEX IF NOT EXISTS idx_parcelle ON cadastre.parcelle (geo_parcelle)'
+    ) == ({'idx_parcelle', 'parcelle'}, set())
+    assert getStatementTables('DELETE FROM t USING u WHERE t.id = u.id') == ({'t'}, {'u'})
+    assert getStatementTables('SELECT 1') is None
+    assert getStatementTables("SELECT setval('seq', 1)") is None
+
+
+def test_statement_dependencies():
+    """ Test the dependencies between the statements of a script
+    """
+    statements = [
+        '--@parallel\nINSERT INTO a SELECT * FROM raw',
+        '-- b\n--@parallel\nINSERT INTO b SELECT * FROM raw',
+        '--@parallel\nINSERT INTO c SELECT * FROM a',
+        '--@parallel\nUPDATE a SET x = 1',
+        '--@parallel\nINSERT INTO b SELECT * FROM raw',
+        '--@parallel\nSELECT pg_sleep(1)',
+        '--@parallel\nINSERT INTO d SELECT * FROM raw',
+        # Not annotated: may use other tables through a view or a trigger
+        'INSERT INTO e SELECT * FROM v_raw',
+        '--@parallel\nINSERT INTO f SELECT * FROM raw',
+    ]
+    assert getStatementDependencies(statements) == [
+        set(),
+        set(),
+        # read after write
+        {0},
+        # write after write, and write after read
+        {0, 2},
+        # write after write
+        {1},
+        # unknown tables: waits for all the previous statements
+        {0, 1, 2, 3, 4},
+        # and all the next ones wait for it
+        {5},
+        # same for the statements which are not annotated
+        {5, 6},
+        {7},
+    ]
+    assert not isParallelStatement('-- @parallel\nSELECT 1')
+    assert getSqlStepComments(statements[1]) == ['b']
+
+
+def test_script_dependencies():
+    """ Test that the dependency graph of the annotated formatting scripts
+    keeps the order of the statements on the same tables
+    """
+    repository = SqlScriptRepository(SCRIPTS_DIR)
+    replaceDict = {'[PREFIXE]': '', '[ANNEE]': '2020', '[LOT]': '', '[DEPDIR]': '380'}
+    for script in ('2020/majic3_formatage_donnees.sql', 'edigeo_formatage_donnees.sql'):
+        statements = [a for a in splitSqlStatements(repository.render(script, replaceDict)) if isSqlQuery(a)]
+        dependencies = getStatementDependencies(statements)
+        assert len(dependencies) == len(statements)
+
+        # Statements which must be finished before each one, directly or not
+        before = []
+        for i, deps in enumerate(dependencies):
+            assert all(j < i for j in deps)
+            ancestors = set(deps)
+            for j in deps:
+                ancestors |= before[j]
+            before.append(ancestors)
+
+        lastWriter = {}
+        for i, sql in enumerate(statements):
+            assert isParallelStatement(sql), sql
+            tables = getStatementTables(sql)
+            assert tables is not None, sql
+            writes, reads = tables
+            for table in writes | reads:
+                if table in lastWriter:
+                    assert lastWriter[table] in before[i], (table, sql)
+            for table in writes:
+                lastWriter[table] = i
+
+        if script.startswith('2020'):
+            # local10 is updated from local00, filled from the raw table bati
+            local00 = next(i for i, a in enumerate(statements) if 'INSERT INTO local00' in a)
+            update = next(i for i, a in enumerate(statements) if 'FROM local00' in a and 'local10' in a)
+            assert local00 in before[update]
+            # suf does not wait for parcelle
+            suf = next(i for i, a in enumerate(statements) if 'INSERT INTO suf\n' in a)
+            assert not before[suf]
+
+
+def test_profiler(tmp_path):
+    """ Test the slowest statements and the files of the profile
+    """
+    profiler = SqlProfiler()
+    profiler.record('a.sql', 'Traitement: parcelle', 'INSERT INTO parcelle\n  SELECT 1', 2.5, 10)
+    profiler.record('a.sql', None, 'ANALYZE parcelle', 0.5, -1)
+    profiler.record('b.sql', 'Traitement: suf', 'INSERT INTO suf SELECT 1', 4.0, None)
+    assert [a['statement'] for a in profiler.slowest(2)] == ['INSERT INTO suf SELECT 1', 'INSERT INTO parcelle SELECT 1']
+    assert profiler.records[1]['rows'] is None
+
+    jsonPath, csvPath = profiler.write(str(tmp_path / 'profile'))
+    with open(jsonPath, encoding='utf-8') as fin:
+        assert json.load(fin) == profiler.records
+    with open(csvPath, encoding='utf-8', newline='') as fin:
+        rows = list(csv.DictReader(fin, delimiter=';'))
+    assert [a['script'] for a in rows] == ['a.sql', 'a.sql', 'b.sql']
+    assert rows[0]['duration'] == '2.5'
+
+
+def test_tables_persistence():
+    """ Test the queries setting the tables, and their partitions, UNLOGGED or LOGGED
+    """
+    sql = tablesPersistenceSql("o'neil", ['bati', 'nbat'])
+    assert "n.nspname = 'o''neil'" in sql
+    assert "c.relpersistence = 'p'" in sql
+    assert "c.relname IN ('bati', 'nbat') OR p.relname IN ('bati', 'nbat')" in sql
+    assert "c.relpersistence = 'u'" in tablesPersistenceSql('cadastre', ['bati'], False)
+    assert setTablesPersistenceSql('cadastre', ['bati', 'bati_10']) == (
+        'ALTER TABLE "cadastre"."bati" SET UNLOGGED;ALTER TABLE "cadastre"."bati_10" SET UNLOGGED;'
+    )
+    assert setTablesPersistenceSql('cadastre', ['bati'], False) == 'ALTER TABLE "cadastre"."bati" SET LOGGED;'
+
+
+def test_temporary_tables():
+    """ Test that the temporary tables take precedence over the tables of the main database
+    """
+    connection = sqlite3.connect(':memory:')
+    connection.executescript('CREATE TABLE bati (tmp text);INSERT INTO bati VALUES (\'old\');')
+    for _ in range(2):
+        connection.executescript(temporaryTablesSql(['bati', 'nbat']))
+    connection.execute("INSERT INTO bati VALUES ('new')")
+    assert connection.execute('SELECT tmp FROM bati').fetchall() == [('new',)]
+    assert connection.execute('SELECT tmp FROM main.bati').fetchall() == [('old',)]
+    assert connection.execute('SELECT count(*) FROM nbat').fetchone() == (0,)
+
+
+def test_copy_rows():
+    """ Test the values written with the COPY text format
+    """
+    cursor = FakeCursor()
+    copyRows(cursor, 'cadastre', 'parcelle', ['a', 'b', 'c'], [['x\ty', None, 1], ['a\\b', 'c\nd', '']])
+    assert cursor.copies == [(
+        'COPY "cadastre"."parcelle" (a, b, c) FROM STDIN',
+        'x\\ty\t\\N\t1\na\\\\b\tc\\nd\t\n'
+    )]
+
+
+def test_copy_stream():
+    """ Test that the blocks of lines are sent with their backslashes escaped
+    """
+    cursor = FakeCursor()
+    cursor.copy_expert('COPY t (tmp) FROM STDIN', CopyStream([b'a\\b\n', b'c\n']))
+    assert cursor.copies == [('COPY t (tmp) FROM STDIN', b'a\\\\b\nc\n')]
+    assert CopyStream([]).read() == b''
+
+
+def test_repository_render(tmp_path):
+    """ Test that the parameters are replaced whatever their case and the order of the keys
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'script.sql').write_text('SELECT * FROM [PREFIXE]parcelle WHERE annee = [annee] AND lot = [ANNEE_LOT];')
+    dump = tmp_path / 'dump'
+    repository = SqlScriptRepository(str(source), str(dump))
+    assert repository.exists('script.sql')
+    assert not repository.exists('other.sql')
+
+    expected = 'SELECT * FROM cadastre.parcelle WHERE annee = 2020 AND lot = 1;'
+    replaceDict = {'[PREFIXE]': 'cadastre.', '[ANNEE]': '2020', '[ANNEE_LOT]': '1'}
+    assert repository.render('script.sql', replaceDict) == expected
+    reversedDict = dict(reversed(list(replaceDict.items())))
+    assert repository.render('script.sql', reversedDict) == expected
+    assert repository.getPattern(replaceDict) is repository.getPattern(reversedDict)
+    assert (dump / 'script.sql').read_text() == expected
+
+    assert repository.render('script.sql') == repository.getTemplate('script.sql')
@@ -0,0 +1,177 @@
+""" Tests of the EDIGEO VEC parser rebuilding the multipolygons
+"""
+import struct
+
+from array import array
+
+from cadastre.getmultipolygonfromvec import (
+    GetMultiPolygonFromVec,
+    multiPolygonWkb,
+    pointInRing,
+    readVecFile,
+    reversedPoints,
+    ringArea,
+    ringInRing,
+)
+
+
+def record(lines, rty, rid, *values):
+    """ Add an EDIGEO record
+    """
+    lines.append('RTYSA03:%s' % rty)
+    lines.append('RIDSA%02d:%s' % (len(rid), rid))
+    for tag, value in values:
+        lines.append('%s%02d:%s' % (tag, len(value), value))
+
+
+def link(lines, rid, relation, *targets):
+    """ Add a LNK record between objects
+    """
+    values = [('SCPCP', 'EDAB;;REL;%s' % relation), ('FTCSN', str(len(targets)))]
+    values += [('FTPCP', 'EDAB;;%s;%s' % target) for target in targets]
+    record(lines, 'LNK', rid, *values)
+
+
+def arc(lines, name, face, *points):
+    """ Add an arc of a face
+    """
+    record(lines, 'PAR', name, ('SCPCP', 'EDAB;;PGE;ID_S_PRIM_ARC'), *[('CORCC', '%s;%s;' % a) for a in points])
+    link(lines, 'LP_%s' % name, 'ID_S_RCO_FAC_DROITE', ('PAR', name), ('PFE', face))
+
+
+def square(x, y, size):
+    """ Closed ring of a square, counterclockwise
+    """
+    return [(x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)]
+
+
+def normalizeRing(ring):
+    """ Ring without closing point, starting at its smallest vertex,
+    in counterclockwise order
+    """
+    ring = ring[:-1]
+    if sum(ring[k - 1][0] * ring[k][1] - ring[k][0] * ring[k - 1][1] for k in range(len(ring))) < 0:
+        ring = ring[::-1]
+    start = ring.index(min(ring))
+    return ring[start:] + ring[:start]
+
+
+def wkbPolygons(wkb):
+    """ Normalized rings of the polygons of a little endian WKB multipolygon
+    """
+    assert struct.unpack_from('<BI', wkb, 0) == (1, 6)
+    polygons = []
+    offset = 9
+    for _ in range(struct.unpack_from('<I', wkb, 5)[0]):
+        assert struct.unpack_from('<BI', wkb, offset) == (1, 3)
+        rings = []
+        offset += 9
+        for _ in range(struct.unpack_from('<I', wkb, offset - 4)[0]):
+            count = struct.unpack_from('<I', wkb, offset)[0]
+            values = struct.unpack_from('<%sd' % (2 * count), wkb, offset + 4)
+            rings.append(normalizeRing(list(zip(values[0::2], values[1::2]))))
+            offset += 4 + 16 * count
+        polygons.append(rings)
+    assert offset == len(wkb)
+    return polygons
+
+
+def writeVec(path):
+    """ Write a VEC file with a feature of 2 faces: the first one with a hole
+    and an island inside the hole, the second one a simple square.
+    A feature of 1 face is ignored
+    """
+    lines = []
+    # Outer ring of the first face, made of 2 arcs, the second one reversed
+    arc(lines, 'Arc_1', 'Face_1', (0.0, 0.0), (100.0, 0.0), (100.0, 100.0))
+    arc(lines, 'Arc_2', 'Face_1', (0.0, 0.0), (0.0, 100.0), (100.0, 100.0))
+    # Hole and island: closed arcs without node
+    arc(lines, 'Trou_1', 'Face_1', *square(20.0, 20.0, 60.0)[::-1])
+    arc(lines, 'Ilot_1', 'Face_1', *square(40.0, 40.0, 20.0))
+    arc(lines, 'Arc_3', 'Face_2', *square(200.0, 0.0, 10.0))
+    arc(lines, 'Arc_4', 'Face_3', *square(300.0, 0.0, 10.0))
+    for face in ('Face_1', 'Face_2', 'Face_3'):
+        record(lines, 'PFE', face, ('SCPCP', 'EDAB;;PGE;ID_S_PRIM_FACE'))
+    record(lines, 'FEA', 'Objet_1', ('SCPCP', 'EDAB;;OBJ;PARCELLE_id'))
+    record(lines, 'FEA', 'Objet_2', ('SCPCP', 'EDAB;;OBJ;BATIMENT_id'))
+    link(lines, 'LO_1', 'ID_S_RCO_OBJ_FACE', ('FEA', 'Objet_1'), ('PFE', 'Face_1'), ('PFE', 'Face_2'))
+    link(lines, 'LO_2', 'ID_S_RCO_OBJ_FACE', ('FEA', 'Objet_2'), ('PFE', 'Face_3'))
+    link(lines, 'Rel_PARCELLE_BATIMENT_Objet_1_Objet_2', 'ID_S_RCO_PARCELLE_BATIMENT',
+         ('FEA', 'Objet_1'), ('FEA', 'Objet_2'))
+    with open(path, 'w', encoding='ISO-8859-1') as fout:
+        fout.write('\r\n'.join(lines) + '\r\n')
+
+
+def test_multipolygons(tmp_path):
+    """ Test the multipolygons of the features of several faces, with nested rings
+    """
+    path = str(tmp_path / 'E0000A01.VEC')
+    writeVec(path)
+    result = GetMultiPolygonFromVec()(path)
+    assert list(result) == ['PARCELLE_id']
+    assert list(result['PARCELLE_id']) == ['Objet_1']
+    assert wkbPolygons(result['PARCELLE_id']['Objet_1']) == [
+        # Outer ring with its hole
+        [normalizeRing(square(0.0, 0.0, 100.0)), normalizeRing(square(20.0, 20.0, 60.0))],
+        # Island inside the hole
+        [normalizeRing(square(40.0, 40.0, 20.0))],
+        # Second face
+        [normalizeRing(square(200.0, 0.0, 10.0))],
+    ]
+
+
+def test_relations(tmp_path):
+    """ Test the relations between objects read with the multipolygons
+    """
+    path = str(tmp_path / 'E0000A01.VEC')
+    writeVec(path)
+    getMultiPolygon = GetMultiPolygonFromVec()
+    assert list(getMultiPolygon(path)) == ['PARCELLE_id']
+    assert getMultiPolygon.relations == [('Rel_PARCELLE_BATIMENT', 'Objet_1', 'Objet_2')]
+
+
+def test_read_vec_file(tmp_path):
+    """ Test the relations and multipolygons returned to the import
+    """
+    path = str(tmp_path / 'E0000A01.VEC')
+    writeVec(path)
+    relations, multipolygons = readVecFile(path)
+    assert relations == [('Rel_PARCELLE_BATIMENT', 'Objet_1', 'Objet_2')]
+    assert list(multipolygons) == ['PARCELLE_id']
+
+
+def test_wkb_round_trip():
+    """ Test that the WKB contains the coordinates of the rings
+    """
+    outer = array('d', [0.0, 0.0, 10.0, 0.0, 10.0, 10.0, 0.0, 10.0, 0.0, 0.0])
+    hole = array('d', [2.0, 2.0, 2.0, 8.0, 8.0, 8.0, 8.0, 2.0, 2.0, 2.0])
+    other = array('d', [20.5, 0.25, 30.0, 0.0, 25.0, 5.0, 20.5, 0.25])
+    wkb = multiPolygonWkb([[outer, hole], [other]])
+    assert len(wkb) == 9 + (9 + 4 + 5 * 16 + 4 + 5 * 16) + (9 + 4 + 4 * 16)
+    assert wkbPolygons(wkb) == [
+        [normalizeRing(list(zip(a[0::2], a[1::2]))) for a in (outer, hole)],
+        [normalizeRing(list(zip(other[0::2], other[1::2])))],
+    ]
+    assert multiPolygonWkb([]) == struct.pack('<BII', 1, 6, 0)
+    assert list(reversedPoints(array('d', [1.0, 2.0, 3.0, 4.0]))) == [3.0, 4.0, 1.0, 2.0]
+
+
+def test_rings():
+    """ Test the area, orientation and nesting of the rings
+    """
+    ring = array('d', [0.0, 0.0, 10.0, 0.0, 10.0, 10.0, 0.0, 10.0, 0.0, 0.0])
+    assert ringArea(ring) == 100.0
+    assert ringArea(array('d', [0.0, 0.0, 0.0, 10.0, 10.0, 10.0, 10.0, 0.0, 0.0, 0.0])) == -100.0
+
+    assert pointInRing(5.0, 5.0, ring) is True
+    assert pointInRing(15.0, 5.0, ring) is False
+    assert pointInRing(10.0, 10.0, ring) is None
+
+    inner = array('d', [2.0, 2.0, 8.0, 2.0, 8.0, 8.0, 2.0, 2.0])
+    # Touching the outer ring at a node
+    touching = array('d', [0.0, 0.0, 5.0, 1.0, 1.0, 5.0, 0.0, 0.0])
+    outside = array('d', [20.0, 0.0, 30.0, 0.0, 30.0, 10.0, 20.0, 0.0])
+    assert ringInRing(inner, ring)
+    assert not ringInRing(ring, inner)
+    assert ringInRing(touching, ring)
+    assert not ringInRing(outside, ring)